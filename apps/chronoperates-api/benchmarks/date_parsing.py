@@ -0,0 +1,156 @@
+"""
+Benchmark date/time normalization in ICSService.
+
+Parses 100k realistic DATE and START_TIME values (a schedule's worth of
+distinct dates in the mix of formats Claude produces, repeated as in a bulk
+import) with the previous strptime-per-format implementation and with
+src.services.date_parser, both uncached and memoized. Also reports any
+strings where the old parser found a value and the new one disagrees.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/date_parsing.py [--samples 100000] [--json out.json]
+"""
+
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from src.services.date_parser import parse_date, parse_time
+
+RUNS = 5
+DATE_FORMATS = [
+    ("%Y-%m-%d", 50),
+    ("%m/%d/%Y", 10),
+    ("%d/%m/%Y", 5),
+    ("%B %d, %Y", 15),
+    ("%b %d, %Y", 5),
+    ("%d %B %Y", 10),
+    ("%A, %B %d, %Y", 5),
+]
+TIME_FORMATS = [("%H:%M", 60), ("%I:%M %p", 30), ("%I %p", 10)]
+
+
+def legacy_parse_date(date_str):
+    """ICSService._parse_date before the date_parser module."""
+    if not date_str:
+        return None
+
+    date_formats = [
+        "%Y-%m-%d",
+        "%m/%d/%Y",
+        "%d/%m/%Y",
+        "%m-%d-%Y",
+        "%d-%m-%Y",
+        "%B %d, %Y",
+        "%b %d, %Y",
+        "%d %B %Y",
+        "%d %b %Y",
+    ]
+
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+
+    date_match = re.search(r"(\d{4})-(\d{1,2})-(\d{1,2})", date_str)
+    if date_match:
+        year, month, day = map(int, date_match.groups())
+        return datetime(year, month, day)
+
+    return None
+
+
+def legacy_parse_time(time_str):
+    """ICSService._parse_time before the date_parser module."""
+    if not time_str:
+        return None
+
+    time_match = re.search(r"(\d{1,2}):(\d{2})", time_str)
+    if time_match:
+        hour, minute = map(int, time_match.groups())
+
+        if "PM" in time_str.upper() and hour != 12:
+            hour += 12
+        elif "AM" in time_str.upper() and hour == 12:
+            hour = 0
+
+        return (hour, minute)
+
+    return None
+
+
+def make_samples(count, rng):
+    """Event dates over a season and times on the quarter hour, in mixed formats."""
+    start = date(2024, 9, 1)
+    days = [start + timedelta(days=offset) for offset in range(120)]
+    date_formats, date_weights = zip(*DATE_FORMATS)
+    time_formats, time_weights = zip(*TIME_FORMATS)
+
+    dates, times = [], []
+    for _ in range(count):
+        day = rng.choice(days)
+        dates.append(day.strftime(rng.choices(date_formats, date_weights)[0]))
+        moment = datetime(2024, 1, 1, rng.randrange(8, 23), rng.choice((0, 15, 30, 45)))
+        times.append(moment.strftime(rng.choices(time_formats, time_weights)[0]))
+    return dates, times
+
+
+def time_ms(parse, values, clear=None):
+    """Median wall time over RUNS passes; clear() runs before each pass."""
+    timings = []
+    for _ in range(RUNS):
+        if clear:
+            clear()
+        start = time.perf_counter()
+        for value in values:
+            parse(value)
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    dates, times = make_samples(args.samples, random.Random(42))
+    results = {"samples": args.samples, "distinct_dates": len(set(dates)), "timings": []}
+
+    cases = [
+        ("date", "legacy", legacy_parse_date, dates, None),
+        ("date", "uncached", parse_date.__wrapped__, dates, None),
+        ("date", "memoized", parse_date, dates, parse_date.cache_clear),
+        ("time", "legacy", legacy_parse_time, times, None),
+        ("time", "uncached", parse_time.__wrapped__, times, None),
+        ("time", "memoized", parse_time, times, parse_time.cache_clear),
+    ]
+
+    print(f"{args.samples} samples, {results['distinct_dates']} distinct date strings")
+    print(f"{'field':<6} {'parser':<10} {'total ms':>9} {'us/call':>8}")
+    for field, name, parse, values, clear in cases:
+        total = time_ms(parse, values, clear)
+        results["timings"].append({"field": field, "parser": name, "total_ms": total})
+        print(f"{field:<6} {name:<10} {total:>9} {total * 1000 / len(values):>8.2f}")
+
+    disagreements = sorted(
+        {value for value in dates if legacy_parse_date(value) not in (None, parse_date(value))}
+        | {value for value in times if legacy_parse_time(value) not in (None, parse_time(value))}
+    )
+    results["disagreements"] = disagreements
+    print(f"Strings parsed differently from the legacy parser: {len(disagreements)}")
+    for value in disagreements[:10]:
+        print(f"  {value!r}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "date_parsing", **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Local stand-in for the Anthropic Messages API, for load testing without spending money.
+
+Answers POST /v1/messages (plain and "stream": true) with canned EVENT:
+responses after a log-normally distributed delay, and injects 429 rate
+limit and 500 API errors at configurable rates. The response for an image
+is chosen by hashing the request, so the same image always gets the same
+events. Prompt caching is emulated: the request prefix up to the last
+cache_control breakpoint is written to the cache on first sight and read
+from it afterwards, and usage reports cache_creation_input_tokens and
+cache_read_input_tokens accordingly (without the minimum cacheable length
+the real API applies). GET /stats reports how many requests got each
+outcome, the prompt cache reads and writes, and how many TCP connections
+clients opened.
+
+Point the API at it with ANTHROPIC_BASE_URL (any ANTHROPIC_API_KEY works):
+
+    PYTHONPATH=. uv run python benchmarks/fake_anthropic.py --port 9000
+    ANTHROPIC_BASE_URL=http://127.0.0.1:9000 ANTHROPIC_API_KEY=fake uv run uvicorn src.main:app
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/fake_anthropic.py [--port 9000]
+        [--latency-median-ms 800] [--latency-sigma 0.5]
+        [--rate-limit-rate 0.0] [--error-rate 0.0] [--responses-file responses.txt]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Separates responses in a --responses-file
+RESPONSE_SEPARATOR = "\n===\n"
+# The Messages API rejects requests with more cache_control breakpoints than this
+MAX_CACHE_BREAKPOINTS = 4
+
+CANNED_RESPONSES = [
+    """EVENT:
+TITLE: Spring Community Fair
+DATE: 2024-04-13
+START_TIME: 10:00
+END_TIME: 16:00
+LOCATION: Riverside Park
+DESCRIPTION: Food stalls, live music and activities for kids
+---""",
+    """EVENT:
+TITLE: Home Match vs. Rovers
+DATE: 2024-03-16
+START_TIME: 3:00 PM
+END_TIME: Not specified
+LOCATION: Victoria Ground
+DESCRIPTION: League fixture, gates open at 1:30 PM
+---
+
+EVENT:
+TITLE: Away Match at United
+DATE: 2024-03-23
+START_TIME: 7:45 PM
+END_TIME: Not specified
+LOCATION: Not specified
+DESCRIPTION: Coach leaves the clubhouse at 4 PM
+---""",
+    """EVENT:
+TITLE: Yoga in the Park
+DATE: March 20, 2024
+START_TIME: 7:00 AM
+END_TIME: 8:00 AM
+LOCATION: North Lawn
+DESCRIPTION: Bring your own mat
+---
+
+EVENT:
+TITLE: Book Club
+DATE: 2024-03-21
+START_TIME: 18:30
+END_TIME: 20:00
+LOCATION: Central Library, Room 2
+DESCRIPTION: This month: The Left Hand of Darkness
+---
+
+EVENT:
+TITLE: Open Mic Night
+DATE: 2024-03-22
+START_TIME: 8 PM
+END_TIME: 11 PM
+LOCATION: The Old Vic Tavern
+DESCRIPTION: Sign-up from 7:30
+---""",
+    "No calendar events detected in this image.",
+]
+
+
+@dataclass
+class FakeAnthropicConfig:
+    """Behaviour of the fake Messages API."""
+
+    latency_median_ms: float = 800.0
+    latency_sigma: float = 0.5
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after_seconds: float = 1.0
+    stream_chunk_chars: int = 16
+    responses: List[str] = field(default_factory=lambda: list(CANNED_RESPONSES))
+    seed: Optional[int] = None
+
+
+def _error(status_code: int, error_type: str, message: str, headers=None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"type": "error", "error": {"type": error_type, "message": message}},
+        headers=headers,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(config: Optional[FakeAnthropicConfig] = None) -> FastAPI:
+    """Build the fake Messages API app for the given config."""
+    config = config or FakeAnthropicConfig()
+    rng = random.Random(config.seed)
+    outcomes = Counter()
+    # (host, port) of each client seen; a new port means a new TCP connection
+    connections = set()
+    app = FastAPI(title="Fake Anthropic Messages API")
+
+    @app.middleware("http")
+    async def track_connections(request: Request, call_next):
+        connections.add(tuple(request.scope["client"] or ()))
+        return await call_next(request)
+
+    def choose_response(body: bytes) -> str:
+        digest = hashlib.sha256(body).digest()
+        return config.responses[int.from_bytes(digest[:4], "big") % len(config.responses)]
+
+    def delay_seconds() -> float:
+        if config.latency_median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(config.latency_median_ms), config.latency_sigma) / 1000
+
+    # Digests of the prompt prefixes in the emulated prompt cache
+    cached_prefixes = set()
+
+    def cacheable_blocks(payload: dict) -> List[dict]:
+        """System and message content blocks, in the order the cache sees them."""
+        blocks = []
+        system = payload.get("system")
+        if isinstance(system, list):
+            blocks.extend(system)
+        for message in payload.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, list):
+                blocks.extend(content)
+        return [block for block in blocks if isinstance(block, dict)]
+
+    def check_cache_control(blocks: List[dict]) -> Optional[str]:
+        """The error the real API would return for these breakpoints, if any."""
+        breakpoints = [block["cache_control"] for block in blocks if "cache_control" in block]
+        if len(breakpoints) > MAX_CACHE_BREAKPOINTS:
+            return f"A maximum of {MAX_CACHE_BREAKPOINTS} blocks with cache_control may be provided"
+        if any(breakpoint.get("type") != "ephemeral" for breakpoint in breakpoints):
+            return "cache_control.type: Input should be 'ephemeral'"
+        return None
+
+    def cache_usage(model: str, blocks: List[dict]) -> dict:
+        """Read or write the prefix up to the last breakpoint in the emulated prompt cache."""
+        usage = {"cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        breakpoints = [i for i, block in enumerate(blocks) if "cache_control" in block]
+        if not breakpoints:
+            return usage
+
+        prefix = json.dumps([model, blocks[:breakpoints[-1] + 1]], sort_keys=True)
+        tokens = max(1, len(prefix) // 4)
+        digest = hashlib.sha256(prefix.encode()).digest()
+        if digest in cached_prefixes:
+            outcomes["cache_read"] += 1
+            usage["cache_read_input_tokens"] = tokens
+        else:
+            cached_prefixes.add(digest)
+            outcomes["cache_write"] += 1
+            usage["cache_creation_input_tokens"] = tokens
+        return usage
+
+    def message(model: str, text: str, input_tokens: int, cache: dict) -> dict:
+        return {
+            "id": f"msg_fake_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": max(1, len(text) // 4),
+                **cache,
+            },
+        }
+
+    async def stream(model: str, text: str, input_tokens: int, cache: dict) -> AsyncIterator[str]:
+        start = message(model, "", input_tokens, cache)
+        start["content"] = []
+        start["stop_reason"] = None
+        start["usage"]["output_tokens"] = 1
+        yield _sse("message_start", {"type": "message_start", "message": start})
+        yield _sse(
+            "content_block_start",
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        )
+
+        chunks = [text[i:i + config.stream_chunk_chars] for i in range(0, len(text), config.stream_chunk_chars)]
+        for chunk in chunks:
+            # Spread part of the latency over the stream, like token generation
+            await asyncio.sleep(delay_seconds() / max(len(chunks), 1) / 2)
+            yield _sse(
+                "content_block_delta",
+                {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}},
+            )
+
+        yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield _sse(
+            "message_delta",
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": max(1, len(text) // 4)},
+            },
+        )
+        yield _sse("message_stop", {"type": "message_stop"})
+
+    @app.post("/v1/messages")
+    async def create_message(request: Request):
+        body = await request.body()
+        payload = json.loads(body)
+        blocks = cacheable_blocks(payload)
+        invalid = check_cache_control(blocks)
+        if invalid:
+            outcomes["invalid"] += 1
+            return _error(400, "invalid_request_error", invalid)
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            outcomes["rate_limited"] += 1
+            return _error(
+                429,
+                "rate_limit_error",
+                "Fake rate limit exceeded",
+                headers={"retry-after": f"{config.retry_after_seconds:g}"},
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            outcomes["error"] += 1
+            await asyncio.sleep(delay_seconds() / 2)
+            return _error(500, "api_error", "Fake internal server error")
+
+        text = choose_response(body)
+        # Roughly what a base64 image costs, so token counters move plausibly
+        input_tokens = max(1, len(body) // 1000)
+        model = payload.get("model", "claude-fake")
+        cache = cache_usage(model, blocks)
+
+        if payload.get("stream"):
+            outcomes["streamed"] += 1
+            await asyncio.sleep(delay_seconds() / 2)
+            return StreamingResponse(stream(model, text, input_tokens, cache), media_type="text/event-stream")
+
+        outcomes["ok"] += 1
+        await asyncio.sleep(delay_seconds())
+        return message(model, text, input_tokens, cache)
+
+    @app.get("/stats")
+    async def stats():
+        return {**outcomes, "connections": len(connections)}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-median-ms", type=float, default=800.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Sigma of the log-normal latency")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with 429s")
+    parser.add_argument("--responses-file", type=Path, help=f"Responses to serve, separated by {RESPONSE_SEPARATOR!r}")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = FakeAnthropicConfig(
+        latency_median_ms=args.latency_median_ms,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        retry_after_seconds=args.retry_after,
+        seed=args.seed,
+    )
+    if args.responses_file:
+        config.responses = args.responses_file.read_text().split(RESPONSE_SEPARATOR)
+
+    import uvicorn
+
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
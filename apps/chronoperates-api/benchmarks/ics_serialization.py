@@ -0,0 +1,101 @@
+"""
+Benchmark ICS serialization with icalendar and with the streaming writer.
+
+For each calendar size, builds the extracted text of that many events (a
+season fixture list) and times ICSService.create_ics_from_texts with each
+settings.ics_serializer value, plus write_ics_from_texts into a file. Peak
+Python memory is measured in a separate tracemalloc pass.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/ics_serialization.py [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+from src.config import settings
+from src.services.ics_service import ICSService
+
+SIZES = [10, 1_000, 50_000]
+
+
+def make_text(events: int) -> str:
+    blocks = []
+    start = date(2024, 8, 10)
+    for i in range(events):
+        blocks.append(
+            "EVENT:\n"
+            f"TITLE: Round {i // 10 + 1}: Team {i % 20} vs. Team {(i * 7) % 20}\n"
+            f"DATE: {(start + timedelta(days=i // 10)).isoformat()}\n"
+            f"START_TIME: {12 + i % 9}:{'30' if i % 2 else '00'}\n"
+            f"LOCATION: Stadium {i % 20}, City {i % 13}\n"
+            "DESCRIPTION: League fixture; kick-off times may change, check the club site.\n"
+            "---\n"
+        )
+    return "\n".join(blocks)
+
+
+def serialize_string(service, text, serializer):
+    settings.ics_serializer = serializer
+    return service.create_ics_from_texts([text])
+
+
+def serialize_file(service, text, path):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        service.write_ics_from_texts([text], file)
+
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(statistics.median(timings), 1), round(peak / 1024 / 1024, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    service = ICSService()
+    results = []
+    fd, out_path = tempfile.mkstemp(suffix=".ics")
+    os.close(fd)
+
+    print(f"{'events':>7} {'serializer':<16} {'median ms':>10} {'peak MB':>8}")
+    try:
+        for size in SIZES:
+            text = make_text(size)
+            runs = 3 if size > 10_000 else 10
+            cases = {
+                "icalendar": lambda: serialize_string(service, text, "icalendar"),
+                "streaming": lambda: serialize_string(service, text, "streaming"),
+                "streaming-file": lambda: serialize_file(service, text, out_path),
+            }
+            for name, fn in cases.items():
+                median_ms, peak_mb = measure(fn, runs)
+                results.append({"events": size, "serializer": name, "median_ms": median_ms, "peak_mb": peak_mb})
+                print(f"{size:>7} {name:<16} {median_ms:>10} {peak_mb:>8}")
+    finally:
+        os.unlink(out_path)
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "ics_serialization", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
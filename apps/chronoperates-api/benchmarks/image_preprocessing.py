@@ -0,0 +1,92 @@
+"""
+Benchmark the image preprocessing stage: payload size and estimated tokens.
+
+For each synthetic input and preprocessing configuration, reports the
+base64 payload sent to Claude, the estimated image tokens, and the time spent
+preprocessing. "raw" is the previous behaviour of sending the upload as-is.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/image_preprocessing.py [--json out.json]
+"""
+
+import argparse
+import base64
+import io
+import json
+import random
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from src.services.image_preprocessor import ImagePreprocessor, estimate_image_tokens
+
+CONFIGS = {
+    "default": {"max_long_edge": 1568, "output_format": "JPEG", "quality": 85},
+    "small": {"max_long_edge": 1092, "output_format": "JPEG", "quality": 80},
+    "grayscale": {"max_long_edge": 1568, "output_format": "JPEG", "quality": 85, "grayscale": True},
+    "webp": {"max_long_edge": 1568, "output_format": "WEBP", "quality": 80},
+}
+
+
+def make_flyer(size, fmt, **save_kwargs) -> bytes:
+    """Create a noisy "photo of a flyer" with blocks of text-like strokes."""
+    rng = random.Random(42)
+    img = Image.effect_noise(size, 24).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    width, height = size
+    for _ in range(400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle([x, y, x + rng.randrange(20, 200), y + rng.randrange(4, 30)], fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **save_kwargs)
+    return buffer.getvalue()
+
+
+INPUTS = {
+    "phone_photo_4032x3024.jpg": ("image/jpeg", lambda: make_flyer((4032, 3024), "JPEG", quality=92)),
+    "screenshot_2560x1440.png": ("image/png", lambda: make_flyer((2560, 1440), "PNG")),
+    "small_800x600.jpg": ("image/jpeg", lambda: make_flyer((800, 600), "JPEG", quality=85)),
+}
+
+
+def describe(data: bytes) -> dict:
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+    return {
+        "payload_bytes": len(base64.b64encode(data)),
+        "dimensions": f"{width}x{height}",
+        "estimated_tokens": estimate_image_tokens(width, height),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'input':<28} {'config':<10} {'payload bytes':>14} {'dims':>10} {'tokens':>7} {'ms':>7}")
+    for name, (media_type, factory) in INPUTS.items():
+        original = factory()
+        rows = [{"input": name, "config": "raw", "preprocess_ms": 0.0, **describe(original)}]
+        for config_name, config in CONFIGS.items():
+            preprocessor = ImagePreprocessor(enabled=True, **config)
+            start = time.perf_counter()
+            output, _ = preprocessor.process(original, media_type)
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            rows.append({"input": name, "config": config_name, "preprocess_ms": elapsed_ms, **describe(output)})
+
+        for row in rows:
+            print(
+                f"{row['input']:<28} {row['config']:<10} {row['payload_bytes']:>14} "
+                f"{row['dimensions']:>10} {row['estimated_tokens']:>7} {row['preprocess_ms']:>7}"
+            )
+        results.extend(rows)
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "image_preprocessing", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Drive POST /upload-image at a fixed request rate and report latency percentiles.
+
+Requests are sent open-loop: one starts every 1/rps seconds whether or not
+earlier ones have finished, so queueing inside the API shows up as latency
+instead of silently lowering the offered load. Each request uploads a small
+generated flyer; by default every request gets a distinct image so the
+response cache is missed, while --images N cycles through N images.
+
+Run the API against benchmarks/fake_anthropic.py to load-test it offline:
+
+    PYTHONPATH=. uv run python benchmarks/fake_anthropic.py --port 9000 &
+    ANTHROPIC_BASE_URL=http://127.0.0.1:9000 ANTHROPIC_API_KEY=fake \\
+        CACHE_DIR=$(mktemp -d) uv run uvicorn src.main:app --port 8000 &
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/load_test.py [--url http://127.0.0.1:8000]
+        [--rps 10] [--duration 30] [--images 0] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import httpx
+from PIL import Image, ImageDraw
+
+
+def make_flyer(variant: int) -> bytes:
+    """A small JPEG flyer whose pixels, and so cache key, depend on variant."""
+    img = Image.new("RGB", (640, 480), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((20, 20, 620, 90), fill=(30, 60, 120))
+    draw.text((40, 45), "SPRING COMMUNITY FAIR", fill="white")
+    draw.text((40, 140), "Saturday April 13, 2024 - 10:00 to 16:00", fill="black")
+    draw.text((40, 180), "Riverside Park", fill="black")
+    draw.text((40, 420), f"ref {variant:08d}", fill=(120, 120, 120))
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def send(client: httpx.AsyncClient, image: bytes, index: int, results: list) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.post(
+            "/upload-image",
+            files={"file": (f"flyer-{index}.jpg", image, "image/jpeg")},
+        )
+        outcome = str(response.status_code)
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    results.append((outcome, time.perf_counter() - start))
+
+
+async def run(url: str, rps: float, duration: float, images: List[bytes], timeout: float) -> dict:
+    total = int(rps * duration)
+    results = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            # Sleep until this request's slot instead of accumulating drift
+            await asyncio.sleep(max(0.0, start + i / rps - time.perf_counter()))
+            tasks.append(asyncio.ensure_future(send(client, images[i % len(images)], i, results)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    outcomes = Counter(outcome for outcome, _ in results)
+    ok_latencies = sorted(latency for outcome, latency in results if outcome == "200")
+    report = {
+        "requests": total,
+        "target_rps": rps,
+        "elapsed_s": round(elapsed, 2),
+        "succeeded": outcomes["200"],
+        "outcomes": dict(outcomes),
+        "throughput_rps": round(outcomes["200"] / elapsed, 2) if elapsed else 0.0,
+    }
+    for pct in (50, 95, 99):
+        value = percentile(ok_latencies, pct)
+        report[f"p{pct}_ms"] = round(value * 1000, 1) if value is not None else None
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the API")
+    parser.add_argument("--rps", type=float, default=10.0, help="Requests started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep sending")
+    parser.add_argument("--images", type=int, default=0, help="Distinct images to cycle through, 0 for one per request")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    total = int(args.rps * args.duration)
+    if total < 1:
+        parser.error("--rps * --duration must be at least 1 request")
+    images = [make_flyer(i) for i in range(args.images or total)]
+
+    report = asyncio.run(run(args.url, args.rps, args.duration, images, args.timeout))
+
+    print(f"{report['requests']} requests at {args.rps:g} rps over {report['elapsed_s']} s")
+    print(f"outcomes:   {report['outcomes']}")
+    print(f"throughput: {report['throughput_rps']} successful requests/s")
+    print(f"latency:    p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "load_test", "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
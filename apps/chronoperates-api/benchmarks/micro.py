@@ -0,0 +1,233 @@
+"""
+Micro-benchmarks for the hot paths between an uploaded image and its ICS file.
+
+Covers ICSService parsing, date normalization, event building and calendar
+serialization at 1 to 10k events, and ClaudeService cache keys, image
+validation and base64 encoding at 100 KB to 10 MB images. Each case is
+timed in rounds of enough calls to last a few milliseconds, until both
+--min-time and --min-rounds are reached, and reported per call.
+
+Results can be saved with --json and compared against an earlier run with
+--compare, which exits with status 1 if any case got slower by more than
+--max-regression.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/micro.py [--filter create_ics] [--min-time 0.5]
+        [--json after.json] [--compare before.json] [--max-regression 0.1]
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.ics_serialization import make_text
+from benchmarks.upload_pipeline import make_jpeg
+from src.config import settings
+from src.services.claude_service import ClaudeService
+from src.services.date_parser import parse_date
+from src.services.ics_service import ICSService
+
+EVENT_COUNTS = [1, 10, 100, 1_000, 10_000]
+IMAGE_SIZES = [("100KB", 100 * 1024), ("1MB", 1024 * 1024), ("10MB", 10 * 1024 * 1024)]
+DATE_VALUES = 1_000
+# A round of calls lasts at least this long, so timer resolution does not matter
+MIN_ROUND_SECONDS = 0.002
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def date_strings(count: int) -> List[str]:
+    """Distinct dates in the mix of formats Claude produces."""
+    formats = ["%Y-%m-%d", "%m/%d/%Y", "%B %d, %Y", "%d %B %Y", "%A, %B %d, %Y", "%b %d, %Y"]
+    rng = random.Random(0)
+    start = date(2024, 1, 1)
+    return [
+        (start + timedelta(days=i)).strftime(rng.choice(formats))
+        for i in range(count)
+    ]
+
+
+def parse_dates_cold(service: ICSService, values: List[str]) -> None:
+    parse_date.cache_clear()
+    for value in values:
+        service._parse_date(value)
+
+
+def parse_dates_warm(service: ICSService, values: List[str]) -> None:
+    for value in values:
+        service._parse_date(value)
+
+
+def with_serializer(serializer: str, fn: Callable[[], object]) -> Callable[[], object]:
+    def run():
+        settings.ics_serializer = serializer
+        return fn()
+    return run
+
+
+def ics_cases(service: ICSService) -> Iterator[Case]:
+    values = date_strings(DATE_VALUES)
+    yield f"ics.parse_date[cold,values={DATE_VALUES}]", lambda: parse_dates_cold(service, values)
+    yield f"ics.parse_date[warm,values={DATE_VALUES}]", lambda: parse_dates_warm(service, values)
+
+    event = service._parse_extracted_text(make_text(1))[0]
+    yield "ics.create_ics_event", lambda: service._create_ics_event(event, 0)
+
+    for count in EVENT_COUNTS:
+        text = make_text(count)
+        yield f"ics.parse_extracted_text[events={count}]", lambda text=text: service._parse_extracted_text(text)
+        for serializer in ("icalendar", "streaming"):
+            create = lambda text=text: service.create_ics_from_text(text)
+            yield (
+                f"ics.create_ics_from_text[{serializer},events={count}]",
+                with_serializer(serializer, create),
+            )
+
+
+def image_cases(service: ClaudeService, workdir: Path) -> Iterator[Case]:
+    prompt = service._create_extraction_prompt()
+    for label, size in IMAGE_SIZES:
+        path = workdir / f"{label}.jpg"
+        path.write_bytes(make_jpeg(size))
+        yield f"claude.get_cache_key[{label}]", lambda path=path: service._get_cache_key(path, prompt)
+        yield f"claude.validate_image[{label}]", lambda path=path: service._validate_image(path)
+        yield f"claude.encode_image[{label}]", lambda path=path: service._encode_image(path)
+
+
+def measure(fn: Callable[[], object], min_time: float, min_rounds: int) -> Dict[str, float]:
+    """Per-call timings in seconds, over rounds of calibrated length."""
+    fn()  # warm-up
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        loops *= 10 if elapsed < MIN_ROUND_SECONDS / 10 else 2
+
+    samples = [elapsed / loops]
+    deadline = time.perf_counter() + min_time
+    while len(samples) < min_rounds or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+
+    return {
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "min_s": min(samples),
+        "rounds": len(samples),
+        "loops": loops,
+    }
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], baseline_path: Path, max_regression: float) -> bool:
+    """Print the change of each case against a saved run. Returns False on regressions."""
+    baseline = json.loads(baseline_path.read_text())
+    before = {result["name"]: result for result in baseline["results"]}
+    revision = baseline.get("metadata", {}).get("git_revision") or baseline_path.name
+    regressions = []
+
+    print(f"\nCompared with {revision} (median per call):")
+    print(f"{'case':<50} {'before':>10} {'after':>10} {'change':>8}")
+    for result in results:
+        old = before.get(result["name"])
+        if old is None:
+            print(f"{result['name']:<50} {'-':>10} {format_seconds(result['median_s']):>10} {'new':>8}")
+            continue
+        change = result["median_s"] / old["median_s"] - 1
+        flag = ""
+        if change > max_regression:
+            regressions.append(result["name"])
+            flag = "  slower"
+        print(
+            f"{result['name']:<50} {format_seconds(old['median_s']):>10} "
+            f"{format_seconds(result['median_s']):>10} {change:>+8.1%}{flag}"
+        )
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower by more than {max_regression:.0%}")
+    return not regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent per case")
+    parser.add_argument("--min-rounds", type=int, default=5, help="Minimum timed rounds per case")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--compare", type=Path, help="Earlier --json output to compare against")
+    parser.add_argument(
+        "--max-regression", type=float, default=0.10,
+        help="Slowdown of the median, as a fraction, that fails --compare",
+    )
+    args = parser.parse_args()
+
+    # Leave headroom so the 10 MB image is not rejected by the default limit
+    settings.max_file_size_mb = max(settings.max_file_size_mb, 20)
+    serializer = settings.ics_serializer
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = [
+            *ics_cases(ICSService()),
+            *image_cases(ClaudeService(), Path(workdir)),
+        ]
+        print(f"{'case':<50} {'median':>10} {'stdev':>10} {'rounds':>7}")
+        for name, fn in cases:
+            if args.filter not in name:
+                continue
+            result = {"name": name, **measure(fn, args.min_time, args.min_rounds)}
+            results.append(result)
+            print(
+                f"{name:<50} {format_seconds(result['median_s']):>10} "
+                f"{format_seconds(result['stdev_s']):>10} {result['rounds']:>7}"
+            )
+        settings.ics_serializer = serializer
+
+    if args.json:
+        metadata = {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        args.json.write_text(
+            json.dumps({"benchmark": "micro", "metadata": metadata, "results": results}, indent=2)
+        )
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
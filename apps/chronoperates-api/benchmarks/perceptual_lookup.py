@@ -0,0 +1,128 @@
+"""
+Benchmark near-duplicate lookup in the perceptual hash index.
+
+Builds the multi-index hash table over random 64-bit hashes (100k by
+default) and times lookups at several Hamming radii against a BK-tree and a
+linear scan, plus the cost of computing a dHash for a large photo.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/perceptual_lookup.py [--entries 100000] [--json out.json]
+"""
+
+import argparse
+import io
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from src.cache.perceptual import MultiIndexHash, dhash, hamming_distance
+
+QUERIES = 200
+RADII = [2, 4, 8]
+
+
+class BKTree:
+    """Reference BK-tree, kept here for comparison with MultiIndexHash."""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, item_hash, value):
+        if self.root is None:
+            self.root = [item_hash, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(item_hash, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [item_hash, {}]
+                return
+            node = child
+
+    def search(self, item_hash, radius):
+        matches, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(item_hash, node[0])
+            if distance <= radius:
+                matches.append(node[0])
+            stack.extend(c for d, c in node[1].items() if abs(d - distance) <= radius)
+        return matches
+
+
+def time_ms(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(args.entries)]
+
+    tree = BKTree()
+    for index, item in enumerate(hashes):
+        tree.add(item, index)
+
+    # Half the queries are near-duplicates of indexed images, half are new
+    queries = [
+        rng.choice(hashes) ^ (1 << rng.randrange(64)) if i % 2 else rng.getrandbits(64)
+        for i in range(QUERIES)
+    ]
+
+    def linear_scan(query, radius):
+        return [h for h in hashes if hamming_distance(query, h) <= radius]
+
+    results = {"entries": args.entries, "lookups": []}
+    print(f"{args.entries} indexed hashes, {QUERIES} queries")
+    print(
+        f"{'radius':>6} {'build s':>8} {'mih median ms':>14} {'mih p95 ms':>11} "
+        f"{'bk-tree median ms':>18} {'linear median ms':>17}"
+    )
+    for radius in RADII:
+        start = time.perf_counter()
+        index = MultiIndexHash(radius)
+        for position, item in enumerate(hashes):
+            index.add(item, position)
+        build_s = time.perf_counter() - start
+
+        index_times = sorted(time_ms(index.search, q) for q in queries)
+        tree_times = [time_ms(tree.search, q, radius) for q in queries]
+        linear_times = [time_ms(linear_scan, q, radius) for q in queries[:20]]
+        row = {
+            "radius": radius,
+            "build_seconds": round(build_s, 2),
+            "mih_median_ms": round(statistics.median(index_times), 3),
+            "mih_p95_ms": round(index_times[int(len(index_times) * 0.95) - 1], 3),
+            "bktree_median_ms": round(statistics.median(tree_times), 3),
+            "linear_median_ms": round(statistics.median(linear_times), 3),
+        }
+        results["lookups"].append(row)
+        print(
+            f"{radius:>6} {row['build_seconds']:>8} {row['mih_median_ms']:>14} "
+            f"{row['mih_p95_ms']:>11} {row['bktree_median_ms']:>18} "
+            f"{row['linear_median_ms']:>17}"
+        )
+
+    photo = io.BytesIO()
+    Image.effect_noise((4032, 3024), 40).convert("RGB").save(photo, "JPEG", quality=90)
+    dhash_ms = statistics.median(time_ms(dhash, photo.getvalue()) for _ in range(10))
+    results["dhash_12mp_jpeg_ms"] = round(dhash_ms, 2)
+    print(f"dHash of a 12 MP JPEG: {dhash_ms:.2f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "perceptual_lookup", **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
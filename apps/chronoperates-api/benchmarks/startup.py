@@ -0,0 +1,133 @@
+"""
+Benchmark cold start of the API: import time and time to the first answers.
+
+Imports src.main in fresh interpreters under -X importtime and reports the
+median total and the modules with the largest cumulative import time. With
+--serve it also starts uvicorn and times the first 200 from GET / (the
+process is up) and from GET /ready (services built and warmed up). Point
+ANTHROPIC_BASE_URL at benchmarks/fake_anthropic.py to keep the warm-up local.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/startup.py [--runs 5] [--top 10] [--serve] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+def import_times(module: str) -> Tuple[float, Dict[str, float]]:
+    """Total and per-module cumulative import seconds of module in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if not cumulative_us.strip().isdigit():
+            continue
+        cumulative[name.strip()] = int(cumulative_us) / 1e6
+    return cumulative.get(module, 0.0), cumulative
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float) -> Optional[float]:
+    """Poll path until it answers 200; seconds since the epoch when it did, or None."""
+    while time.time() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.time()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def serve_times(timeout: float) -> Dict[str, Optional[float]]:
+    """Seconds from launching uvicorn until / and then /ready answer 200."""
+    port = free_port()
+    start = time.time()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env={**os.environ, "PYTHONPATH": str(APP_DIR)},
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            live = wait_for(client, "/", start + timeout)
+            ready = wait_for(client, "/ready", start + timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "live_s": round(live - start, 3) if live else None,
+        "ready_s": round(ready - start, 3) if ready else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="src.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    parser.add_argument("--serve", action="store_true", help="Also time uvicorn until / and /ready answer")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for --serve")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    totals: List[float] = []
+    per_module: Dict[str, List[float]] = {}
+    for _ in range(args.runs):
+        total, cumulative = import_times(args.module)
+        totals.append(total)
+        for name, seconds in cumulative.items():
+            per_module.setdefault(name, []).append(seconds)
+
+    # Only top-level packages, so a package and its submodules are not listed twice
+    slowest = sorted(
+        ((name, statistics.median(seconds)) for name, seconds in per_module.items()
+         if "." not in name and name != args.module.split(".")[0]),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:args.top]
+
+    results = {
+        "module": args.module,
+        "import_median_s": round(statistics.median(totals), 3),
+        "import_runs_s": [round(total, 3) for total in totals],
+        "slowest_packages": [{"name": name, "median_s": round(seconds, 3)} for name, seconds in slowest],
+    }
+
+    print(f"import {args.module}: median {results['import_median_s'] * 1000:.0f} ms over {args.runs} runs")
+    for name, seconds in slowest:
+        print(f"  {name:<30} {seconds * 1000:>8.1f} ms")
+
+    if args.serve:
+        results["serve"] = serve_times(args.timeout)
+        print(f"uvicorn: / after {results['serve']['live_s']} s, /ready after {results['serve']['ready_s']} s")
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "startup", **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark the server-side upload pipeline before and after streaming uploads.
+
+"before" replays the previous /upload-image flow: Starlette spools the
+multipart body into an UploadFile, the handler reads it, writes it to a
+NamedTemporaryFile, and the service re-reads that file for PIL verify,
+hashing and base64 encoding. "after" streams the body through
+read_multipart_files and works on the in-memory buffer.
+
+Syscall counts come from /proc/self/io (read + write syscalls) and are only
+available on Linux.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python benchmarks/upload_pipeline.py [--runs 20] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+from starlette.requests import Request
+
+from src.config import settings
+from src.services.claude_service import ClaudeService
+from src.uploads import read_multipart_files
+
+BOUNDARY = "benchboundary"
+CHUNK_SIZE = 64 * 1024
+SIZES_MB = [1, 10]
+
+
+def make_jpeg(target_bytes: int) -> bytes:
+    """Create a noise JPEG close to target_bytes in size."""
+    side = 256
+    while True:
+        img = Image.effect_noise((side, side), 64).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=95)
+        if buf.tell() >= target_bytes * 0.9:
+            return buf.getvalue()
+        side = int(side * max(1.1, (target_bytes / buf.tell()) ** 0.5))
+
+
+def build_body(image_bytes: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="flyer.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + image_bytes + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(body: bytes) -> Request:
+    """Build a Starlette request whose body arrives in CHUNK_SIZE pieces."""
+    chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+    async def receive():
+        chunk = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    return Request(scope, receive)
+
+
+async def before(service: ClaudeService, body: bytes) -> str:
+    form = await make_request(body).form()
+    upload = form["file"]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
+        tmp_file.write(await upload.read())
+        tmp_file.flush()
+        temp_image_path = Path(tmp_file.name)
+    try:
+        prompt = service._create_extraction_prompt()
+        service._validate_image(temp_image_path)
+        service._get_cache_key(temp_image_path, prompt)
+        return service._encode_image(temp_image_path)
+    finally:
+        temp_image_path.unlink(missing_ok=True)
+        await form.close()
+
+
+async def after(service: ClaudeService, body: bytes) -> str:
+    request = make_request(body)
+    files = await read_multipart_files(
+        request.headers["content-type"],
+        request.stream(),
+        max_file_bytes=settings.max_file_size_mb * 1024 * 1024,
+        max_files=1,
+        content_length=len(body),
+    )
+    file = files[0]
+    prompt = service._create_extraction_prompt()
+    service._prepare_image(bytes(file.data), file.filename, prompt, file.content_hash)
+    return service._encode_image_bytes(bytes(file.data))
+
+
+def read_syscalls() -> Optional[int]:
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["syscr"]) + int(counters["syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def measure(pipeline, service: ClaudeService, body: bytes, runs: int) -> dict:
+    asyncio.run(pipeline(service, body))  # warm-up
+    latencies = []
+    syscalls = []
+    for _ in range(runs):
+        start_calls = read_syscalls()
+        start = time.perf_counter()
+        asyncio.run(pipeline(service, body))
+        latencies.append((time.perf_counter() - start) * 1000)
+        end_calls = read_syscalls()
+        if start_calls is not None and end_calls is not None:
+            syscalls.append(end_calls - start_calls)
+    return {
+        "latency_ms_median": round(statistics.median(latencies), 2),
+        "latency_ms_p95": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 2),
+        "io_syscalls_median": statistics.median(syscalls) if syscalls else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    # Leave headroom so the 10 MB case is not rejected by the default limit
+    settings.max_file_size_mb = max(settings.max_file_size_mb, max(SIZES_MB) * 2)
+    service = ClaudeService()
+    results = []
+
+    print(f"{'size':>8} {'pipeline':>8} {'median ms':>10} {'p95 ms':>8} {'io syscalls':>12}")
+    for size_mb in SIZES_MB:
+        body = build_body(make_jpeg(size_mb * 1024 * 1024))
+        for name, pipeline in (("before", before), ("after", after)):
+            result = {"size_mb": size_mb, "pipeline": name, **measure(pipeline, service, body, args.runs)}
+            results.append(result)
+            print(
+                f"{size_mb:>6}MB {name:>8} {result['latency_ms_median']:>10} "
+                f"{result['latency_ms_p95']:>8} {str(result['io_syscalls_median']):>12}"
+            )
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "upload_pipeline", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+ARTIFACT_ID = re.compile(r"[0-9a-f]{64}")
+ALIASES_DIRNAME = "aliases"
+
+
+class ArtifactStore:
+    """
+    Content-addressed files, stored under the SHA-256 of their bytes.
+
+    Writing content that is already stored only refreshes its modification
+    time, which doubles as the last-used time for expiry and eviction. Since
+    an id always names the same bytes, downloads can be cached indefinitely.
+    Lookups only accept well-formed ids, so request input never becomes an
+    arbitrary filesystem path.
+
+    A file can also be found by an alias, e.g. a hash of the input it was
+    rendered from, so rendering the same input again returns the stored file
+    instead of new bytes under a new id. An alias whose file was swept finds
+    nothing, and the input is rendered and stored again.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        suffix: str,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.writes = 0
+        self.deduplicated = 0
+        self.removed = 0
+
+    def _path(self, artifact_id: str) -> Path:
+        return self.root / artifact_id[:2] / f"{artifact_id}{self.suffix}"
+
+    def _alias_path(self, alias: str) -> Path:
+        return self.root / ALIASES_DIRNAME / alias
+
+    @staticmethod
+    def _write_atomically(path: Path, content: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    def put(self, content: bytes, alias: Optional[str] = None) -> Tuple[str, Path]:
+        """
+        Store content unless an identical artifact already exists.
+
+        Args:
+            content: Bytes to store
+            alias: Optional SHA-256 hex digest to find the artifact by with
+                get_by_alias
+
+        Returns:
+            Tuple of (artifact id, path of the stored file)
+        """
+        artifact_id = hashlib.sha256(content).hexdigest()
+        path = self._path(artifact_id)
+
+        try:
+            os.utime(path)
+            self.deduplicated += 1
+        except FileNotFoundError:
+            # Concurrent writers of the same content replace it with identical bytes
+            self._write_atomically(path, content)
+            self.writes += 1
+
+        if alias is not None and ARTIFACT_ID.fullmatch(alias):
+            self._write_atomically(self._alias_path(alias), artifact_id.encode("ascii"))
+        return artifact_id, path
+
+    def get_by_alias(self, alias: str) -> Optional[Tuple[bytes, Path]]:
+        """
+        Read the artifact last stored under alias and mark it as used.
+
+        Returns:
+            Tuple of (content, path of the stored file), or None if there is
+            no such alias or its artifact has been swept
+        """
+        if not ARTIFACT_ID.fullmatch(alias):
+            return None
+        try:
+            path = self.path(self._alias_path(alias).read_text(encoding="ascii"))
+            if path is None:
+                return None
+            content = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self.deduplicated += 1
+        return content, path
+
+    def path(self, artifact_id: str) -> Optional[Path]:
+        """Path of a stored artifact, or None for unknown or malformed ids."""
+        if not ARTIFACT_ID.fullmatch(artifact_id):
+            return None
+        path = self._path(artifact_id)
+        return path if path.is_file() else None
+
+    def id_for_path(self, path: Path) -> Optional[str]:
+        """Id of the artifact stored at path, or None if path is not one of ours."""
+        artifact_id = Path(path).name.removesuffix(self.suffix)
+        stored = self.path(artifact_id)
+        try:
+            if stored is None or Path(path).resolve() != stored.resolve():
+                return None
+        except (OSError, ValueError):
+            return None
+        return artifact_id
+
+    def _artifacts(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every artifact, oldest first."""
+        artifacts = []
+        for path in self.root.glob(f"*/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            artifacts.append((stat.st_mtime, stat.st_size, path))
+        artifacts.sort()
+        return artifacts
+
+    def sweep(self) -> int:
+        """
+        Delete artifacts unused for longer than the TTL, then the least
+        recently used ones until the store fits within max_bytes.
+
+        Returns:
+            Number of artifacts removed
+        """
+        artifacts = self._artifacts()
+        total_bytes = sum(size for _, size, _ in artifacts)
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds else None
+        removed = 0
+
+        for mtime, size, path in artifacts:
+            expired = cutoff is not None and mtime < cutoff
+            over_budget = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not (expired or over_budget):
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+
+        self.removed += removed
+        self._sweep_aliases()
+        return removed
+
+    def _sweep_aliases(self) -> None:
+        """Delete aliases of artifacts that are no longer stored."""
+        for alias_path in (self.root / ALIASES_DIRNAME).glob("*"):
+            if alias_path.suffix == ".tmp":
+                continue
+            try:
+                artifact_id = alias_path.read_text(encoding="ascii")
+            except (FileNotFoundError, UnicodeDecodeError):
+                continue
+            if self.path(artifact_id) is None:
+                alias_path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        artifacts = self._artifacts()
+        return {
+            "entries": len(artifacts),
+            "bytes": sum(size for _, size, _ in artifacts),
+            "writes": self.writes,
+            "deduplicated": self.deduplicated,
+            "removed": self.removed,
+        }
+
+
+async def run_janitor(store: ArtifactStore, interval_seconds: float) -> None:
+    """Sweep the store every interval_seconds until cancelled."""
+    while True:
+        removed = await asyncio.to_thread(store.sweep)
+        if removed:
+            print(f"Removed {removed} expired artifact(s)")
+        await asyncio.sleep(interval_seconds)
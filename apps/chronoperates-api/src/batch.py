@@ -0,0 +1,321 @@
+"""
+Extract the events from a directory of images, for backfilling archives.
+
+Images are validated and hashed in a process pool, extracted with bounded
+concurrency, and each result is appended to an NDJSON file as soon as it is
+known. That file doubles as the checkpoint: a rerun skips the images whose
+last record is a success for the same content and retries the others. At the
+end, the events of every successful image are streamed from it into one ICS
+file.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python -m src.batch DIR [--output FILE] [--ics FILE] [--concurrency N] [--workers N]
+
+or, with the package installed, chronoperates-batch DIR [...]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO
+from src.config import settings
+from src.services.claude_service import AsyncClaudeService, ClaudeService
+from src.services.ics_service import ICSService
+
+
+OK = "ok"
+ERROR = "error"
+
+RESULTS_FILENAME = "results.ndjson"
+ICS_FILENAME = "events.ics"
+
+
+@dataclass
+class Inspection:
+    """An image file as read and checked by a pool worker."""
+
+    image_data: Optional[bytes] = None
+    md5: Optional[str] = None
+    cache_key: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchSummary:
+    """Counts of a batch run; skipped images were done by an earlier run."""
+
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    events_found: int = 0
+
+
+def find_images(root: Path) -> List[Path]:
+    """Files under root with a supported extension, in path order."""
+    return sorted(
+        path for path in root.rglob("*")
+        if path.is_file() and path.suffix.lower() in settings.supported_formats
+    )
+
+
+def inspect_image(path: str, prompt: str) -> Inspection:
+    """
+    Read, validate and hash an image file. Runs in a pool worker.
+
+    The content is hashed once, for both its MD5 and the extraction cache
+    key, so the service does not read, validate or hash it again.
+
+    Args:
+        path: Image file path
+        prompt: Extraction prompt, part of the cache key
+
+    Returns:
+        The image with its MD5 and cache key, or the error that made it
+        invalid; the MD5 is None if the file could not be read
+    """
+    try:
+        ClaudeService._check_image_size(os.stat(path).st_size)
+        with open(path, "rb") as f:
+            image_data = f.read()
+    except (OSError, ValueError) as e:
+        return Inspection(error=f"Invalid input: {str(e)}")
+
+    content_hash = hashlib.md5(image_data)
+    try:
+        cache_key = ClaudeService._prepare_image(image_data, Path(path).name, prompt, content_hash)
+    except ValueError as e:
+        return Inspection(md5=content_hash.hexdigest(), error=f"Invalid input: {str(e)}")
+    return Inspection(image_data, content_hash.hexdigest(), cache_key)
+
+
+def load_checkpoint(output: Path) -> Dict[str, dict]:
+    """
+    Read the last record of each image from an NDJSON results file.
+
+    A line cut short by an interrupted run is ignored, so its image is
+    processed again. The extracted text is left out, so memory use does
+    not grow with the size of the archive; each record's "offset" is where
+    its line starts, for iter_extracted_texts.
+
+    Returns:
+        Records by image path, relative to the batch directory
+    """
+    records = {}
+    if not output.exists():
+        return records
+
+    offset = 0
+    with output.open("rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                pass
+            else:
+                record.pop("extracted_text", None)
+                record["offset"] = offset
+                records[record["path"]] = record
+            offset += len(line)
+    return records
+
+
+def iter_extracted_texts(output: Path, records: List[dict]) -> Iterator[str]:
+    """Read the extracted text of each successful record, one line at a time."""
+    with output.open("rb") as f:
+        for record in records:
+            f.seek(record["offset"])
+            yield json.loads(f.readline())["extracted_text"]
+
+
+def _end_last_line(output: Path) -> None:
+    """Terminate a line cut short by an interrupted run, so appends start on a new line."""
+    if not output.exists() or output.stat().st_size == 0:
+        return
+    with output.open("rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def _write_record(results: TextIO, record: dict) -> None:
+    """Append a record and flush it, so it survives the process being killed."""
+    results.write(json.dumps(record) + "\n")
+    results.flush()
+
+
+async def _extract(
+    root: Path,
+    path: Path,
+    inspection: Inspection,
+    claude_service: AsyncClaudeService,
+    ics_service: ICSService,
+) -> dict:
+    """Extract one image, turning failures into an error record."""
+    start = time.perf_counter()
+    record = {"path": path.relative_to(root).as_posix(), "md5": inspection.md5}
+
+    try:
+        extracted_text = await claude_service.extract_events_from_bytes(
+            inspection.image_data, path.name, cache_key=inspection.cache_key
+        )
+        events_found = len(ics_service._parse_extracted_text(extracted_text))
+        record.update(status=OK, events_found=events_found, extracted_text=extracted_text)
+
+    except ValueError as e:
+        record.update(status=ERROR, error=f"Invalid input: {str(e)}")
+
+    except Exception as e:
+        record.update(status=ERROR, error=f"Extraction failed: {str(e)}")
+
+    record["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return record
+
+
+async def run_batch(
+    root: Path,
+    output: Path,
+    ics_path: Path,
+    concurrency: int,
+    workers: Optional[int] = None,
+    claude_service: Optional[AsyncClaudeService] = None,
+    ics_service: Optional[ICSService] = None,
+) -> BatchSummary:
+    """
+    Extract the events from every image under root, resuming an earlier run.
+
+    Images are validated and hashed in a pool of worker processes, started
+    with spawn so they do not inherit the services' open databases and
+    threads. Only a few more images than there are extractions and workers
+    are in flight at a time: concurrency tasks take inspected images from a
+    bounded queue and extract them, skipping those already extracted from
+    the same content by an earlier run. Every result is appended to output
+    as it comes in, and the merged calendar is then streamed to ics_path
+    from all the successful records in output, including those of earlier
+    runs.
+
+    Args:
+        root: Directory searched recursively for images
+        output: NDJSON results file, also used as the checkpoint
+        ics_path: ICS file to write the merged calendar to
+        concurrency: Simultaneous extractions
+        workers: Processes validating and hashing images (default: one per CPU)
+        claude_service: Service to extract with (default: a new AsyncClaudeService)
+        ics_service: Service to parse and render events with (default: a new ICSService)
+
+    Returns:
+        Counts of this run, plus the events in the merged calendar
+    """
+    claude_service = claude_service or AsyncClaudeService()
+    ics_service = ics_service or ICSService()
+    summary = BatchSummary()
+    workers = workers or os.cpu_count() or 1
+
+    done = {
+        path: record["md5"]
+        for path, record in load_checkpoint(output).items()
+        if record["status"] == OK
+    }
+    loop = asyncio.get_running_loop()
+    prompt = ClaudeService._create_extraction_prompt()
+    # Inspections waiting for an extraction task, each holding its image in memory
+    inspected: asyncio.Queue = asyncio.Queue(maxsize=concurrency + workers)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    _end_last_line(output)
+
+    async def inspect_all(pool: ProcessPoolExecutor) -> None:
+        for path in find_images(root):
+            await inspected.put((path, loop.run_in_executor(pool, inspect_image, str(path), prompt)))
+        for _ in range(concurrency):
+            await inspected.put(None)
+
+    async def extract_inspected(results: TextIO) -> None:
+        while (item := await inspected.get()) is not None:
+            path, inspecting = item
+            inspection = await inspecting
+            relative = path.relative_to(root).as_posix()
+            if inspection.error is None and done.get(relative) == inspection.md5:
+                summary.skipped += 1
+                continue
+
+            if inspection.error is None:
+                record = await _extract(root, path, inspection, claude_service, ics_service)
+            else:
+                record = {"path": relative, "md5": inspection.md5, "status": ERROR, "error": inspection.error}
+
+            _write_record(results, record)
+            if record["status"] == OK:
+                summary.succeeded += 1
+            else:
+                summary.failed += 1
+                print(f"Failed {relative}: {record['error']}")
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        with output.open("a", encoding="utf-8") as results:
+            await asyncio.gather(
+                inspect_all(pool), *(extract_inspected(results) for _ in range(concurrency))
+            )
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    succeeded = sorted(
+        (record for record in load_checkpoint(output).values() if record["status"] == OK),
+        key=lambda record: record["path"],
+    )
+    ics_path.parent.mkdir(parents=True, exist_ok=True)
+    with ics_path.open("w", encoding="utf-8", newline="") as f:
+        events_counts = ics_service.write_ics_from_texts(iter_extracted_texts(output, succeeded), f)
+    summary.events_found = sum(events_counts)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Extract calendar events from a directory of images")
+    parser.add_argument("directory", type=Path, help="Directory searched recursively for images")
+    parser.add_argument(
+        "--output", type=Path, help=f"NDJSON results and checkpoint file (default: DIRECTORY/{RESULTS_FILENAME})"
+    )
+    parser.add_argument("--ics", type=Path, help=f"Merged calendar file (default: DIRECTORY/{ICS_FILENAME})")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.batch_max_concurrency, help="Simultaneous extractions"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Processes validating and hashing images (default: one per CPU)"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.directory.is_dir():
+        parser.error(f"not a directory: {args.directory}")
+    output = args.output or args.directory / RESULTS_FILENAME
+    ics_path = args.ics or args.directory / ICS_FILENAME
+
+    claude_service = AsyncClaudeService()
+    if not claude_service.client:
+        print("Anthropic API key not configured")
+        return 2
+
+    try:
+        summary = asyncio.run(
+            run_batch(args.directory, output, ics_path, args.concurrency, args.workers, claude_service)
+        )
+    except KeyboardInterrupt:
+        print(f"Interrupted; run again to resume from {output}")
+        return 130
+
+    print(
+        f"{summary.succeeded} images extracted, {summary.failed} failed, "
+        f"{summary.skipped} already done; {summary.events_found} events written to {ics_path}"
+    )
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+from src.cache.base import CacheBackend, CacheEntry
+from src.cache.disk import DiskCache
+from src.cache.lease import LeaseManager
+from src.cache.memory import MemoryCache
+from src.cache.perceptual import MultiIndexHash, PerceptualIndex, dhash
+from src.cache.sqlite import SQLiteCache
+from src.cache.stats import CacheStats
+from src.cache.tiered import TieredCache
+from src.config import settings
+
+
+SQLITE_CACHE_FILENAME = "responses.sqlite3"
+LEASE_DB_FILENAME = "leases.sqlite3"
+PERCEPTUAL_DB_FILENAME = "perceptual.sqlite3"
+
+
+def create_cache_backend() -> CacheBackend:
+    """Build the persistent cache backend configured in settings."""
+    ttl = settings.cache_ttl_seconds or None
+    limits = {
+        "max_entries": settings.cache_disk_max_entries or None,
+        "max_bytes": settings.cache_disk_max_bytes or None,
+        "ttl_seconds": ttl,
+    }
+
+    if settings.cache_backend == "json":
+        return DiskCache(settings.cache_dir, **limits)
+
+    if settings.cache_backend == "sqlite":
+        backend = SQLiteCache(settings.cache_dir / SQLITE_CACHE_FILENAME, **limits)
+        # One-shot import of a JSON cache left by an earlier deployment
+        if not backend.has_imported(settings.cache_dir) and any(
+            settings.cache_dir.glob("*.json")
+        ):
+            backend.import_json_dir(settings.cache_dir)
+        return backend
+
+    raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+
+
+def create_response_cache() -> TieredCache:
+    """Build the response cache configured in settings."""
+    return TieredCache(
+        memory=MemoryCache(
+            settings.cache_memory_max_entries,
+            ttl_seconds=settings.cache_ttl_seconds or None,
+        ),
+        disk=create_cache_backend(),
+    )
+
+
+def create_lease_manager():
+    """Build the cross-worker lease manager, or None if leases are disabled."""
+    if not settings.cache_lease_enabled:
+        return None
+    return LeaseManager(
+        settings.cache_dir / LEASE_DB_FILENAME, settings.cache_lease_ttl_seconds
+    )
+
+
+def create_perceptual_index():
+    """Build the near-duplicate image index, or None if it is disabled."""
+    if not settings.perceptual_cache_enabled:
+        return None
+    return PerceptualIndex(
+        settings.cache_dir / PERCEPTUAL_DB_FILENAME,
+        settings.perceptual_hash_max_distance,
+    )
+
+
+__all__ = [
+    "CacheBackend",
+    "CacheEntry",
+    "CacheStats",
+    "DiskCache",
+    "LeaseManager",
+    "MemoryCache",
+    "MultiIndexHash",
+    "PerceptualIndex",
+    "SQLiteCache",
+    "TieredCache",
+    "create_cache_backend",
+    "create_lease_manager",
+    "create_perceptual_index",
+    "create_response_cache",
+    "dhash",
+]
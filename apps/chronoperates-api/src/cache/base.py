@@ -0,0 +1,45 @@
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional
+from src.cache.stats import CacheStats
+
+
+class CacheEntry(NamedTuple):
+    """A cached response and the Unix time it was stored."""
+
+    value: str
+    stored_at: float
+
+
+class CacheBackend(ABC):
+    """Interface for the persistent tier behind the in-process LRU."""
+
+    stats: CacheStats
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the cached entry, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        """Store a value, evicting entries beyond the configured budget."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a single entry if present."""
+
+    @abstractmethod
+    def clear(self) -> int:
+        """Remove all entries. Returns number of entries removed."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove all entries older than the TTL. Returns number of entries removed."""
+
+    @property
+    @abstractmethod
+    def total_bytes(self) -> int:
+        """Total size of stored responses in bytes."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored entries."""
@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from src.cache.base import CacheBackend, CacheEntry
+from src.cache.stats import CacheStats
+
+
+class DiskCache(CacheBackend):
+    """
+    One-JSON-file-per-key cache directory with TTL and size-based eviction.
+
+    An in-memory index of (size, last use) per key is built once at startup
+    so that eviction never has to rescan the directory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # key -> file size, ordered from least to most recently used
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_index(self) -> None:
+        """Index existing cache files, oldest first by modification time."""
+        files = []
+        for cache_file in self.cache_dir.glob("*.json"):
+            try:
+                stat = cache_file.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, cache_file.stem, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _forget(self, key: str) -> None:
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _remove(self, key: str) -> None:
+        self._forget(key)
+        self._path(key).unlink(missing_ok=True)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the cached entry, or None if missing, expired or corrupted."""
+        cache_file = self._path(key)
+
+        try:
+            with cache_file.open("r", encoding="utf-8") as f:
+                cache_data = json.load(f)
+            value = cache_data["response"]
+            stored_at = cache_data.get("timestamp")
+            if not isinstance(stored_at, (int, float)):
+                # Entries written before timestamps were fixed store a string
+                stored_at = cache_file.stat().st_mtime
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            self.stats.record("misses")
+            return None
+        except (OSError, json.JSONDecodeError, KeyError, TypeError):
+            # If cache file is corrupted, remove it
+            with self._lock:
+                self._remove(key)
+            self.stats.record("misses")
+            return None
+
+        with self._lock:
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.stats.record("expirations")
+                self.stats.record("misses")
+                return None
+
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:
+                # Written by another process since the index was built
+                self._index[key] = cache_file.stat().st_size
+                self._total_bytes += self._index[key]
+
+        self.stats.record("hits")
+        return CacheEntry(value, float(stored_at))
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        """Store a value atomically, then evict entries beyond the configured budget."""
+        payload = json.dumps(
+            {"response": value, "timestamp": stored_at if stored_at is not None else time.time()},
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+        try:
+            # Write to a temp file and rename so readers never see partial JSON
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # If we can't save to cache, just continue without caching
+            return
+
+        with self._lock:
+            self._forget(key)
+            self._index[key] = len(payload)
+            self._total_bytes += len(payload)
+            self.stats.record("writes")
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until within max_entries and max_bytes."""
+        while self._index and (
+            (self.max_entries and len(self._index) > self.max_entries)
+            or (self.max_bytes and self._total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._index))
+            self._remove(key)
+            self.stats.record("evictions")
+
+    def purge_expired(self) -> int:
+        """Remove all entries older than the TTL. Returns number of entries removed."""
+        if not self.ttl_seconds:
+            return 0
+
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    expired = self._path(key).stat().st_mtime < cutoff
+                except FileNotFoundError:
+                    self._forget(key)
+                    continue
+                if expired:
+                    self._remove(key)
+                    removed += 1
+        self.stats.record("expirations", removed)
+        return removed
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> int:
+        """Remove all cached files. Returns number of files removed."""
+        count = 0
+        with self._lock:
+            for cache_file in self.cache_dir.glob("*.json"):
+                try:
+                    cache_file.unlink()
+                    count += 1
+                except OSError:
+                    pass
+            self._index.clear()
+            self._total_bytes = 0
+        return count
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._index)
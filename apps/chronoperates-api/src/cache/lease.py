@@ -0,0 +1,126 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from src.cache.sqlite import connect
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+
+class LeaseManager:
+    """
+    Host-wide leases on cache keys, stored in a SQLite table in the cache dir.
+
+    A worker holding the lease for a key is the only one calling Claude for
+    it; the others wait for the response to appear in the shared cache. A
+    lease is considered stale once it expires without being renewed, or as
+    soon as its holder's process is gone, so a crashed worker never blocks a
+    key for longer than one poll interval.
+    """
+
+    def __init__(self, db_path: Path, ttl_seconds: float):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.hostname = socket.gethostname()
+        self.pid = os.getpid()
+        self.owner = f"{self.hostname}:{self.pid}:{uuid.uuid4().hex}"
+        self.takeovers = 0
+        self._lock = threading.Lock()
+        self._conn = connect(self.db_path)
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        """Run the enclosed statements in a single write transaction."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _is_stale(self, hostname: str, pid: int, expires_at: float, now: float) -> bool:
+        if expires_at < now:
+            return True
+        return hostname == self.hostname and pid != self.pid and not pid_alive(pid)
+
+    def try_acquire(self, key: str) -> bool:
+        """
+        Take the lease for key if it is free, stale, or already ours.
+
+        Returns:
+            True if this process now holds the lease
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._conn.execute(
+                "SELECT owner, hostname, pid, expires_at FROM leases WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is not None and row[0] != self.owner:
+                if not self._is_stale(row[1], row[2], row[3], now):
+                    return False
+                self.takeovers += 1
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO leases "
+                "(key, owner, hostname, pid, acquired_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.owner, self.hostname, self.pid, now, now + self.ttl_seconds),
+            )
+        return True
+
+    def renew(self, key: str) -> bool:
+        """Extend a lease we hold. Returns False if it was lost to another worker."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                (time.time() + self.ttl_seconds, key, self.owner),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, key: str) -> None:
+        """Give up a lease we hold."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner)
+            )
+
+    def holder(self, key: str) -> Optional[str]:
+        """Owner id of the current lease on key, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT owner FROM leases WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from src.cache.base import CacheEntry
+from src.cache.stats import CacheStats
+
+
+class MemoryCache:
+    """Bounded in-process LRU cache with optional TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the cached entry and mark it recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.record("misses")
+                return None
+
+            if self.ttl_seconds and time.time() - entry.stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats.record("expirations")
+                self.stats.record("misses")
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.record("hits")
+            return entry
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries beyond max_entries."""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = CacheEntry(
+                value, stored_at if stored_at is not None else time.time()
+            )
+            self._entries.move_to_end(key)
+            self.stats.record("writes")
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.record("evictions")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> int:
+        """Remove all entries. Returns number of entries removed."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,34 @@
+"""
+Import a one-JSON-file-per-key response cache into the SQLite cache.
+
+Usage (from the app directory):
+    PYTHONPATH=. uv run python -m src.cache.migrate [--json-dir DIR] [--db FILE] [--remove]
+"""
+
+import argparse
+from pathlib import Path
+from src.cache import SQLITE_CACHE_FILENAME
+from src.cache.sqlite import SQLiteCache
+from src.config import settings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import a JSON response cache into SQLite")
+    parser.add_argument("--json-dir", type=Path, default=settings.cache_dir)
+    parser.add_argument("--db", type=Path, default=settings.cache_dir / SQLITE_CACHE_FILENAME)
+    parser.add_argument(
+        "--remove", action="store_true", help="Delete JSON files once they are imported"
+    )
+    args = parser.parse_args(argv)
+
+    backend = SQLiteCache(args.db)
+    try:
+        imported = backend.import_json_dir(args.json_dir, remove=args.remove)
+        print(f"Imported {imported} entries from {args.json_dir} into {args.db}")
+    finally:
+        backend.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,209 @@
+import io
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+from src.cache.sqlite import connect
+from src.lazy import lazy_import
+from src.services.image_validation import image_decode_errors
+
+Image = lazy_import("PIL.Image")
+ImageOps = lazy_import("PIL.ImageOps")
+
+
+HASH_SIZE = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS perceptual_hashes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    phash INTEGER NOT NULL,
+    cache_key TEXT NOT NULL UNIQUE
+);
+"""
+
+
+def dhash(image_data: bytes, hash_size: int = HASH_SIZE) -> int:
+    """
+    Compute a difference hash of an image.
+
+    The image is reoriented, reduced to a (hash_size + 1) x hash_size
+    grayscale thumbnail, and each bit records whether a pixel is brighter
+    than its right-hand neighbour. Re-encoding, recompression and resizing
+    change only a few bits.
+
+    Args:
+        image_data: Raw image file content
+        hash_size: Bits per row and number of rows
+
+    Returns:
+        The hash as an unsigned integer of hash_size * hash_size bits
+
+    Raises:
+        ValueError: If the image does not decode
+    """
+    with image_decode_errors(), Image.open(io.BytesIO(image_data)) as img:
+        # Let the JPEG decoder downscale cheaply before the real resize
+        img.draft("L", (hash_size * 8, hash_size * 8))
+        small = (
+            ImageOps.exif_transpose(img)
+            .convert("L")
+            .resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+        )
+
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over integer hashes for Hamming radius queries.
+
+    Each hash is split into max_distance + 1 disjoint bit chunks, each with
+    its own exact-match table. By the pigeonhole principle, any hash within
+    max_distance of the query matches it exactly on at least one chunk, so a
+    lookup only compares the few entries that share a chunk value instead of
+    scanning the whole index.
+    """
+
+    def __init__(self, max_distance: int, bits: int = HASH_SIZE * HASH_SIZE):
+        if not 0 <= max_distance < bits:
+            raise ValueError(f"max_distance must be between 0 and {bits - 1}")
+
+        self.max_distance = max_distance
+        chunk_count = max_distance + 1
+        base_width, wider_chunks = divmod(bits, chunk_count)
+        # (shift, mask) for each chunk
+        self._chunks = []
+        shift = 0
+        for index in range(chunk_count):
+            width = base_width + (1 if index < wider_chunks else 0)
+            self._chunks.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables = [{} for _ in self._chunks]
+        self._size = 0
+
+    def add(self, item_hash: int, value: Any) -> None:
+        entry = (item_hash, value)
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((item_hash >> shift) & mask, []).append(entry)
+        self._size += 1
+
+    def search(
+        self, item_hash: int, max_distance: Optional[int] = None
+    ) -> List[Tuple[int, Any]]:
+        """Return (distance, value) pairs within max_distance, closest first."""
+        radius = self.max_distance if max_distance is None else max_distance
+        if radius > self.max_distance:
+            raise ValueError(f"Index only supports radius up to {self.max_distance}")
+
+        matches = []
+        seen = set()
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            for entry in table.get((item_hash >> shift) & mask, ()):
+                if id(entry) in seen:
+                    continue
+                seen.add(id(entry))
+                distance = hamming_distance(item_hash, entry[0])
+                if distance <= radius:
+                    matches.append((distance, entry[1]))
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class PerceptualIndex:
+    """
+    Near-duplicate lookup from perceptual hash to response cache key.
+
+    Hashes are persisted in a SQLite table in the cache dir and mirrored in
+    an in-memory multi-index hash table per namespace (one namespace per prompt, so only
+    responses to the same prompt are matched). Rows added by other workers
+    are picked up incrementally before each lookup.
+    """
+
+    def __init__(self, db_path: Path, max_distance: int):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._indexes = {}
+        self._removed = set()
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._conn = connect(self.db_path)
+        self._conn.executescript(SCHEMA)
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Load rows written since the last refresh into the in-memory index."""
+        rows = self._conn.execute(
+            "SELECT id, namespace, phash, cache_key FROM perceptual_hashes "
+            "WHERE id > ? ORDER BY id",
+            (self._last_id,),
+        ).fetchall()
+        for row_id, namespace, phash, cache_key in rows:
+            if namespace not in self._indexes:
+                self._indexes[namespace] = MultiIndexHash(self.max_distance)
+            self._indexes[namespace].add(phash & 0xFFFFFFFFFFFFFFFF, cache_key)
+            self._last_id = row_id
+
+    def add(self, namespace: str, phash: int, cache_key: str) -> None:
+        """Record that cache_key holds the response for an image with phash."""
+        with self._lock:
+            # SQLite integers are signed 64-bit
+            signed = phash - (1 << 64) if phash >= 1 << 63 else phash
+            self._conn.execute(
+                "INSERT OR IGNORE INTO perceptual_hashes (namespace, phash, cache_key) "
+                "VALUES (?, ?, ?)",
+                (namespace, signed, cache_key),
+            )
+            self._removed.discard(cache_key)
+            self._refresh()
+
+    def candidates(self, namespace: str, phash: int) -> List[str]:
+        """Cache keys of near-duplicate images, closest first."""
+        with self._lock:
+            self._refresh()
+            index = self._indexes.get(namespace)
+            if index is None:
+                return []
+            matches = index.search(phash)
+            # dict.fromkeys de-duplicates keys re-added after removal, keeping order
+            return list(
+                dict.fromkeys(key for _, key in matches if key not in self._removed)
+            )
+
+    def remove(self, cache_key: str) -> None:
+        """Forget a cache key whose response has been evicted."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM perceptual_hashes WHERE cache_key = ?", (cache_key,)
+            )
+            # Filter the key out in memory until the index is next rebuilt
+            # from the table at startup
+            self._removed.add(cache_key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM perceptual_hashes"
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,281 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from src.cache.base import CacheBackend, CacheEntry
+from src.cache.stats import CacheStats
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+
+-- Running totals kept by triggers so budget checks never scan the table
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, entries, bytes) VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN
+    UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN
+    UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses BEGIN
+    UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 0;
+END;
+
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# A hit only rewrites last_used once it is older than this, so hot keys do
+# not turn every read into a write; LRU order is kept to this resolution
+TOUCH_INTERVAL_SECONDS = 60.0
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    """Open an autocommit WAL-mode connection that can be shared between threads."""
+    conn = sqlite3.connect(
+        db_path, timeout=30, isolation_level=None, check_same_thread=False
+    )
+    for _ in range(100):
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            break
+        except sqlite3.OperationalError:
+            # Switching journal mode takes a lock that ignores the busy
+            # timeout, so workers starting together can briefly collide
+            time.sleep(0.05)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Single-file SQLite response cache in WAL mode.
+
+    Lookups go through the primary key index, expiry and eviction are single
+    DELETE statements, and every write runs in an IMMEDIATE transaction, so
+    several uvicorn workers can share one database file safely. Like writes,
+    lookups are best-effort: a database error is counted as a miss.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = connect(self.db_path)
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the cached entry, or None if missing, expired or unreadable."""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, stored_at, last_used FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    self.stats.record("misses")
+                    return None
+
+                value, stored_at, last_used = row
+                if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.stats.record("expirations")
+                    self.stats.record("misses")
+                    return None
+
+                if now - last_used > TOUCH_INTERVAL_SECONDS:
+                    self._conn.execute(
+                        "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                    )
+        except sqlite3.Error:
+            # E.g. "database is locked" while another worker writes
+            self.stats.record("misses")
+            return None
+
+        self.stats.record("hits")
+        return CacheEntry(value, stored_at)
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        """Store a value and evict beyond the budget in one atomic transaction."""
+        now = time.time()
+        try:
+            with self._lock, self._transaction():
+                self._conn.execute(
+                    "INSERT INTO responses (key, response, stored_at, last_used, size) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET response = excluded.response, "
+                    "stored_at = excluded.stored_at, last_used = excluded.last_used, "
+                    "size = excluded.size",
+                    (key, value, stored_at if stored_at is not None else now, now,
+                     len(value.encode("utf-8"))),
+                )
+                self.stats.record("writes")
+                self._evict()
+        except sqlite3.Error:
+            # If we can't save to cache, just continue without caching
+            pass
+
+    @contextmanager
+    def _transaction(self):
+        """Run the enclosed statements in a single write transaction."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _evict(self) -> None:
+        """Delete least recently used rows until within max_entries and max_bytes."""
+        entries, total_bytes = self._totals()
+
+        if self.max_entries and entries > self.max_entries:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (entries - self.max_entries,),
+            )
+            self.stats.record("evictions", cursor.rowcount)
+            entries, total_bytes = self._totals()
+
+        if self.max_bytes and total_bytes > self.max_bytes:
+            # Keep the most recently used rows whose cumulative size fits the budget
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "  SELECT key FROM ("
+                "    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running"
+                "    FROM responses"
+                "  ) WHERE running > ?"
+                ")",
+                (self.max_bytes,),
+            )
+            self.stats.record("evictions", cursor.rowcount)
+
+    def _totals(self):
+        return self._conn.execute(
+            "SELECT entries, bytes FROM totals WHERE id = 0"
+        ).fetchone()
+
+    def purge_expired(self) -> int:
+        """Remove all entries older than the TTL. Returns number of entries removed."""
+        if not self.ttl_seconds:
+            return 0
+        return self.purge_older_than(time.time() - self.ttl_seconds)
+
+    def purge_older_than(self, cutoff: float) -> int:
+        """Bulk-delete entries stored before cutoff. Returns number of entries removed."""
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (cutoff,)
+            )
+        self.stats.record("expirations", cursor.rowcount)
+        return cursor.rowcount
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self) -> int:
+        """Remove all entries. Returns number of entries removed."""
+        with self._lock, self._transaction():
+            cursor = self._conn.execute("DELETE FROM responses")
+        return cursor.rowcount
+
+    def import_json_dir(self, json_dir: Path, remove: bool = False) -> int:
+        """
+        Import a one-JSON-file-per-key cache directory into this database.
+
+        Existing keys are kept. Corrupted files are skipped. Entries without a
+        numeric timestamp use the file modification time.
+
+        Args:
+            json_dir: Directory containing <key>.json cache files
+            remove: Delete each JSON file once its entry has been committed
+
+        Returns:
+            Number of entries imported
+        """
+        rows = []
+        imported_files = []
+        for cache_file in Path(json_dir).glob("*.json"):
+            try:
+                data = json.loads(cache_file.read_text(encoding="utf-8"))
+                value = data["response"]
+                stored_at = data.get("timestamp")
+                if not isinstance(stored_at, (int, float)):
+                    stored_at = cache_file.stat().st_mtime
+            except (OSError, json.JSONDecodeError, KeyError, TypeError):
+                continue
+            rows.append((cache_file.stem, value, stored_at, stored_at, len(value.encode("utf-8"))))
+            imported_files.append(cache_file)
+
+        with self._lock, self._transaction():
+            before = self._totals()[0]
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO responses (key, response, stored_at, last_used, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            imported = self._totals()[0] - before
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('json_import_dir', ?)",
+                (str(Path(json_dir).resolve()),),
+            )
+            self._evict()
+
+        if remove:
+            for cache_file in imported_files:
+                cache_file.unlink(missing_ok=True)
+
+        return imported
+
+    def has_imported(self, json_dir: Path) -> bool:
+        """Whether import_json_dir has already run for json_dir."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE name = 'json_import_dir'"
+            ).fetchone()
+        return row is not None and row[0] == str(Path(json_dir).resolve())
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._totals()[1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._totals()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
@@ -0,0 +1,23 @@
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Dict
+
+
+@dataclass
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters for one cache tier."""
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {f.name: getattr(self, f.name) for f in fields(self) if f.compare}
@@ -0,0 +1,49 @@
+from typing import Dict, Optional
+from src.cache.base import CacheBackend
+from src.cache.memory import MemoryCache
+
+
+class TieredCache:
+    """In-process LRU tier in front of a persistent tier."""
+
+    def __init__(self, memory: MemoryCache, disk: CacheBackend):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a key in memory first, promoting disk hits into memory."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry.value
+
+        entry = self.disk.get(key)
+        if entry is None:
+            return None
+
+        self.memory.set(key, entry.value, stored_at=entry.stored_at)
+        return entry.value
+
+    def set(self, key: str, value: str) -> None:
+        """Write a value through both tiers."""
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def clear(self) -> int:
+        """Clear both tiers. Returns number of persisted entries removed."""
+        self.memory.clear()
+        return self.disk.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters and current size for each tier."""
+        return {
+            "memory": {**self.memory.stats.as_dict(), "entries": len(self.memory)},
+            "disk": {
+                **self.disk.stats.as_dict(),
+                "entries": len(self.disk),
+                "bytes": self.disk.total_bytes,
+            },
+        }
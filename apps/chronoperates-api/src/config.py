@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List, Optional
 from pathlib import Path
+import tempfile
 
 
 class Settings(BaseSettings):
@@ -8,18 +9,110 @@ class Settings(BaseSettings):
 
     # Anthropic API settings
     anthropic_api_key: Optional[str] = None
+    # Messages API endpoint, e.g. a local fake for load tests (None uses Anthropic's)
+    anthropic_base_url: Optional[str] = None
+
+    # Connection pool shared by all requests to the Messages API
+    anthropic_max_connections: int = 100
+    anthropic_max_keepalive_connections: int = 20
+    anthropic_keepalive_expiry_seconds: float = 60.0
+    anthropic_connect_timeout_seconds: float = 10.0
+    anthropic_timeout_seconds: float = 120.0
+    # HTTP/2 is only used when the h2 package is installed (httpx[http2])
+    anthropic_http2: bool = False
+    # Connections opened at startup so the first requests skip DNS and TLS setup
+    anthropic_warmup_connections: int = 2
+    # Upstream governor in front of the Messages API (async service). Rate
+    # limits are per worker process (0 disables them); concurrency adapts
+    # between min and max, shrinking on 429/529 responses
+    upstream_requests_per_minute: int = 0
+    upstream_tokens_per_minute: int = 0
+    upstream_concurrency_initial: int = 8
+    upstream_concurrency_min: int = 1
+    upstream_concurrency_max: int = 32
+    # Requests in progress (waiting for a slot, in flight or backing off
+    # before a retry) before new ones get 503 (0 for no limit)
+    upstream_max_queue: int = 64
+    upstream_max_retries: int = 4
+    upstream_backoff_base_seconds: float = 0.5
+    upstream_backoff_max_seconds: float = 30.0
+    # Mark the static system prompt for Anthropic prompt caching
+    prompt_cache_enabled: bool = True
     claude_model: str = "claude-3-haiku-20240307"
+    # Model cascade, cheapest first: an extraction scoring below
+    # cascade_min_score is re-run on the next model (empty: claude_model only)
+    claude_cascade_models: List[str] = []
+    cascade_min_score: float = 0.75
     max_tokens: int = 1500
     temperature: float = 0.1
 
     # Image processing settings
     supported_formats: List[str] = [".jpg", ".jpeg", ".png", ".bmp", ".webp"]
     max_file_size_mb: int = 10
+    # Images are checked from their headers; larger pixel counts are rejected
+    # before anything decodes them (0 disables the limit)
+    image_max_pixels: int = 50_000_000
+    # Also fully decode each image with PIL to reject corrupt pixel data
+    image_full_decode: bool = False
+
+    # Batch uploads: files per request and simultaneous Claude extractions per request
+    batch_max_files: int = 40
+    batch_max_concurrency: int = 4
+
+    # Tiled extraction of very large or dense images: overlapping tiles are
+    # extracted concurrently and their events merged
+    tiling_enabled: bool = False
+    tiling_min_long_edge: int = 3000
+    # Claude downscales images above ~1.15 MP, so 1072x1072 tiles keep full resolution
+    tiling_tile_size: int = 1072
+    tiling_overlap: float = 0.1
+    tiling_max_tiles: int = 16
+
+    # Image preprocessing applied before sending to Claude
+    preprocess_enabled: bool = True
+    preprocess_max_long_edge: int = 1568
+    preprocess_format: str = "JPEG"
+    preprocess_quality: int = 85
+    preprocess_grayscale: bool = False
+
+    # Response cache settings (0 disables a limit)
+    cache_backend: str = "sqlite"
+    cache_dir: Path = Path(tempfile.gettempdir()) / "claude_cache"
+    cache_ttl_seconds: int = 30 * 24 * 3600
+    cache_memory_max_entries: int = 256
+    cache_disk_max_entries: int = 50_000
+    cache_disk_max_bytes: int = 500 * 1024 * 1024
+
+    # Cross-worker coordination: one worker per host calls Claude for a given key
+    cache_lease_enabled: bool = True
+    cache_lease_ttl_seconds: float = 60.0
+    cache_lease_poll_interval_seconds: float = 0.25
+    cache_lease_wait_timeout_seconds: float = 180.0
+
+    # Background extraction jobs (POST /jobs)
+    jobs_dir: Path = Path(tempfile.gettempdir()) / "claude_jobs"
+    jobs_workers: int = 4
+    jobs_poll_interval_seconds: float = 1.0
+    # A running job whose lease is not renewed for this long is run again
+    jobs_lease_seconds: float = 60.0
+    jobs_retention_seconds: int = 7 * 24 * 3600
+
+    # Near-duplicate lookup by perceptual hash (Hamming distance out of 64 bits)
+    perceptual_cache_enabled: bool = False
+    perceptual_hash_max_distance: int = 4
+
+    # Generated ICS files, stored by content hash (0 disables a limit)
+    artifacts_dir: Path = Path(tempfile.gettempdir()) / "ics_artifacts"
+    artifacts_ttl_seconds: int = 7 * 24 * 3600
+    artifacts_max_bytes: int = 200 * 1024 * 1024
+    artifacts_janitor_interval_seconds: float = 600.0
 
     # ICS generation settings
     default_timezone: str = "UTC"
     calendar_prodid: str = "-//Calendar Generator//Event Extractor//EN"
     calendar_version: str = "2.0"
+    # "icalendar" builds a Calendar object graph, "streaming" writes lines directly
+    ics_serializer: str = "icalendar"
 
     # FastAPI settings
     app_title: str = "Calendar Event Extractor"
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from typing import Optional, Tuple
+from src.artifacts import run_janitor
+from src.config import settings
+from src.jobs import JobRunner, JobStore
+from src.services.claude_service import AsyncClaudeService
+from src.services.ics_service import ICSService
+
+
+JOBS_DB_FILENAME = "jobs.sqlite3"
+
+
+class _shared:
+    """
+    Like functools.cached_property, but built only once even if first used
+    from several threads at the same time (the startup thread and a request).
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with instance._lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.factory(instance)
+        return instance.__dict__[self.name]
+
+
+class Services:
+    """
+    The services shared by all requests, built on first use.
+
+    Building them opens the cache, lease and job databases and creates their
+    directories, so none of it happens at import time. The app lifespan calls
+    start() in the background: the process answers health checks at once,
+    and ready turns true once every service is built, the Anthropic
+    connection pool is warm and the background tasks are running. Requests
+    that arrive earlier build what they need themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._janitor: Optional[asyncio.Task] = None
+        self.ready = False
+
+    @_shared
+    def claude(self) -> AsyncClaudeService:
+        return AsyncClaudeService()
+
+    @_shared
+    def ics(self) -> ICSService:
+        return ICSService()
+
+    @_shared
+    def job_store(self) -> JobStore:
+        return JobStore(settings.jobs_dir / JOBS_DB_FILENAME, settings.jobs_lease_seconds)
+
+    @_shared
+    def job_runner(self) -> JobRunner:
+        return JobRunner(
+            self.job_store,
+            self.run_extraction_job,
+            workers=settings.jobs_workers,
+            poll_interval=settings.jobs_poll_interval_seconds,
+        )
+
+    async def run_extraction_job(self, image_data: bytes, filename: str) -> Tuple[str, str, int]:
+        """Extract events for a background job and render them as ICS."""
+        extracted_text = await self.claude.extract_events_from_bytes(image_data, filename)
+        ics_content, events_count = self.ics.create_ics_from_text(extracted_text)
+        return extracted_text, ics_content, events_count
+
+    def _build(self) -> None:
+        """Build every service; imports the heavy dependencies as a side effect."""
+        self.claude, self.ics, self.job_runner
+
+    async def start(self) -> None:
+        """Build the services, warm them up and start the background tasks."""
+        await asyncio.to_thread(self._build)
+        await self.claude.warm_up()
+        await asyncio.to_thread(
+            self.job_store.purge_finished_older_than,
+            time.time() - settings.jobs_retention_seconds,
+        )
+        await self.job_runner.start()
+        self._janitor = asyncio.ensure_future(
+            run_janitor(self.ics.artifacts, settings.artifacts_janitor_interval_seconds)
+        )
+        self.ready = True
+
+    async def stop(self) -> None:
+        """Stop the background tasks started by start()."""
+        self.ready = False
+        if self._janitor is not None:
+            self._janitor.cancel()
+            self._janitor = None
+        if "job_runner" in self.__dict__:
+            await self.job_runner.stop()
+
+
+services = Services()
+
+
+def get_claude_service() -> AsyncClaudeService:
+    return services.claude
+
+
+def get_ics_service() -> ICSService:
+    return services.ics
+
+
+def get_job_store() -> JobStore:
+    return services.job_store
+
+
+def get_job_runner() -> JobRunner:
+    return services.job_runner
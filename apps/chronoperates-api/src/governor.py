@@ -0,0 +1,376 @@
+import asyncio
+import contextlib
+import math
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+# Responses meaning the API is shedding load: rate limited, overloaded
+THROTTLE_STATUSES = frozenset([429, 529])
+# Responses worth retrying; the others will fail the same way again
+RETRY_STATUSES = THROTTLE_STATUSES | {408, 409, 500, 502, 503, 504}
+
+
+class UpstreamBusyError(Exception):
+    """The upstream API, or the queue in front of it, cannot take more work right now."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an API error, or None for connection errors and others."""
+    return getattr(error, "status_code", None)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Seconds the server asked us to wait, from the retry-after-ms or
+    retry-after header of the error's response, if it has any.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    try:
+        return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    A rate limit of so many units per minute, with a burst of one minute's worth.
+
+    Callers reserve units in arrival order and the balance may go negative;
+    each caller then waits until its reservation is covered. Usage only known
+    afterwards, like tokens billed for a request, is charged the same way and
+    delays the callers that come after it.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.balance = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.balance = min(self.capacity, self.balance + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def charge(self, amount: float) -> None:
+        """Take amount from the balance without waiting."""
+        self._refill()
+        self.balance -= amount
+
+    def delay(self) -> float:
+        """Seconds until the balance is no longer negative."""
+        self._refill()
+        return max(-self.balance, 0.0) / self.rate
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Reserve amount, waiting until the balance covers it."""
+        self.charge(amount)
+        try:
+            await asyncio.sleep(self.delay())
+        except asyncio.CancelledError:
+            self.balance += amount
+            raise
+
+
+class AIMDLimiter:
+    """
+    A concurrency limit that adapts to the upstream's capacity.
+
+    Each success raises the limit by 1/limit, so about one more slot per
+    limit's worth of successful calls (additive increase), and each
+    throttled call halves it (multiplicative decrease). Calls started before
+    the last decrease do not decrease it again, so a burst of throttled
+    calls that were already in flight counts once.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, backoff: float = 0.5):
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.backoff = backoff
+        self.in_use = 0
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def waiting(self) -> int:
+        return sum(not waiter.done() for waiter in self._waiters)
+
+    async def acquire(self) -> float:
+        """
+        Wait for a free slot, first come first served.
+
+        Returns:
+            When the slot was taken, to pass to on_throttle
+        """
+        if self.in_use < int(self.limit) and not self.waiting():
+            self.in_use += 1
+            return time.monotonic()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        return time.monotonic()
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_throttle(self, started: float) -> None:
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * self.backoff)
+        self._last_decrease = time.monotonic()
+        self.decreases += 1
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_use += 1
+                waiter.set_result(None)
+
+
+class UpstreamGovernor:
+    """
+    Keep calls to an upstream API within its limits, and back off when it pushes back.
+
+    Every call takes a slot from an AIMD concurrency limit and is then held
+    back by the optional requests-per-minute and tokens-per-minute buckets.
+    A throttled call shrinks the limit and, if the response says when to
+    come back, pauses every call until then. Calls that fail in a way worth
+    retrying are retried with jittered exponential backoff, or after the
+    retry-after the server sent. A request is admitted once, however many
+    calls it makes; when too many requests are already in progress, whether
+    waiting for a slot, in flight or backing off before a retry, or the
+    server keeps throttling, UpstreamBusyError is raised so the caller can
+    ask its own client to come back later instead of piling on.
+    """
+
+    def __init__(
+        self,
+        limiter: AIMDLimiter,
+        requests: Optional[TokenBucket] = None,
+        tokens: Optional[TokenBucket] = None,
+        max_queue: int = 0,
+        max_retries: int = 0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        """
+        Args:
+            limiter: Concurrency limit for calls in flight
+            requests: Optional bucket of requests per minute
+            tokens: Optional bucket of tokens per minute, charged with charge_tokens
+            max_queue: Requests allowed in progress before new ones are
+                rejected (0 for no limit)
+            max_retries: Retries of a failed call
+            backoff_base: Backoff ceiling of the first retry, in seconds
+            backoff_max: Longest backoff, and longest retry-after honoured
+                before giving up, in seconds
+            retry_on: Exception types to retry besides HTTP errors with a
+                status in RETRY_STATUSES, e.g. connection errors
+        """
+        self.limiter = limiter
+        self.requests = requests
+        self.tokens = tokens
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_on = retry_on
+        # Admitted requests not finished yet, and calls waiting for a slot
+        self.active = 0
+        self.queued = 0
+        self._paused_until = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.retries = 0
+
+    @contextlib.contextmanager
+    def admission(self) -> Iterator[None]:
+        """
+        Count a request as in progress for the duration of the block, across
+        all the calls it makes, their attempts and the backoff between them.
+
+        Raises:
+            UpstreamBusyError: If max_queue requests are already in progress
+        """
+        if self.max_queue and self.active >= self.max_queue:
+            self.rejected += 1
+            raise UpstreamBusyError(
+                f"Too many requests in progress for the upstream API ({self.active})",
+                retry_after=self.retry_after_hint(),
+            )
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+    def retry_after_hint(self) -> float:
+        """Seconds a rejected client should wait: the pause, or the request bucket's backlog."""
+        waits = [self._paused_until - time.monotonic(), 1.0]
+        if self.requests is not None:
+            waits.append(self.requests.delay())
+        return max(waits)
+
+    def charge_tokens(self, tokens: int) -> None:
+        """Charge the tokens a finished call was billed to the tokens bucket."""
+        if self.tokens is not None:
+            self.tokens.charge(tokens)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold a slot for one attempt of a call, after any pause and rate limits.
+
+        A throttling error raised in the block shrinks the concurrency limit
+        and pauses new attempts for its retry-after; leaving the block
+        normally counts as a success.
+        """
+        self.queued += 1
+        try:
+            while (pause := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+            started = await self.limiter.acquire()
+        finally:
+            self.queued -= 1
+
+        try:
+            if self.requests is not None:
+                await self.requests.acquire()
+            if self.tokens is not None:
+                await asyncio.sleep(self.tokens.delay())
+            yield
+        except Exception as e:
+            if status_code(e) in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.limiter.on_throttle(started)
+                retry_after = retry_after_seconds(e)
+                if retry_after is not None:
+                    self._paused_until = max(
+                        self._paused_until, time.monotonic() + min(retry_after, self.backoff_max)
+                    )
+            raise
+        else:
+            self.limiter.on_success()
+        finally:
+            self.limiter.release()
+
+    def retry_delay(self, error: BaseException, attempt: int) -> float:
+        """
+        Seconds to wait before retrying a failed attempt.
+
+        Args:
+            error: What the attempt raised
+            attempt: Number of the failed attempt, from 0
+
+        Returns:
+            The server's retry-after plus a little jitter if it sent one,
+            otherwise a random backoff up to backoff_base * 2 ** attempt
+
+        Raises:
+            error: If it is not worth retrying
+            UpstreamBusyError: If a throttled call is out of retries, or the
+                server asked for a longer wait than backoff_max
+        """
+        status = status_code(error)
+        retryable = status in RETRY_STATUSES or isinstance(error, self.retry_on)
+        if not retryable:
+            raise error
+
+        retry_after = retry_after_seconds(error)
+        throttled = status in THROTTLE_STATUSES
+        if attempt >= self.max_retries or (retry_after or 0) > self.backoff_max:
+            if throttled:
+                raise UpstreamBusyError(
+                    f"Upstream API is throttling requests ({status})",
+                    retry_after=max(retry_after or 0, self.retry_after_hint()),
+                ) from error
+            raise error
+
+        self.retries += 1
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn through the governor, retrying it as retry_delay says.
+
+        The request the call is made for should hold admission(), so that
+        its calls, e.g. one per tile, count against max_queue once.
+
+        Args:
+            fn: Zero-argument coroutine function making one attempt
+
+        Returns:
+            The result of the first successful attempt
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot():
+                    return await fn()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_progress": self.active,
+            "in_flight": self.limiter.in_use,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "limit_decreases": self.limiter.decreases,
+        }
+
+
+def retry_after_header(seconds: float) -> str:
+    """A Retry-After header value: whole seconds, rounded up, at least 1."""
+    return str(max(math.ceil(seconds), 1))
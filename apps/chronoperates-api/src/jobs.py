@@ -0,0 +1,386 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Tuple
+from src.cache.lease import pid_alive
+from src.cache.sqlite import connect
+from src.governor import UpstreamBusyError
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    image BLOB,
+    extracted_text TEXT,
+    ics_content TEXT,
+    events_found INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    hostname TEXT,
+    pid INTEGER,
+    owner TEXT,
+    expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at);
+"""
+
+# Columns added since the first version of the table, created on open
+ADDED_COLUMNS = {"owner": "TEXT", "expires_at": "REAL"}
+
+# Columns returned for a job; the image itself is only read when running it
+JOB_COLUMNS = (
+    "id, status, filename, extracted_text, ics_content, events_found, error, "
+    "created_at, updated_at"
+)
+
+
+@dataclass
+class Job:
+    """An extraction job as stored in the job store."""
+
+    id: str
+    status: str
+    filename: str
+    extracted_text: Optional[str]
+    ics_content: Optional[str]
+    events_found: int
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+
+class JobStore:
+    """
+    Persistent extraction jobs in a SQLite table.
+
+    The uploaded image is kept with a job until it finishes, so queued and
+    interrupted jobs can be picked up again after a restart. Workers claim
+    jobs in an IMMEDIATE transaction, so several uvicorn workers can share
+    one store without running a job twice.
+
+    A claimed job is leased to the claiming store, identified by an owner
+    id unique to each process start, and the runner renews the lease while
+    the job runs. A running job whose lease has expired is claimed again,
+    whatever the pid it was claimed by: after a container restart, the new
+    process often has the same pid as the one that was killed.
+    """
+
+    def __init__(self, db_path: Path, lease_seconds: float = 60.0):
+        """
+        Args:
+            db_path: SQLite database file, created if missing
+            lease_seconds: How long a claimed job stays with this store
+                without its lease being renewed
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.hostname = socket.gethostname()
+        self.pid = os.getpid()
+        self.owner = f"{self.hostname}:{self.pid}:{uuid.uuid4().hex}"
+        self._lock = threading.Lock()
+        self._conn = connect(self.db_path)
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self) -> None:
+        """Bring a table created by an earlier version up to date."""
+        with self._lock, self._transaction():
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, column_type in ADDED_COLUMNS.items():
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+
+    @contextmanager
+    def _transaction(self):
+        """Run the enclosed statements in a single write transaction."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def create(self, filename: str, image_data: bytes) -> Job:
+        """Queue a new job for image_data and return it."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, image, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, filename, image_data, now, now),
+            )
+        return Job(job_id, QUEUED, filename, None, None, 0, None, now, now)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return Job(*row) if row else None
+
+    def claim(self) -> Optional[Tuple[Job, bytes]]:
+        """
+        Lease the oldest queued job, or running job whose lease has expired,
+        to this store and mark it as running.
+
+        Returns:
+            The claimed job and its image, or None if there is nothing to run
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._conn.execute(
+                f"SELECT {JOB_COLUMNS}, image FROM jobs "
+                "WHERE status = ? OR (status = ? AND IFNULL(expires_at, 0) < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, hostname = ?, pid = ?, owner = ?, "
+                "expires_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, self.hostname, self.pid, self.owner,
+                 now + self.lease_seconds, now, row[0]),
+            )
+
+        job = Job(*row[:-1])
+        job.status = RUNNING
+        job.updated_at = now
+        return job, row[-1]
+
+    def succeed(
+        self, job_id: str, extracted_text: str, ics_content: str, events_found: int
+    ) -> bool:
+        """Store the result of a job we are running and drop its image. Returns False if it was lost."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, extracted_text = ?, ics_content = ?, "
+                "events_found = ?, image = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (SUCCEEDED, extracted_text, ics_content, events_found, time.time(),
+                 job_id, RUNNING, self.owner),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, error: str) -> bool:
+        """Record why a job we are running failed and drop its image. Returns False if it was lost."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, image = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (FAILED, error, time.time(), job_id, RUNNING, self.owner),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id: str) -> bool:
+        """Extend the lease on a job we are running. Returns False if it was lost."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET expires_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (time.time() + self.lease_seconds, job_id, RUNNING, self.owner),
+            )
+        return cursor.rowcount == 1
+
+    def requeue(self, job_id: str) -> None:
+        """Put a job we are running back in the queue, e.g. on shutdown."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, hostname = NULL, pid = NULL, owner = NULL, "
+                "expires_at = NULL, updated_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (QUEUED, time.time(), job_id, RUNNING, self.owner),
+            )
+
+    def recover_interrupted(self) -> int:
+        """
+        Requeue running jobs whose lease has expired, and those left by a
+        process on this host that has exited.
+
+        Returns:
+            Number of jobs requeued
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            rows = self._conn.execute(
+                "SELECT id, hostname, pid, owner, expires_at FROM jobs WHERE status = ?",
+                (RUNNING,),
+            ).fetchall()
+            interrupted = [
+                (QUEUED, job_id)
+                for job_id, hostname, pid, owner, expires_at in rows
+                if (expires_at or 0) < now
+                or (hostname == self.hostname and owner != self.owner and not pid_alive(pid))
+            ]
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, hostname = NULL, pid = NULL, owner = NULL, "
+                "expires_at = NULL WHERE id = ?",
+                interrupted,
+            )
+        return len(interrupted)
+
+    def purge_finished_older_than(self, cutoff: float) -> int:
+        """Delete finished jobs last updated before cutoff. Returns number removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, cutoff),
+            )
+        return cursor.rowcount
+
+    def count_by_status(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)} | dict(rows)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+JobHandler = Callable[[bytes, str], Awaitable[Tuple[str, str, int]]]
+
+
+class JobRunner:
+    """
+    Pool of asyncio workers that run queued jobs from a JobStore.
+
+    Workers wake up as soon as a job is submitted in this process and poll
+    the store otherwise, which also picks up jobs queued by other processes
+    or left over from before a restart. While a job runs, its lease in the
+    store is renewed every third of the lease time.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        workers: int,
+        poll_interval: float,
+    ):
+        """
+        Args:
+            store: Where jobs are claimed from and results written to
+            handler: Coroutine function taking (image_data, filename) and
+                returning (extracted_text, ics_content, events_found)
+            workers: Number of jobs run at once
+            poll_interval: Seconds between store polls while idle
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: List["asyncio.Task"] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """Requeue interrupted jobs and start the workers."""
+        recovered = await asyncio.to_thread(self.store.recover_interrupted)
+        if recovered:
+            print(f"Requeued {recovered} interrupted job(s)")
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.ensure_future(self._work()) for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running go back in the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was submitted."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self) -> None:
+        while True:
+            job = None
+            try:
+                claimed = await asyncio.to_thread(self.store.claim)
+                if claimed is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+
+                job, image_data = claimed
+                heartbeat = asyncio.ensure_future(self._keep_lease(job.id))
+                try:
+                    await self._run(job, image_data)
+                except asyncio.CancelledError:
+                    await asyncio.to_thread(self.store.requeue, job.id)
+                    raise
+                finally:
+                    heartbeat.cancel()
+
+            except Exception as e:
+                # E.g. the database is locked; a job left running is
+                # claimed again once its lease expires
+                job_note = f" on job {job.id}" if job is not None else ""
+                print(f"Job worker error{job_note}: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _keep_lease(self, job_id: str) -> None:
+        """Renew the lease on a running job until cancelled, or until it is lost."""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            if not await asyncio.to_thread(self.store.renew, job_id):
+                print(f"Lost the lease on job {job_id} to another worker")
+                return
+
+    async def _run(self, job: Job, image_data: bytes) -> None:
+        try:
+            extracted_text, ics_content, events_found = await self.handler(
+                image_data, job.filename
+            )
+
+        except UpstreamBusyError as e:
+            # Overload is transient; the job runs again once the API has recovered
+            await asyncio.sleep(e.retry_after)
+            await asyncio.to_thread(self.store.requeue, job.id)
+            return
+
+        except ValueError as e:
+            recorded = await asyncio.to_thread(
+                self.store.fail, job.id, f"Invalid input: {str(e)}"
+            )
+
+        except Exception as e:
+            recorded = await asyncio.to_thread(
+                self.store.fail, job.id, f"Extraction failed: {str(e)}"
+            )
+
+        else:
+            recorded = await asyncio.to_thread(
+                self.store.succeed, job.id, extracted_text, ics_content, events_found
+            )
+
+        if not recorded:
+            print(f"Dropped the result of job {job.id}: its lease was taken by another worker")
@@ -0,0 +1,29 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return a module that is only executed on first attribute access.
+
+    Used for heavy dependencies (anthropic, PIL, icalendar) so that importing
+    the app, and answering health checks, does not wait for them. A module
+    that is already imported is returned as is.
+
+    Raises:
+        ModuleNotFoundError: If the module cannot be found
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -1,18 +1,69 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile
-from fastapi.responses import JSONResponse, FileResponse
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import tempfile
 from pathlib import Path
 from src.config import settings
-from src.models import ProcessImageRequest, ProcessImageResponse, ErrorResponse
-from src.services.claude_service import ClaudeService
-from src.services.ics_service import ICSService
+from src.dependencies import (
+    get_claude_service,
+    get_ics_service,
+    get_job_runner,
+    get_job_store,
+    services,
+)
+from src.governor import UpstreamBusyError, retry_after_header
+from src.jobs import SUCCEEDED, Job, JobRunner, JobStore
+from src.metrics import CACHE_STATS, JOBS, REGISTRY, RequestMetricsMiddleware, stage
+from src.models import (
+    BatchImageResult,
+    BatchUploadResponse,
+    ErrorResponse,
+    JobResponse,
+    ProcessImageRequest,
+    ProcessImageResponse,
+)
+from src.services.claude_service import AsyncClaudeService
+from src.services.ics_service import NO_EVENTS_MARKER, ICSService, IncrementalEventParser
+from src.uploads import (
+    UploadError,
+    UploadTooLargeError,
+    UploadedFile,
+    read_multipart_files,
+)
+
+
+def _report_startup_failure(startup: asyncio.Task) -> None:
+    if not startup.cancelled() and startup.exception() is not None:
+        print(f"Service startup failed: {startup.exception()!r}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build and warm up the services in the background for the lifetime of the app.
+
+    Startup does not wait for them, so the process answers GET / as soon as
+    it is up; GET /ready reports when the services are warmed.
+    """
+    startup = asyncio.ensure_future(services.start())
+    startup.add_done_callback(_report_startup_failure)
+    try:
+        yield
+    finally:
+        startup.cancel()
+        await asyncio.gather(startup, return_exceptions=True)
+        await services.stop()
 
 
 app = FastAPI(
     title=settings.app_title,
     description=settings.app_description,
     version=settings.app_version,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -22,63 +73,185 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+
+SINGLE_IMAGE_UPLOAD = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+def _content_length(request: Request) -> Optional[int]:
+    """
+    The declared body size of a request, if it sent one.
+
+    Raises:
+        HTTPException: 400 if the Content-Length header is not a byte count
+    """
+    value = request.headers.get("content-length")
+    if value is None:
+        return None
+    if not (value.isascii() and value.isdigit()):
+        raise HTTPException(status_code=400, detail=f"Invalid Content-Length header: {value!r}")
+    return int(value)
+
+
+async def _read_multipart_upload(request: Request, max_files: int) -> List[UploadedFile]:
+    """
+    Stream the files of a multipart request, up to max_files of them.
+
+    Raises:
+        HTTPException: 413 for oversized uploads, 400 for malformed uploads
+            or a bad Content-Length header
+    """
+    try:
+        with stage("upload"):
+            return await read_multipart_files(
+                request.headers.get("content-type", ""),
+                request.stream(),
+                max_file_bytes=settings.max_file_size_mb * 1024 * 1024,
+                max_files=max_files,
+                content_length=_content_length(request),
+            )
+
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {str(e)}")
 
-claude_service = ClaudeService()
-ics_service = ICSService()
+
+async def _read_image_upload(request: Request) -> UploadedFile:
+    """
+    Stream a single image from the "file" field of a multipart request.
+
+    Raises:
+        HTTPException: 413 for oversized uploads, 400 for malformed or
+            non-image uploads, 422 if the file field is missing
+    """
+    files = await _read_multipart_upload(request, max_files=1)
+    file = next((f for f in files if f.field_name == "file"), None)
+    if file is None:
+        raise HTTPException(status_code=422, detail="Missing file upload")
+
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=400, detail="File must be an image (JPEG, PNG, BMP, WebP)"
+        )
+
+    return file
+
+
+def _upstream_busy(e: UpstreamBusyError) -> HTTPException:
+    """A 503 telling the client when to come back, so it does not retry at once."""
+    return HTTPException(
+        status_code=503,
+        detail=f"Service busy: {str(e)}",
+        headers={"Retry-After": retry_after_header(e.retry_after)},
+    )
 
 
 @app.get("/")
 async def root():
-    """Health check endpoint."""
+    """Health check endpoint; answers as soon as the process is up."""
     return {"message": "Calendar Event Extractor API is running"}
 
 
-@app.post("/upload-image")
-async def upload_image(file: UploadFile = File(...)):
+@app.get("/ready")
+async def ready():
+    """Readiness check: 200 once the services are built and warmed up, 503 before."""
+    if not services.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
+
+@app.get("/cache/stats")
+async def cache_stats(claude_service: AsyncClaudeService = Depends(get_claude_service)):
+    """Response cache hit/miss/eviction counters per tier."""
+    # Counting entries queries the disk and near-duplicate cache databases
+    return await asyncio.to_thread(claude_service.cache_stats)
+
+
+def _read_gauges(claude_service: AsyncClaudeService, job_store: JobStore) -> None:
+    """Copy the cache tier counters and job counts into their gauges."""
+    for tier, stats in claude_service.cache_stats().items():
+        for name, value in stats.items():
+            if isinstance(value, (int, float)):
+                CACHE_STATS.set(value, tier=tier, stat=name)
+
+    for status, count in job_store.count_by_status().items():
+        JOBS.set(count, status=status)
+
+
+@app.get("/metrics")
+async def metrics(
+    claude_service: AsyncClaudeService = Depends(get_claude_service),
+    job_store: JobStore = Depends(get_job_store),
+):
+    """Stage latencies, request latencies and counters in the Prometheus text format."""
+    await asyncio.to_thread(_read_gauges, claude_service, job_store)
+    return Response(
+        content=REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.post("/upload-image", openapi_extra=SINGLE_IMAGE_UPLOAD)
+async def upload_image(
+    request: Request,
+    claude_service: AsyncClaudeService = Depends(get_claude_service),
+    ics_service: ICSService = Depends(get_ics_service),
+):
     """
     Upload an image file and extract calendar events, returning ICS content and file path.
 
+    The multipart body is streamed chunk-by-chunk into memory and hashed as it
+    arrives; oversized uploads are rejected as soon as they cross the limit.
+
     Args:
-        file: Uploaded image file
+        request: Multipart request with the image in the "file" field
 
     Returns:
         ProcessImageResponse with ICS content, file path, and metadata
     """
     try:
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(
-                status_code=400, detail="File must be an image (JPEG, PNG, BMP, WebP)"
-            )
-
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=Path(file.filename or "image").suffix
-        ) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
+        file = await _read_image_upload(request)
 
-            temp_image_path = tmp_file.name
-
-        try:
-            extracted_text = claude_service.extract_events_from_image(temp_image_path)
+        extracted_text = await claude_service.extract_events_from_bytes(
+            bytes(file.data), file.filename or "image", file.content_hash
+        )
 
-            ics_content, ics_file_path, events_count = (
-                ics_service.create_ics_file_from_text(extracted_text)
-            )
+        ics_content, ics_file_path, events_count = (
+            ics_service.create_ics_file_from_text(extracted_text)
+        )
 
-            return ProcessImageResponse(
-                ics_content=ics_content,
-                ics_file_path=str(ics_file_path),
-                extracted_text=extracted_text,
-                events_found=events_count,
-            )
+        return ProcessImageResponse(
+            ics_content=ics_content,
+            ics_file_path=str(ics_file_path),
+            **_artifact_fields(ics_service, ics_file_path),
+            extracted_text=extracted_text,
+            events_found=events_count,
+        )
 
-        finally:
-            Path(temp_image_path).unlink(missing_ok=True)
+    except HTTPException:
+        raise
 
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Image file not found: {str(e)}")
 
+    except UpstreamBusyError as e:
+        raise _upstream_busy(e)
+
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
 
@@ -86,30 +259,367 @@ async def upload_image(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@app.get("/download-ics")
-async def download_ics(file_path: str):
+ICS_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _artifact_fields(ics_service: ICSService, ics_file_path: Path) -> dict:
+    """ics_id and ics_url for a file saved in the ICS artifact store."""
+    ics_id = ics_service.artifacts.id_for_path(ics_file_path)
+    if ics_id is None:
+        return {}
+    return {"ics_id": ics_id, "ics_url": f"/ics/{ics_id}"}
+
+
+def _ics_artifact_response(request: Request, ics_id: str, path: Path) -> Response:
+    """Serve a stored ICS file with a strong ETag, answering 304 when it matches."""
+    etag = f'"{ics_id}"'
+    headers = {"ETag": etag, "Cache-Control": ICS_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path=str(path),
+        media_type="text/calendar",
+        filename="calendar_events.ics",
+        headers=headers,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_extraction(
+    first_chunk: str, chunks: AsyncIterator[str], ics_service: ICSService
+) -> AsyncIterator[str]:
     """
-    Download an ICS file by file path.
+    Turn streamed Claude text into SSE messages.
+
+    Emits an "event" message for each event as soon as its block is complete,
+    then a "done" message with the same fields as ProcessImageResponse, or an
+    "error" message if the extraction fails part-way.
+    """
+    parser = IncrementalEventParser()
+    text_parts = [first_chunk]
+    events = parser.feed(first_chunk)
+
+    try:
+        for event in events:
+            yield _sse("event", event)
+
+        async for chunk in chunks:
+            text_parts.append(chunk)
+            for event in parser.feed(chunk):
+                yield _sse("event", event)
+
+        extracted_text = "".join(text_parts)
+        if NO_EVENTS_MARKER not in extracted_text:
+            for event in parser.close():
+                yield _sse("event", event)
+
+        ics_content, ics_file_path, events_count = (
+            ics_service.create_ics_file_from_text(extracted_text)
+        )
+        done = ProcessImageResponse(
+            ics_content=ics_content,
+            ics_file_path=str(ics_file_path),
+            **_artifact_fields(ics_service, ics_file_path),
+            extracted_text=extracted_text,
+            events_found=events_count,
+        )
+        yield _sse("done", done.model_dump())
+
+    except Exception as e:
+        yield _sse("error", {"detail": f"Internal server error: {str(e)}"})
+
+
+@app.post("/upload-image/stream", openapi_extra=SINGLE_IMAGE_UPLOAD)
+async def upload_image_stream(
+    request: Request,
+    claude_service: AsyncClaudeService = Depends(get_claude_service),
+    ics_service: ICSService = Depends(get_ics_service),
+):
+    """
+    Upload an image and stream the extracted events back as Server-Sent Events.
+
+    Each event is sent as an "event" message as soon as Claude has finished
+    writing it, followed by a "done" message carrying the complete ICS
+    content. Upload and validation errors are returned as regular HTTP
+    errors before the stream starts.
 
     Args:
-        file_path: Path to the ICS file
+        request: Multipart request with the image in the "file" field
 
     Returns:
-        FileResponse with the ICS file
+        text/event-stream response
+    """
+    try:
+        file = await _read_image_upload(request)
+
+        chunks = claude_service.stream_events_from_bytes(
+            bytes(file.data), file.filename or "image", file.content_hash
+        )
+        # Wait for the first chunk so validation and API errors still get a status code
+        first_chunk = await anext(chunks, "")
+
+    except HTTPException:
+        raise
+
+    except UpstreamBusyError as e:
+        raise _upstream_busy(e)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    return StreamingResponse(
+        _stream_extraction(first_chunk, chunks, ics_service),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _extract_batch_image(
+    file: UploadedFile, limiter: asyncio.Semaphore, claude_service: AsyncClaudeService
+) -> Tuple[BatchImageResult, Optional[str]]:
+    """Extract one image of a batch, turning failures into an error result."""
+    filename = file.filename or "image"
+    start = time.perf_counter()
+    extracted_text = None
+    error = None
+
+    try:
+        if not file.content_type or not file.content_type.startswith("image/"):
+            raise ValueError("File must be an image (JPEG, PNG, BMP, WebP)")
+
+        extracted_text = await claude_service.extract_events_from_bytes(
+            bytes(file.data), filename, file.content_hash, limiter=limiter
+        )
+
+    except ValueError as e:
+        error = f"Invalid input: {str(e)}"
+
+    except Exception as e:
+        error = f"Extraction failed: {str(e)}"
+
+    result = BatchImageResult(
+        filename=filename,
+        status="error" if error else "ok",
+        extracted_text=extracted_text,
+        error=error,
+        duration_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+    return result, extracted_text
+
+
+@app.post(
+    "/upload-images",
+    response_model=BatchUploadResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "files": {
+                                "type": "array",
+                                "items": {"type": "string", "format": "binary"},
+                            }
+                        },
+                        "required": ["files"],
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_images(
+    request: Request,
+    claude_service: AsyncClaudeService = Depends(get_claude_service),
+    ics_service: ICSService = Depends(get_ics_service),
+):
     """
+    Upload several images and merge the events from all of them into one ICS file.
+
+    All images are validated and hashed concurrently, while at most
+    settings.batch_max_concurrency of them are extracted by Claude at a time.
+    An image that fails is reported in its own result and does not fail the
+    rest of the batch.
+
+    Args:
+        request: Multipart request with the images in repeated "files" fields
+
+    Returns:
+        BatchUploadResponse with the merged ICS content and per-image results
+    """
+    files = await _read_multipart_upload(request, max_files=settings.batch_max_files)
+    files = [f for f in files if f.field_name == "files"]
+    if not files:
+        raise HTTPException(status_code=422, detail="Missing file uploads")
+
+    limiter = asyncio.Semaphore(settings.batch_max_concurrency)
+    outcomes = await asyncio.gather(
+        *(_extract_batch_image(file, limiter, claude_service) for file in files)
+    )
+
     try:
-        ics_path = Path(file_path)
-        if not ics_path.exists():
-            raise HTTPException(status_code=404, detail="ICS file not found")
-
-        return FileResponse(
-            path=str(ics_path),
-            media_type="text/calendar",
-            filename="calendar_events.ics",
+        extracted_texts = [text for _, text in outcomes if text is not None]
+        ics_content, ics_file_path, events_counts = (
+            ics_service.create_ics_file_from_texts(extracted_texts)
         )
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error downloading file: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    results = [result for result, _ in outcomes]
+    succeeded = [result for result in results if result.status == "ok"]
+    for result, events_count in zip(succeeded, events_counts):
+        result.events_found = events_count
+
+    return BatchUploadResponse(
+        ics_content=ics_content,
+        ics_file_path=str(ics_file_path),
+        **_artifact_fields(ics_service, ics_file_path),
+        events_found=sum(events_counts),
+        succeeded=len(succeeded),
+        failed=len(results) - len(succeeded),
+        images=results,
+    )
+
+
+def _job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        status=job.status,
+        filename=job.filename,
+        events_found=job.events_found,
+        extracted_text=job.extracted_text,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+@app.post(
+    "/jobs",
+    status_code=202,
+    response_model=JobResponse,
+    openapi_extra=SINGLE_IMAGE_UPLOAD,
+)
+async def create_job(
+    request: Request,
+    job_store: JobStore = Depends(get_job_store),
+    job_runner: JobRunner = Depends(get_job_runner),
+):
+    """
+    Queue an image for extraction in the background and return the job immediately.
+
+    Poll GET /jobs/{job_id} until the status is "succeeded" or "failed",
+    then fetch the calendar from GET /jobs/{job_id}/ics. Jobs are persisted,
+    so queued and interrupted jobs resume after a restart.
+
+    Args:
+        request: Multipart request with the image in the "file" field
+
+    Returns:
+        JobResponse for the queued job
+    """
+    file = await _read_image_upload(request)
+    job = await asyncio.to_thread(
+        job_store.create, file.filename or "image", bytes(file.data)
+    )
+    job_runner.notify()
+    return _job_response(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, job_store: JobStore = Depends(get_job_store)):
+    """Status of a background extraction job, with the extracted text once done."""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+
+@app.get("/jobs/{job_id}/ics")
+async def get_job_ics(job_id: str, job_store: JobStore = Depends(get_job_store)):
+    """
+    Download the calendar produced by a finished job.
+
+    Returns:
+        The ICS file, 404 for unknown jobs, or 409 while the job is not
+        finished or if it failed
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status != SUCCEEDED:
+        detail = f"Job is {job.status}"
+        if job.error:
+            detail += f": {job.error}"
+        raise HTTPException(status_code=409, detail=detail)
+
+    return Response(
+        content=job.ics_content,
+        media_type="text/calendar",
+        headers={"Content-Disposition": 'attachment; filename="calendar_events.ics"'},
+    )
+
+
+@app.get("/ics/{ics_id}")
+async def get_ics(
+    ics_id: str, request: Request, ics_service: ICSService = Depends(get_ics_service)
+):
+    """
+    Download a generated ICS file by its id.
+
+    The content behind an id never changes, so responses carry a strong
+    ETag and a one-year immutable Cache-Control, and a matching
+    If-None-Match is answered with 304.
+
+    Args:
+        ics_id: The ics_id returned when the calendar was generated
+
+    Returns:
+        FileResponse with the ICS file
+    """
+    path = ics_service.artifacts.path(ics_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="ICS file not found")
+    return _ics_artifact_response(request, ics_id, path)
+
+
+@app.get("/download-ics")
+async def download_ics(
+    file_path: str, request: Request, ics_service: ICSService = Depends(get_ics_service)
+):
+    """
+    Download an ICS file by file path.
+
+    Kept for clients that still send ics_file_path. Only files in the ICS
+    artifact store are served; any other path is reported as not found.
+
+    Args:
+        file_path: Path to the ICS file, as returned in ics_file_path
+
+    Returns:
+        FileResponse with the ICS file
+    """
+    ics_id = ics_service.artifacts.id_for_path(Path(file_path))
+    # The janitor may remove the file between the two lookups
+    path = ics_service.artifacts.path(ics_id) if ics_id is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="ICS file not found")
+    return _ics_artifact_response(request, ics_id, path)
 
 
 # Keep the original endpoint for backward compatibility
@@ -120,9 +630,14 @@ async def download_ics(file_path: str):
         400: {"model": ErrorResponse, "description": "Bad Request"},
         404: {"model": ErrorResponse, "description": "File Not Found"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"},
+        503: {"model": ErrorResponse, "description": "Upstream API Busy"},
     },
 )
-async def process_image(request: ProcessImageRequest):
+async def process_image(
+    request: ProcessImageRequest,
+    claude_service: AsyncClaudeService = Depends(get_claude_service),
+    ics_service: ICSService = Depends(get_ics_service),
+):
     """
     Extract calendar events from an image and return them in ICS format.
 
@@ -133,7 +648,7 @@ async def process_image(request: ProcessImageRequest):
         ProcessImageResponse with ICS content, file path, and metadata
     """
     try:
-        extracted_text = claude_service.extract_events_from_image(request.image_path)
+        extracted_text = await claude_service.extract_events_from_image(request.image_path)
 
         ics_content, ics_file_path, events_count = (
             ics_service.create_ics_file_from_text(extracted_text)
@@ -142,6 +657,7 @@ async def process_image(request: ProcessImageRequest):
         return ProcessImageResponse(
             ics_content=ics_content,
             ics_file_path=str(ics_file_path),
+            **_artifact_fields(ics_service, ics_file_path),
             extracted_text=extracted_text,
             events_found=events_count,
         )
@@ -149,6 +665,9 @@ async def process_image(request: ProcessImageRequest):
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Image file not found: {str(e)}")
 
+    except UpstreamBusyError as e:
+        raise _upstream_busy(e)
+
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
 
@@ -0,0 +1,306 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+# Upper bounds in seconds, from an in-memory cache hit to a slow Claude call
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """A named metric family with a fixed set of label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if len(labels) != len(self.labelnames) or set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {_escape(self.documentation)}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up, such as requests served or tokens used."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+
+
+class Gauge(Counter):
+    """A value that is set to its current reading, such as a cache size."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their count and sum."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: observations per bucket (the last one is +Inf), then the sum
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock seconds spent in the with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            return int(sum(series[:-1])) if series else 0
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+
+        names = self.labelnames + ("le",)
+        for key, values in series:
+            cumulative = 0
+            for bound, observed in zip(self.buckets + (float("inf"),), values):
+                cumulative += observed
+                labels = _format_labels(names, key + (_format_number(bound),))
+                yield f"{self.name}_bucket{labels} {int(cumulative)}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_count{labels} {int(cumulative)}"
+            yield f"{self.name}_sum{labels} {_format_number(values[-1])}"
+
+
+class MetricsRegistry:
+    """The metrics of one process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "chronoperates_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "chronoperates_stage_errors_total",
+    "Exceptions raised by each processing stage, by exception type",
+    ["stage", "error"],
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "chronoperates_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route", "status"],
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "chronoperates_response_cache_lookups_total",
+    "Response cache lookups for an image: hit, near_duplicate or miss",
+    ["result"],
+)
+CLAUDE_TOKENS = REGISTRY.counter(
+    "chronoperates_claude_tokens_total",
+    "Tokens billed by the Anthropic API, by kind and model",
+    ["kind", "model"],
+)
+CASCADE_TIER_SECONDS = REGISTRY.histogram(
+    "chronoperates_cascade_tier_duration_seconds",
+    "Time spent extracting an image on one model cascade tier",
+    ["model"],
+)
+CASCADE_SCORES = REGISTRY.histogram(
+    "chronoperates_cascade_score",
+    "Confidence score of each cascade tier's extraction",
+    ["model"],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.9, 1.0),
+)
+CASCADE_RESULTS = REGISTRY.counter(
+    "chronoperates_cascade_results_total",
+    "Cascade tier extractions: accepted, escalated to the next tier, or exhausted on the last",
+    ["model", "result"],
+)
+EVENTS_PER_IMAGE = REGISTRY.histogram(
+    "chronoperates_events_per_image",
+    "Events parsed from the text extracted from one image",
+    buckets=COUNT_BUCKETS,
+)
+CACHE_STATS = REGISTRY.gauge(
+    "chronoperates_cache_stat",
+    "Response cache counters and sizes by tier, read when /metrics is scraped",
+    ["tier", "stat"],
+)
+JOBS = REGISTRY.gauge(
+    "chronoperates_jobs",
+    "Background jobs in the job store by status, read when /metrics is scraped",
+    ["status"],
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a processing stage, counting the exceptions it raises by type."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=name, error=type(e).__name__)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by method, route and status.
+
+    Requests are labelled with the route template (e.g. /jobs/{job_id}) so
+    ids in paths do not create new series; unmatched paths share one label.
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route,
+                status=str(status),
+            )
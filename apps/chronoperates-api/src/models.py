@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class ProcessImageRequest(BaseModel):
@@ -25,6 +25,14 @@ class ProcessImageResponse(BaseModel):
         description="Path to the generated ICS file on disk",
         json_schema_extra={"examples": ["/tmp/events_abc123.ics"]},
     )
+    ics_id: Optional[str] = Field(
+        None, description="Content hash of the ICS file, for GET /ics/{ics_id}"
+    )
+    ics_url: Optional[str] = Field(
+        None,
+        description="Cacheable download URL of the ICS file",
+        json_schema_extra={"examples": ["/ics/9f86d081884c7d65..."]},
+    )
     extracted_text: Optional[str] = Field(
         None, description="Raw text extracted from the image by Claude"
     )
@@ -33,6 +41,67 @@ class ProcessImageResponse(BaseModel):
     )
 
 
+class BatchImageResult(BaseModel):
+    """Outcome of one image in a batch upload."""
+
+    filename: str = Field(..., description="Uploaded filename")
+    status: str = Field(..., description='"ok" or "error"')
+    events_found: int = Field(
+        default=0, description="Number of calendar events found in this image"
+    )
+    extracted_text: Optional[str] = Field(
+        None, description="Raw text extracted from the image by Claude"
+    )
+    error: Optional[str] = Field(None, description="Why this image failed")
+    duration_ms: float = Field(
+        ..., description="Time spent validating and extracting this image"
+    )
+
+
+class BatchUploadResponse(BaseModel):
+    """Response model for a batch of images merged into one calendar."""
+
+    ics_content: str = Field(
+        ..., description="ICS calendar with the events from every successful image"
+    )
+    ics_file_path: str = Field(
+        ..., description="Path to the generated ICS file on disk"
+    )
+    ics_id: Optional[str] = Field(
+        None, description="Content hash of the ICS file, for GET /ics/{ics_id}"
+    )
+    ics_url: Optional[str] = Field(
+        None, description="Cacheable download URL of the ICS file"
+    )
+    events_found: int = Field(
+        default=0, description="Total number of calendar events across all images"
+    )
+    succeeded: int = Field(default=0, description="Number of images extracted")
+    failed: int = Field(default=0, description="Number of images that failed")
+    images: List[BatchImageResult] = Field(
+        default_factory=list, description="Per-image results in upload order"
+    )
+
+
+class JobResponse(BaseModel):
+    """Status of a background extraction job."""
+
+    id: str = Field(..., description="Job id")
+    status: str = Field(
+        ..., description='One of "queued", "running", "succeeded" or "failed"'
+    )
+    filename: str = Field(..., description="Uploaded filename")
+    events_found: int = Field(
+        default=0, description="Number of calendar events found in the image"
+    )
+    extracted_text: Optional[str] = Field(
+        None, description="Raw text extracted from the image by Claude"
+    )
+    error: Optional[str] = Field(None, description="Why the job failed")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    updated_at: float = Field(..., description="Last status change (Unix seconds)")
+
+
 class ErrorResponse(BaseModel):
     """Error response model."""
 
@@ -1,25 +1,141 @@
+import asyncio
 import base64
+import contextlib
+import functools
 import hashlib
-import json
-import tempfile
+import importlib.util
+import inspect
+import mmap
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-from PIL import Image
-import anthropic
+from typing import AsyncIterator, List, Optional, Tuple
+from src.cache import (
+    create_lease_manager,
+    create_perceptual_index,
+    create_response_cache,
+    dhash,
+)
 from src.config import settings
+from src.governor import AIMDLimiter, TokenBucket, UpstreamGovernor
+from src.lazy import lazy_import
+from src.metrics import (
+    CACHE_LOOKUPS,
+    CASCADE_RESULTS,
+    CASCADE_SCORES,
+    CASCADE_TIER_SECONDS,
+    CLAUDE_TOKENS,
+    stage,
+)
+from src.services.ics_service import ICSService
+from src.services.image_preprocessor import ImagePreprocessor
+from src.services.image_tiler import split_image
+from src.services.image_validation import (
+    FORMAT_EXTENSIONS,
+    FORMAT_MEDIA_TYPES,
+    ImageInfo,
+    decode_image,
+    read_image_info,
+    sniff_format,
+)
+from src.singleflight import SingleFlight
+
+anthropic = lazy_import("anthropic")
+httpx = lazy_import("httpx")
+
+# Bump when the extraction prompt or the request layout changes in a way
+# that changes responses, so locally cached responses are not reused
+PROMPT_VERSION = "2"
+
+# The per-request user turn; the instructions are in the cached system prompt
+EXTRACTION_REQUEST = "Extract the calendar events from this image."
+TILE_EXTRACTION_REQUEST = (
+    "This image is one section of a larger image. "
+    "Extract the calendar events visible in it, even if they are cut off at its edges."
+)
+
+
+def _prompt_key(prompt: str) -> bytes:
+    """The prompt as it goes into local cache keys, tagged with PROMPT_VERSION."""
+    return f"v{PROMPT_VERSION}\n{prompt}".encode()
+
+
+def _cascade_models() -> List[str]:
+    """Models to try in order, cheapest first; a single model means no cascade."""
+    return list(settings.claude_cascade_models) or [settings.claude_model]
+
+
+@functools.cache
+def _sdk_accepts_temperature() -> bool:
+    """Whether the installed SDK's messages.create takes temperature; some releases do not."""
+    return "temperature" in inspect.signature(anthropic.resources.Messages.create).parameters
+
+
+def _connection_options() -> dict:
+    """Pool limits and protocol for the HTTP client behind the Anthropic SDK."""
+    http2 = settings.anthropic_http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        print("ANTHROPIC_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        http2 = False
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.anthropic_max_connections,
+            max_keepalive_connections=settings.anthropic_max_keepalive_connections,
+            keepalive_expiry=settings.anthropic_keepalive_expiry_seconds,
+        ),
+        "http2": http2,
+    }
+
+
+def _request_timeout() -> "anthropic.Timeout":
+    """Per-request timeout, with a shorter limit on opening a connection."""
+    return anthropic.Timeout(
+        settings.anthropic_timeout_seconds,
+        connect=settings.anthropic_connect_timeout_seconds,
+    )
+
+
+def _create_governor() -> UpstreamGovernor:
+    """The upstream governor configured by the upstream_* settings."""
+    return UpstreamGovernor(
+        AIMDLimiter(
+            settings.upstream_concurrency_initial,
+            settings.upstream_concurrency_min,
+            settings.upstream_concurrency_max,
+        ),
+        requests=TokenBucket(settings.upstream_requests_per_minute)
+        if settings.upstream_requests_per_minute else None,
+        tokens=TokenBucket(settings.upstream_tokens_per_minute)
+        if settings.upstream_tokens_per_minute else None,
+        max_queue=settings.upstream_max_queue,
+        max_retries=settings.upstream_max_retries,
+        backoff_base=settings.upstream_backoff_base_seconds,
+        backoff_max=settings.upstream_backoff_max_seconds,
+        retry_on=(anthropic.APIConnectionError,),
+    )
 
 
 class ClaudeService:
     """Service for interacting with Claude API to extract event information from images."""
 
     def __init__(self):
-        if settings.anthropic_api_key:
-            self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
-        else:
-            self.client = None
+        self.client = self._create_client()
+        self.preprocessor = ImagePreprocessor()
 
-        self.cache_dir = Path(tempfile.gettempdir()) / "claude_cache"
-        self.cache_dir.mkdir(exist_ok=True)
+        self.cache = create_response_cache()
+        self.cache_dir = settings.cache_dir
+
+    def _create_client(self):
+        """Create the Anthropic client, or None if no API key is configured."""
+        if not settings.anthropic_api_key:
+            return None
+        return anthropic.Anthropic(
+            api_key=settings.anthropic_api_key,
+            base_url=settings.anthropic_base_url,
+            timeout=_request_timeout(),
+            http_client=anthropic.DefaultHttpxClient(**_connection_options()),
+        )
 
     @staticmethod
     def _get_cache_key(image_path: Path, prompt: str) -> str:
@@ -27,90 +143,152 @@ class ClaudeService:
         with image_path.open("rb") as f:
             image_content = f.read()
 
-        content_hash = hashlib.md5(image_content + prompt.encode()).hexdigest()
+        content_hash = hashlib.md5(image_content + _prompt_key(prompt)).hexdigest()
         return content_hash
 
-    def _get_from_cache(self, cache_key: str) -> Optional[str]:
-        """Retrieve response from cache if it exists."""
-        cache_file = self.cache_dir / f"{cache_key}.json"
+    @staticmethod
+    def _get_cache_key_for_bytes(
+        image_data: bytes, prompt: str, content_hash: Optional["hashlib._Hash"] = None
+    ) -> str:
+        """
+        Generate the same cache key as _get_cache_key from in-memory image bytes.
 
-        if cache_file.exists():
-            try:
-                with cache_file.open("r", encoding="utf-8") as f:
-                    cache_data = json.load(f)
-                return cache_data.get("response")
-            except (json.JSONDecodeError, KeyError):
-                # If cache file is corrupted, remove it
-                cache_file.unlink(missing_ok=True)
+        If content_hash already holds an MD5 of image_data (e.g. computed
+        incrementally while the upload streamed in), it is reused instead of
+        hashing the image again.
+        """
+        with stage("hash"):
+            hasher = content_hash.copy() if content_hash is not None else hashlib.md5(image_data)
+            hasher.update(_prompt_key(prompt))
+            return hasher.hexdigest()
 
-        return None
+    def _get_from_cache(self, cache_key: str) -> Optional[str]:
+        """Retrieve response from cache if it exists."""
+        with stage("cache_read"):
+            return self.cache.get(cache_key)
 
     def _save_to_cache(self, cache_key: str, response: str) -> None:
         """Save response to cache."""
-        cache_file = self.cache_dir / f"{cache_key}.json"
-
-        cache_data = {
-            "response": response,
-            "timestamp": str(Path().stat().st_mtime if Path().exists() else 0)
-        }
-
-        try:
-            with cache_file.open("w", encoding="utf-8") as f:
-                json.dump(cache_data, f, indent=2)
-        except Exception:
-            # If we can't save to cache, just continue without caching
-            pass
+        with stage("cache_write"):
+            self.cache.set(cache_key, response)
 
     def clear_cache(self) -> int:
-        """Clear all cached responses. Returns number of files removed."""
-        count = 0
-        for cache_file in self.cache_dir.glob("*.json"):
-            try:
-                cache_file.unlink()
-                count += 1
-            except Exception:
-                pass
-        return count
+        """Clear all cached responses. Returns number of entries removed."""
+        return self.cache.clear()
+
+    def cache_stats(self) -> dict:
+        """Hit/miss/eviction counters for each cache tier."""
+        return self.cache.stats()
 
     def _encode_image(self, image_path: Path) -> str:
         """Encode image to base64 string."""
         with image_path.open("rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-
-    def _get_image_media_type(self, image_path: Path) -> str:
-        """Get the media type for the image."""
-        extension = image_path.suffix.lower()
-        media_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.bmp': 'image/bmp',
-            '.webp': 'image/webp'
-        }
-        return media_types.get(extension, 'image/jpeg')
+            return self._encode_image_bytes(image_file.read())
 
-    def _validate_image(self, image_path: Path) -> bool:
-        """Validate that the image exists and is in a supported format."""
-        if not image_path.exists():
-            raise FileNotFoundError(f"Image file not found: {image_path}")
+    @staticmethod
+    def _encode_image_bytes(image_data: bytes) -> str:
+        """Encode in-memory image bytes to base64 string."""
+        return base64.b64encode(image_data).decode('utf-8')
+
+    def _build_image_payload(self, image_data: bytes, filename: str) -> Tuple[str, str]:
+        """
+        Preprocess and base64-encode an image for the Claude request.
+
+        Returns:
+            Tuple of (base64 image data, media type)
+        """
+        media_type = self._get_image_media_type(image_data)
+        with stage("preprocess"):
+            payload, media_type = self.preprocessor.process(image_data, media_type)
+        with stage("encode"):
+            return self._encode_image_bytes(payload), media_type
+
+    def _get_image_media_type(self, image_data: bytes) -> str:
+        """Get the media type from the image's magic bytes, whatever its file name says."""
+        image_format = sniff_format(image_data)
+        if image_format is None:
+            raise ValueError("Invalid image file: unrecognized image format")
+        return FORMAT_MEDIA_TYPES[image_format]
 
-        extension = image_path.suffix.lower()
+    @staticmethod
+    def _check_image_format(filename: str) -> None:
+        """Check that the file extension is a supported image format."""
+        extension = Path(filename).suffix.lower()
         if extension not in settings.supported_formats:
             raise ValueError(f"Unsupported image format: {extension}")
 
-        file_size_mb = image_path.stat().st_size / (1024 * 1024)
+    @staticmethod
+    def _check_image_size(size_bytes: int) -> None:
+        """Check that the image does not exceed the configured size limit."""
+        file_size_mb = size_bytes / (1024 * 1024)
         if file_size_mb > settings.max_file_size_mb:
             raise ValueError(f"Image file too large: {file_size_mb:.1f}MB (max: {settings.max_file_size_mb}MB)")
 
-        try:
-            with Image.open(image_path) as img:
-                img.verify()
-        except Exception as e:
-            raise ValueError(f"Invalid image file: {str(e)}")
+    @staticmethod
+    def _verify_image_data(image_data) -> ImageInfo:
+        """
+        Check the image's content: its real format and pixel count from the
+        header and, only if IMAGE_FULL_DECODE is set, that its pixels decode.
+
+        Args:
+            image_data: Image content as a bytes-like object
+
+        Returns:
+            The format and dimensions read from the header
+        """
+        with stage("verify"):
+            info = read_image_info(image_data)
+
+            if not set(FORMAT_EXTENSIONS[info.format]) & set(settings.supported_formats):
+                raise ValueError(f"Unsupported image format: {info.format}")
+            if settings.image_max_pixels and info.pixels > settings.image_max_pixels:
+                raise ValueError(
+                    f"Image has too many pixels: {info.width}x{info.height} "
+                    f"(max: {settings.image_max_pixels} pixels)"
+                )
+            if settings.image_full_decode:
+                decode_image(image_data)
+
+            return info
+
+    def _validate_image(self, image_path: Path) -> bool:
+        """Validate that the image exists and is in a supported format."""
+        if not image_path.exists():
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        self._check_image_format(image_path.name)
+        size_bytes = image_path.stat().st_size
+        self._check_image_size(size_bytes)
+        if size_bytes == 0:
+            raise ValueError("Invalid image file: file is empty")
+
+        # Mapped rather than read, so only the pages holding the header are loaded
+        with image_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            self._verify_image_data(data)
+
+        return True
+
+    @classmethod
+    def _validate_image_bytes(cls, image_data: bytes, filename: str) -> bool:
+        """Validate in-memory image bytes without touching the filesystem."""
+        cls._check_image_format(filename)
+        cls._check_image_size(len(image_data))
+        cls._verify_image_data(image_data)
 
         return True
 
-    def _create_extraction_prompt(self) -> str:
+    def _read_image_file(self, image_path: Path) -> bytes:
+        """Check an image file on disk and read it in a single pass."""
+        if not image_path.exists():
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        self._check_image_format(image_path.name)
+        self._check_image_size(image_path.stat().st_size)
+
+        return image_path.read_bytes()
+
+    @staticmethod
+    def _create_extraction_prompt() -> str:
         """Create the prompt for Claude to extract event information."""
         return """
         Please analyze this image and extract all calendar event information you can find. Look for:
@@ -141,6 +319,93 @@ class ClaudeService:
         Be thorough and extract everything that could be calendar-related, even if some details are incomplete.
         """
 
+    def _build_message_request(
+        self,
+        prompt: str,
+        image_base64: str,
+        media_type: str,
+        request_text: str = EXTRACTION_REQUEST,
+        model: Optional[str] = None,
+    ) -> dict:
+        """
+        Build the keyword arguments for a Messages API call.
+
+        The instructions, identical on every request, go in the system
+        prompt, marked as a prompt caching breakpoint so Anthropic can serve
+        them from its cache. Only the image and a one-line request follow in
+        the user turn.
+        """
+        system_block = {"type": "text", "text": prompt}
+        if settings.prompt_cache_enabled:
+            system_block["cache_control"] = {"type": "ephemeral"}
+
+        kwargs = {
+            "model": model or settings.claude_model,
+            "max_tokens": settings.max_tokens,
+            "system": [system_block],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": media_type,
+                                "data": image_base64
+                            }
+                        },
+                        {
+                            "type": "text",
+                            "text": request_text
+                        }
+                    ]
+                }
+            ],
+        }
+        if _sdk_accepts_temperature():
+            kwargs["temperature"] = settings.temperature
+        return kwargs
+
+    @staticmethod
+    def _record_usage(message, filename: str, model: str) -> int:
+        """
+        Count the tokens billed for a Messages API response, including prompt cache reads and writes.
+
+        Returns:
+            Tokens that count towards the rate limit: input, output and
+            prompt cache writes, but not cache reads
+        """
+        usage = getattr(message, "usage", None)
+        counts = {}
+        for field, kind in (
+            ("input_tokens", "input"),
+            ("output_tokens", "output"),
+            ("cache_read_input_tokens", "cache_read"),
+            ("cache_creation_input_tokens", "cache_write"),
+        ):
+            tokens = getattr(usage, field, None)
+            if isinstance(tokens, int):
+                CLAUDE_TOKENS.inc(tokens, kind=kind, model=model)
+                counts[kind] = tokens
+
+        if counts:
+            summary = ", ".join(f"{kind}={tokens}" for kind, tokens in counts.items())
+            print(f"Token usage for {filename} on {model}: {summary}")
+        return sum(counts.get(kind, 0) for kind in ("input", "output", "cache_write"))
+
+    @classmethod
+    def _prepare_image(
+        cls,
+        image_data: bytes,
+        filename: str,
+        prompt: str,
+        content_hash: Optional["hashlib._Hash"] = None,
+    ) -> str:
+        """Validate the image bytes and return their cache key."""
+        cls._validate_image_bytes(image_data, filename)
+        return cls._get_cache_key_for_bytes(image_data, prompt, content_hash)
+
     def extract_events_from_image(self, image_path: str) -> str:
         """
         Extract event information from an image using Claude Vision.
@@ -156,46 +421,607 @@ class ClaudeService:
             raise ValueError("Anthropic API key not configured")
 
         path_obj = Path(image_path)
-        self._validate_image(path_obj)
+        image_data = self._read_image_file(path_obj)
+        return self.extract_events_from_bytes(image_data, path_obj.name)
+
+    def extract_events_from_bytes(
+        self,
+        image_data: bytes,
+        filename: str,
+        content_hash: Optional["hashlib._Hash"] = None,
+    ) -> str:
+        """
+        Extract event information from in-memory image bytes using Claude Vision.
+
+        Args:
+            image_data: Raw image file content
+            filename: Original filename, used for the extension check and in log messages
+            content_hash: Optional MD5 of image_data computed while it was received
+
+        Returns:
+            Extracted event information as text
+        """
+        if not self.client:
+            raise ValueError("Anthropic API key not configured")
+
         prompt = self._create_extraction_prompt()
-        cache_key = self._get_cache_key(path_obj, prompt)
+        cache_key = self._prepare_image(image_data, filename, prompt, content_hash)
         cached_response = self._get_from_cache(cache_key)
 
         if cached_response:
-            print(f"📋 Using cached response for {path_obj.name}")
+            CACHE_LOOKUPS.inc(result="hit")
+            print(f"📋 Using cached response for {filename}")
             return cached_response
 
-        print(f"Making API call to Claude for {path_obj.name}")
+        CACHE_LOOKUPS.inc(result="miss")
 
-        image_base64 = self._encode_image(path_obj)
-        media_type = self._get_image_media_type(path_obj)
+        if self._should_tile(image_data):
+            response = self._extract_tiles(prompt, image_data, filename)
+        else:
+            response = self._extract_image(prompt, image_data, filename)
+        self._save_to_cache(cache_key, response)
 
-        message = self.client.messages.create(
-            model=settings.claude_model,
-            max_tokens=settings.max_tokens,
-            temperature=settings.temperature,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": media_type,
-                                "data": image_base64
-                            }
-                        }
-                    ]
-                }
-            ]
+        return response
+
+    def _extract_image(
+        self,
+        prompt: str,
+        image_data: bytes,
+        filename: str,
+        request_text: str = EXTRACTION_REQUEST,
+    ) -> str:
+        """
+        Extract one image or tile, escalating through the model cascade.
+
+        Each tier's response is cached under its own key, so a re-run after
+        changing cascade_min_score, or after a stronger tier failed, does not
+        pay for the cheaper tiers again.
+        """
+        models = _cascade_models()
+        if len(models) == 1:
+            return self._create_message(prompt, image_data, filename, request_text)
+
+        best: Optional[Tuple[float, str]] = None
+        for tier, model in enumerate(models):
+            start = time.perf_counter()
+            tier_key = self._tier_cache_key(image_data, prompt, request_text, model)
+            response = self._get_from_cache(tier_key)
+            if not response:
+                response = self._create_message(prompt, image_data, filename, request_text, model)
+                self._save_to_cache(tier_key, response)
+
+            best, accepted = self._judge_tier(
+                model, response, best, last=tier == len(models) - 1, filename=filename, start=start
+            )
+            if accepted:
+                break
+        return best[1]
+
+    @staticmethod
+    def _tier_cache_key(image_data: bytes, prompt: str, request_text: str, model: str) -> str:
+        """Cache key of one cascade tier's response to an image or tile."""
+        with stage("hash"):
+            hasher = hashlib.md5(image_data)
+            hasher.update(_prompt_key(prompt))
+            hasher.update(f"\x1f{request_text}\x1f{model}".encode())
+            return hasher.hexdigest()
+
+    @staticmethod
+    def _judge_tier(
+        model: str,
+        response: str,
+        best: Optional[Tuple[float, str]],
+        last: bool,
+        filename: str,
+        start: float,
+    ) -> Tuple[Tuple[float, str], bool]:
+        """
+        Score a tier's response and decide whether the cascade stops there.
+
+        Returns:
+            Tuple of ((score, response) of the best tier so far, whether
+            this response was accepted); later tiers win ties
+        """
+        score = ICSService.score_extracted_text(response)
+        accepted = score >= settings.cascade_min_score
+        result = "accepted" if accepted else "exhausted" if last else "escalated"
+
+        CASCADE_TIER_SECONDS.observe(time.perf_counter() - start, model=model)
+        CASCADE_SCORES.observe(score, model=model)
+        CASCADE_RESULTS.inc(model=model, result=result)
+        if result == "escalated":
+            print(f"Escalating {filename}: {model} scored {score:.2f}")
+
+        if best is None or score >= best[0]:
+            best = (score, response)
+        return best, accepted
+
+    def _create_message(
+        self,
+        prompt: str,
+        image_data: bytes,
+        filename: str,
+        request_text: str = EXTRACTION_REQUEST,
+        model: Optional[str] = None,
+    ) -> str:
+        """Send one image to Claude and return the response text."""
+        model = model or settings.claude_model
+        print(f"Making API call to {model} for {filename}")
+
+        image_base64, media_type = self._build_image_payload(image_data, filename)
+
+        with stage("claude_api"):
+            message = self.client.messages.create(
+                **self._build_message_request(prompt, image_base64, media_type, request_text, model)
+            )
+        self._record_usage(message, filename, model)
+
+        return message.content[0].text
+
+    def _extract_tiles(self, prompt: str, image_data: bytes, filename: str) -> str:
+        """Extract the tiles of a large image concurrently and merge their events."""
+        tiles = self._split_tiles(image_data)
+        labels = [self._tile_label(filename, i, len(tiles)) for i in range(len(tiles))]
+        with ThreadPoolExecutor(max_workers=len(tiles)) as pool:
+            texts = list(pool.map(
+                lambda tile, label: self._extract_image(prompt, tile, label, TILE_EXTRACTION_REQUEST),
+                tiles,
+                labels,
+            ))
+        with stage("merge"):
+            return ICSService.merge_extracted_texts(texts)
+
+    @staticmethod
+    def _should_tile(image_data: bytes) -> bool:
+        """Whether the image is large enough to be extracted in tiles."""
+        if not settings.tiling_enabled:
+            return False
+        info = read_image_info(image_data)
+        return max(info.width, info.height) >= settings.tiling_min_long_edge
+
+    @staticmethod
+    def _split_tiles(image_data: bytes) -> List[bytes]:
+        with stage("tile"):
+            return split_image(
+                image_data,
+                settings.tiling_tile_size,
+                settings.tiling_overlap,
+                settings.tiling_max_tiles,
+            )
+
+    @staticmethod
+    def _tile_label(filename: str, index: int, count: int) -> str:
+        return f"{filename} [tile {index + 1}/{count}]"
+
+
+class AsyncClaudeService(ClaudeService):
+    """
+    Async variant of ClaudeService for use inside the FastAPI event loop.
+
+    The Anthropic call goes through the async client, and blocking file work
+    (validation, hashing, encoding, cache I/O) is pushed onto worker threads,
+    so one slow extraction never stalls other requests on the same worker.
+    Concurrent requests for the same image and prompt share one API call:
+    within a worker through SingleFlight, and across workers on the host
+    through a lease on the cache key. Optionally, near-duplicate images are
+    served from cache through a perceptual hash index. API calls go through
+    an UpstreamGovernor, which rate limits them, adapts their concurrency
+    and retries them, instead of the SDK's own retries.
+    """
+
+    def __init__(self):
+        self.http_client = None
+        super().__init__()
+        self.governor = _create_governor()
+        self.inflight = SingleFlight()
+        self.leases = create_lease_manager()
+        self.perceptual = create_perceptual_index()
+
+    def _create_client(self):
+        """Create the async Anthropic client, or None if no API key is configured."""
+        if not settings.anthropic_api_key:
+            return None
+        self.http_client = anthropic.DefaultAsyncHttpxClient(**_connection_options())
+        return anthropic.AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            base_url=settings.anthropic_base_url,
+            timeout=_request_timeout(),
+            http_client=self.http_client,
+            max_retries=0,
         )
 
-        response = message.content[0].text
-        self._save_to_cache(cache_key, response)
+    async def warm_up(self) -> int:
+        """
+        Open pooled connections to the Messages API ahead of the first request.
+
+        Sends settings.anthropic_warmup_connections concurrent HEAD requests
+        to the API base URL. Whatever status they get, the connections, with
+        DNS resolved and TLS negotiated, stay in the keep-alive pool for the
+        extraction calls that follow. Failures are only logged, since the
+        API may well be reachable by the time a real request is made.
+
+        Returns:
+            Number of warm-up requests that got a response
+        """
+        if self.client is None or settings.anthropic_warmup_connections <= 0:
+            return 0
+
+        url = str(self.client.base_url)
+        results = await asyncio.gather(
+            *(self.http_client.head(url) for _ in range(settings.anthropic_warmup_connections)),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            print(f"Could not warm up connections to {url}: {errors[0]!r}")
+        return len(results) - len(errors)
+
+    def cache_stats(self) -> dict:
+        """Cache tier counters plus request coalescing, upstream governor and near-duplicate counters."""
+        stats = {
+            **super().cache_stats(),
+            "inflight": self.inflight.stats(),
+            "upstream": self.governor.stats(),
+        }
+        if self.perceptual is not None:
+            stats["perceptual"] = self.perceptual.stats()
+        return stats
+
+    def _find_near_duplicate(self, namespace: str, phash: int) -> Optional[str]:
+        """Return a cached response for a perceptually similar image, if any."""
+        for candidate_key in self.perceptual.candidates(namespace, phash):
+            cached_response = self._get_from_cache(candidate_key)
+            if cached_response:
+                self.perceptual.hits += 1
+                return cached_response
+            # The response was evicted; drop the stale index entry
+            self.perceptual.remove(candidate_key)
+
+        self.perceptual.misses += 1
+        return None
+
+    async def _get_from_cache_async(self, cache_key: str) -> Optional[str]:
+        """Retrieve response from cache without blocking the event loop."""
+        return await asyncio.to_thread(self._get_from_cache, cache_key)
+
+    async def _save_to_cache_async(self, cache_key: str, response: str) -> None:
+        """Save response to cache without blocking the event loop."""
+        await asyncio.to_thread(self._save_to_cache, cache_key, response)
+
+    async def extract_events_from_image(self, image_path: str) -> str:
+        """
+        Extract event information from an image using Claude Vision.
+        Uses local caching to avoid repeat API calls during development.
+
+        Args:
+            image_path: Path to the image file (string for API compatibility)
+
+        Returns:
+            Extracted event information as text
+        """
+        if not self.client:
+            raise ValueError("Anthropic API key not configured")
+
+        path_obj = Path(image_path)
+        image_data = await asyncio.to_thread(self._read_image_file, path_obj)
+        return await self.extract_events_from_bytes(image_data, path_obj.name)
+
+    async def extract_events_from_bytes(
+        self,
+        image_data: bytes,
+        filename: str,
+        content_hash: Optional["hashlib._Hash"] = None,
+        limiter: Optional[asyncio.Semaphore] = None,
+        cache_key: Optional[str] = None,
+    ) -> str:
+        """
+        Extract event information from in-memory image bytes using Claude Vision.
+
+        Args:
+            image_data: Raw image file content
+            filename: Original filename, used for the extension check and in log messages
+            content_hash: Optional MD5 of image_data computed while it was received
+            limiter: Optional semaphore bounding concurrent extractions; only
+                cache misses take a slot, validation and lookups run freely
+            cache_key: Optional key already returned by _prepare_image for
+                image_data, e.g. in a worker process; the image is then not
+                validated or hashed again
+
+        Returns:
+            Extracted event information as text
+        """
+        if not self.client:
+            raise ValueError("Anthropic API key not configured")
+
+        prompt = self._create_extraction_prompt()
+        if cache_key is None:
+            cache_key = await asyncio.to_thread(
+                self._prepare_image, image_data, filename, prompt, content_hash
+            )
+        cached_response, perceptual_key = await self._lookup_cached(
+            cache_key, prompt, image_data, filename
+        )
+        if cached_response:
+            return cached_response
 
+        async with limiter or contextlib.nullcontext():
+            with self.governor.admission():
+                response = await self.inflight.do(
+                    cache_key,
+                    lambda: self._extract_uncached(cache_key, prompt, image_data, filename),
+                )
+
+        await self._index_response(perceptual_key, cache_key)
         return response
+
+    async def stream_events_from_bytes(
+        self,
+        image_data: bytes,
+        filename: str,
+        content_hash: Optional["hashlib._Hash"] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Extract event information from image bytes, yielding text as Claude generates it.
+
+        A cached response is yielded in one piece. Otherwise the response is
+        streamed from the Messages API and the full text is cached at the
+        end. Streams are not coalesced with concurrent requests for the same
+        image, since each caller needs its own stream.
+
+        Args:
+            image_data: Raw image file content
+            filename: Original filename, used for the extension check and in log messages
+            content_hash: Optional MD5 of image_data computed while it was received
+
+        Yields:
+            Successive pieces of the extracted event text
+        """
+        if not self.client:
+            raise ValueError("Anthropic API key not configured")
+
+        prompt = self._create_extraction_prompt()
+        cache_key = await asyncio.to_thread(
+            self._prepare_image, image_data, filename, prompt, content_hash
+        )
+        cached_response, perceptual_key = await self._lookup_cached(
+            cache_key, prompt, image_data, filename
+        )
+        if cached_response:
+            yield cached_response
+            return
+
+        if len(_cascade_models()) > 1 or await asyncio.to_thread(self._should_tile, image_data):
+            # A cascade may replace the first model's text, and tiles are
+            # extracted concurrently and merged, so there is no single stream
+            # to relay; the final text is yielded in one piece
+            with self.governor.admission():
+                response = await self.inflight.do(
+                    cache_key,
+                    lambda: self._extract_uncached(cache_key, prompt, image_data, filename),
+                )
+            await self._index_response(perceptual_key, cache_key)
+            yield response
+            return
+
+        print(f"Streaming API call to Claude for {filename}")
+
+        image_base64, media_type = await asyncio.to_thread(
+            self._build_image_payload, image_data, filename
+        )
+
+        request = self._build_message_request(prompt, image_base64, media_type)
+        chunks = []
+        attempt = 0
+        with stage("claude_api_stream"), self.governor.admission():
+            while True:
+                try:
+                    async with self.governor.slot(), self.client.messages.stream(**request) as stream:
+                        async for text in stream.text_stream:
+                            chunks.append(text)
+                            yield text
+                        message = await stream.get_final_message()
+                    break
+                except Exception as e:
+                    if chunks:
+                        # Text already sent cannot be taken back, so no retry
+                        raise
+                    delay = self.governor.retry_delay(e, attempt)
+                attempt += 1
+                await asyncio.sleep(delay)
+        self.governor.charge_tokens(self._record_usage(message, filename, settings.claude_model))
+
+        await self._save_to_cache_async(cache_key, "".join(chunks))
+        await self._index_response(perceptual_key, cache_key)
+
+    async def _lookup_cached(
+        self, cache_key: str, prompt: str, image_data: bytes, filename: str
+    ) -> Tuple[Optional[str], Optional[Tuple[str, int]]]:
+        """
+        Look for a cached response to this image, then to a near-duplicate of it.
+
+        Returns:
+            Tuple of (cached response or None, (namespace, perceptual hash)
+            to index a new response under, or None if the index is disabled)
+        """
+        cached_response = await self._get_from_cache_async(cache_key)
+        if cached_response:
+            CACHE_LOOKUPS.inc(result="hit")
+            print(f"📋 Using cached response for {filename}")
+            return cached_response, None
+
+        if self.perceptual is None:
+            CACHE_LOOKUPS.inc(result="miss")
+            return None, None
+
+        namespace = hashlib.md5(_prompt_key(prompt)).hexdigest()
+        phash = await asyncio.to_thread(self._perceptual_hash, image_data)
+        cached_response = await asyncio.to_thread(
+            self._find_near_duplicate, namespace, phash
+        )
+        if cached_response:
+            CACHE_LOOKUPS.inc(result="near_duplicate")
+            print(f"📋 Using cached response for near-duplicate of {filename}")
+        else:
+            CACHE_LOOKUPS.inc(result="miss")
+        return cached_response, (namespace, phash)
+
+    @staticmethod
+    def _perceptual_hash(image_data: bytes) -> int:
+        with stage("perceptual_hash"):
+            return dhash(image_data)
+
+    async def _index_response(
+        self, perceptual_key: Optional[Tuple[str, int]], cache_key: str
+    ) -> None:
+        """Record a new response in the near-duplicate index, if enabled."""
+        if perceptual_key is not None:
+            namespace, phash = perceptual_key
+            await asyncio.to_thread(self.perceptual.add, namespace, phash, cache_key)
+
+    async def _extract_uncached(
+        self, cache_key: str, prompt: str, image_data: bytes, filename: str
+    ) -> str:
+        """Call Claude for a cache miss, unless another worker already is."""
+        # A flight that finished between our cache check and joining may have
+        # already stored the response
+        cached_response = await self._get_from_cache_async(cache_key)
+        if cached_response:
+            return cached_response
+
+        if self.leases is None:
+            return await self._call_claude(cache_key, prompt, image_data, filename)
+
+        waited = False
+        deadline = time.monotonic() + settings.cache_lease_wait_timeout_seconds
+        while not await asyncio.to_thread(self.leases.try_acquire, cache_key):
+            # Another worker on this host holds the lease; wait for its result
+            if time.monotonic() > deadline:
+                print(f"Gave up waiting for another worker on {filename}")
+                return await self._call_claude(cache_key, prompt, image_data, filename)
+
+            waited = True
+            await asyncio.sleep(settings.cache_lease_poll_interval_seconds)
+            cached_response = await self._get_from_cache_async(cache_key)
+            if cached_response:
+                print(f"📋 Using response from another worker for {filename}")
+                return cached_response
+
+        heartbeat = asyncio.ensure_future(self._keep_lease(cache_key))
+        try:
+            if waited:
+                # The previous holder may have finished just before we took over
+                cached_response = await self._get_from_cache_async(cache_key)
+                if cached_response:
+                    return cached_response
+
+            return await self._call_claude(cache_key, prompt, image_data, filename)
+
+        finally:
+            heartbeat.cancel()
+            await asyncio.to_thread(self.leases.release, cache_key)
+
+    async def _keep_lease(self, cache_key: str) -> None:
+        """
+        Renew the lease on cache_key until cancelled, or until it is lost.
+
+        A lease expires if renewing it stalls for longer than its TTL, and
+        another worker may then take it over. Our call still finishes and
+        stores its response, but another worker may be calling Claude for
+        the same image, so there is no point in renewing it any more.
+        """
+        while True:
+            await asyncio.sleep(settings.cache_lease_ttl_seconds / 3)
+            if not await asyncio.to_thread(self.leases.renew, cache_key):
+                print(f"Lost the lease on {cache_key} to another worker")
+                return
+
+    async def _call_claude(
+        self, cache_key: str, prompt: str, image_data: bytes, filename: str
+    ) -> str:
+        """Send the image, or its tiles, to Claude and store the response."""
+        if await asyncio.to_thread(self._should_tile, image_data):
+            response = await self._extract_tiles_async(prompt, image_data, filename)
+        else:
+            response = await self._extract_image_async(prompt, image_data, filename)
+        await self._save_to_cache_async(cache_key, response)
+
+        return response
+
+    async def _extract_image_async(
+        self,
+        prompt: str,
+        image_data: bytes,
+        filename: str,
+        request_text: str = EXTRACTION_REQUEST,
+    ) -> str:
+        """Extract one image or tile, escalating through the model cascade."""
+        models = _cascade_models()
+        if len(models) == 1:
+            return await self._create_message_async(prompt, image_data, filename, request_text)
+
+        best: Optional[Tuple[float, str]] = None
+        for tier, model in enumerate(models):
+            start = time.perf_counter()
+            tier_key = await asyncio.to_thread(
+                self._tier_cache_key, image_data, prompt, request_text, model
+            )
+            response = await self._get_from_cache_async(tier_key)
+            if not response:
+                response = await self._create_message_async(
+                    prompt, image_data, filename, request_text, model
+                )
+                await self._save_to_cache_async(tier_key, response)
+
+            best, accepted = self._judge_tier(
+                model, response, best, last=tier == len(models) - 1, filename=filename, start=start
+            )
+            if accepted:
+                break
+        return best[1]
+
+    async def _create_message_async(
+        self,
+        prompt: str,
+        image_data: bytes,
+        filename: str,
+        request_text: str = EXTRACTION_REQUEST,
+        model: Optional[str] = None,
+    ) -> str:
+        """Send one image to Claude and return the response text."""
+        model = model or settings.claude_model
+        print(f"Making API call to {model} for {filename}")
+
+        image_base64, media_type = await asyncio.to_thread(
+            self._build_image_payload, image_data, filename
+        )
+
+        request = self._build_message_request(prompt, image_base64, media_type, request_text, model)
+        with stage("claude_api"):
+            message = await self.governor.call(lambda: self.client.messages.create(**request))
+        self.governor.charge_tokens(self._record_usage(message, filename, model))
+
+        return message.content[0].text
+
+    async def _extract_tiles_async(self, prompt: str, image_data: bytes, filename: str) -> str:
+        """
+        Extract the tiles of a large image concurrently and merge their events.
+
+        Each tile is a separate, shorter generation, so the latency is that
+        of the slowest tile rather than of one long response. If a tile
+        fails, the others are cancelled and its error is raised.
+        """
+        tiles = await asyncio.to_thread(self._split_tiles, image_data)
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(self._extract_image_async(
+                        prompt, tile, self._tile_label(filename, i, len(tiles)),
+                        TILE_EXTRACTION_REQUEST,
+                    ))
+                    for i, tile in enumerate(tiles)
+                ]
+        except ExceptionGroup as e:
+            # Callers handle the tile's own error, e.g. UpstreamBusyError
+            raise e.exceptions[0]
+        with stage("merge"):
+            return ICSService.merge_extracted_texts([task.result() for task in tasks])
@@ -0,0 +1,168 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+# Schedules repeat the same few dates and times, so even a small cache
+# absorbs most lookups during a bulk import
+CACHE_SIZE = 4096
+
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [
+            ("january", "jan"),
+            ("february", "feb"),
+            ("march", "mar"),
+            ("april", "apr"),
+            ("may",),
+            ("june", "jun"),
+            ("july", "jul"),
+            ("august", "aug"),
+            ("september", "sep", "sept"),
+            ("october", "oct"),
+            ("november", "nov"),
+            ("december", "dec"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+
+WEEKDAYS = {
+    "monday", "mon", "tuesday", "tue", "tues", "wednesday", "wed", "thursday",
+    "thu", "thur", "thurs", "friday", "fri", "saturday", "sat", "sunday", "sun",
+}
+
+ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+# 03/15/2024, 15-03-2024, 15.03.2024
+NUMERIC_DATE = re.compile(r"(\d{1,2})([/.-])(\d{1,2})\2(\d{4})")
+# March 15, 2024 / Fri, Mar. 15th 2024
+MONTH_FIRST_DATE = re.compile(
+    r"(?:([a-z]+)\.?,?\s+)?([a-z]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})",
+    re.IGNORECASE,
+)
+# 15 March 2024 / Friday 15th Mar, 2024
+DAY_FIRST_DATE = re.compile(
+    r"(?:([a-z]+)\.?,?\s+)?(\d{1,2})(?:st|nd|rd|th)?\s+([a-z]+)\.?,?\s+(\d{4})",
+    re.IGNORECASE,
+)
+
+MERIDIEM = r"(?:\s*([ap])\.?\s*m\b\.?)"
+# 14:30, 2:30 PM, 2.30pm
+CLOCK_TIME = re.compile(r"(\d{1,2})[:.](\d{2})" + MERIDIEM + "?", re.IGNORECASE)
+# 2 PM, 11a.m.
+HOUR_TIME = re.compile(r"\b(\d{1,2})" + MERIDIEM, re.IGNORECASE)
+NAMED_TIMES = {"noon": (12, 0), "midday": (12, 0), "midnight": (0, 0)}
+
+
+def _date(year: int, month: int, day: int) -> Optional[datetime]:
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def _month_name_date(
+    weekday: Optional[str], month_name: str, day: str, year: str
+) -> Optional[datetime]:
+    if weekday and weekday.lower() not in WEEKDAYS:
+        return None
+    month = MONTHS.get(month_name.lower())
+    return _date(int(year), month, int(day)) if month else None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(date_str: str) -> Optional[datetime]:
+    """
+    Parse a date as written by Claude or on a flyer.
+
+    The string is classified with a few precompiled patterns instead of
+    trying every strptime format in turn. Ambiguous numeric dates with / or
+    - are read month first (03/04/2024 is March 4) and fall back to day
+    first when that is not a valid date; dotted dates are read day first.
+    Results are memoized.
+
+    Args:
+        date_str: Date string such as "2024-03-15", "03/15/2024",
+            "March 15, 2024" or "Fri 15th Mar 2024"
+
+    Returns:
+        datetime at midnight, or None if the string is not a recognised date
+    """
+    if not date_str:
+        return None
+
+    text = date_str.strip()
+
+    match = ISO_DATE.fullmatch(text)
+    if match:
+        return _date(*map(int, match.groups()))
+
+    match = NUMERIC_DATE.fullmatch(text)
+    if match:
+        first, separator, second, year = match.groups()
+        first, second, year = int(first), int(second), int(year)
+        if separator == ".":
+            return _date(year, second, first) or _date(year, first, second)
+        return _date(year, first, second) or _date(year, second, first)
+
+    match = MONTH_FIRST_DATE.fullmatch(text)
+    if match:
+        parsed = _month_name_date(*match.groups())
+        if parsed:
+            return parsed
+
+    match = DAY_FIRST_DATE.fullmatch(text)
+    if match:
+        weekday, day, month_name, year = match.groups()
+        parsed = _month_name_date(weekday, month_name, day, year)
+        if parsed:
+            return parsed
+
+    # Last resort: an ISO date embedded in a longer string
+    match = ISO_DATE.search(text)
+    if match:
+        return _date(*map(int, match.groups()))
+
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_time(time_str: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse the first time of day in a string into 24-hour (hour, minute).
+
+    An am/pm marker only applies to the time it directly follows, so
+    "10:00 AM - 2:00 PM" is 10:00. Hours already past 12 ignore a stray
+    marker ("14:30 PM" is 14:30). Results are memoized.
+
+    Args:
+        time_str: Time string like "14:30", "2:30 PM", "2pm" or "noon"
+
+    Returns:
+        Tuple of (hour, minute) or None if no valid time is found
+    """
+    if not time_str:
+        return None
+
+    match = CLOCK_TIME.search(time_str)
+    if match:
+        hour, minute, meridiem = match.groups()
+    else:
+        match = HOUR_TIME.search(time_str)
+        if not match:
+            return NAMED_TIMES.get(time_str.strip().lower())
+        (hour, meridiem), minute = match.groups(), "0"
+
+    hour, minute = int(hour), int(minute)
+    if meridiem and 1 <= hour <= 12:
+        if meridiem.lower() == "p" and hour != 12:
+            hour += 12
+        elif meridiem.lower() == "a" and hour == 12:
+            hour = 0
+
+    if hour > 23 or minute > 59:
+        return None
+    return (hour, minute)
@@ -1,10 +1,90 @@
+import difflib
+import hashlib
+import json
 import re
-import tempfile
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 from pathlib import Path
-from icalendar import Calendar, Event
+from src.artifacts import ArtifactStore
 from src.config import settings
+from src.lazy import lazy_import
+from src.metrics import EVENTS_PER_IMAGE, stage
+from src.services.date_parser import parse_date, parse_time
+from src.services.ics_writer import Properties, iter_calendar, write_calendar
+
+icalendar = lazy_import("icalendar")
+
+
+NO_EVENTS_MARKER = "No calendar events detected"
+
+# Fields of an EVENT: block, in the order Claude is asked to write them
+EVENT_FIELDS = ["TITLE", "DATE", "START_TIME", "END_TIME", "LOCATION", "DESCRIPTION"]
+
+# Titles at least this similar (difflib ratio) can name the same event
+DUPLICATE_TITLE_SIMILARITY = 0.8
+
+
+class IncrementalEventParser:
+    """
+    Parse Claude's structured event text while it is still being generated.
+
+    Text can be fed in arbitrary chunks. Each EVENT: block is returned as
+    soon as it is terminated by a --- line (or by the next EVENT:, or by
+    close()), so callers can show events before the response is complete.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._block: Optional[Dict[str, Any]] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk of text.
+
+        Args:
+            text: The next piece of Claude's response
+
+        Returns:
+            Event dictionaries completed by this chunk
+        """
+        *lines, self._pending = (self._pending + text).split("\n")
+        return [event for event in map(self._feed_line, lines) if event]
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Consume the end of the text and return the events it completes."""
+        events = self.feed("\n") if self._pending else []
+        last = self._finish_block()
+        return events + [last] if last else events
+
+    def _feed_line(self, line: str) -> Optional[Dict[str, Any]]:
+        line = line.strip()
+        if line.startswith("EVENT:"):
+            finished = self._finish_block()
+            self._block = {}
+            self._add_field(line[len("EVENT:"):])
+            return finished
+
+        if line.startswith("---"):
+            return self._finish_block()
+
+        if self._block is not None:
+            self._add_field(line)
+        return None
+
+    def _add_field(self, line: str) -> None:
+        if ":" not in line:
+            return
+
+        key, value = line.split(":", 1)
+        key = key.strip().upper()
+        value = value.strip()
+
+        if value and value != "Not specified":
+            self._block[key] = value
+
+    def _finish_block(self) -> Optional[Dict[str, Any]]:
+        block, self._block = self._block, None
+        return block or None
 
 
 class ICSService:
@@ -12,6 +92,12 @@ class ICSService:
 
     def __init__(self):
         self.calendar = None
+        self.artifacts = ArtifactStore(
+            settings.artifacts_dir,
+            ".ics",
+            max_bytes=settings.artifacts_max_bytes or None,
+            ttl_seconds=settings.artifacts_ttl_seconds or None,
+        )
 
     def _parse_extracted_text(self, extracted_text: str) -> List[Dict[str, Any]]:
         """
@@ -23,31 +109,138 @@ class ICSService:
         Returns:
             List of event dictionaries
         """
-        events = []
+        with stage("parse"):
+            events = self._parse_events(extracted_text)
+
+        EVENTS_PER_IMAGE.observe(len(events))
+        return events
+
+    @staticmethod
+    def _parse_events(extracted_text: str) -> List[Dict[str, Any]]:
+        if NO_EVENTS_MARKER in extracted_text:
+            return []
+        parser = IncrementalEventParser()
+        return parser.feed(extracted_text) + parser.close()
+
+    @classmethod
+    def merge_extracted_texts(cls, extracted_texts: List[str]) -> str:
+        """
+        Merge texts extracted from overlapping tiles of one image into one text.
 
-        if "No calendar events detected" in extracted_text:
-            return events
+        An event that straddles a tile seam is usually extracted from both
+        tiles, often with a cut-off title or some fields missing on one side.
+        Events from different tiles are treated as one when their titles are
+        similar and their dates and start times do not conflict; the copies
+        are combined, keeping the longest value of each field.
 
-        event_blocks = extracted_text.split("EVENT:")[1:]
+        Args:
+            extracted_texts: Texts extracted from Claude, one per tile
 
-        for block in event_blocks:
-            event_data = {}
-            lines = block.strip().split("\n")
+        Returns:
+            The merged events in Claude's EVENT: format, or the no-events
+            message if no tile found any
+        """
+        merged: List[Tuple[int, Dict[str, Any]]] = []
+        for tile, extracted_text in enumerate(extracted_texts):
+            for event in cls._parse_events(extracted_text):
+                duplicate = next(
+                    (
+                        kept for source, kept in merged
+                        if source != tile and cls._same_event(kept, event)
+                    ),
+                    None,
+                )
+                if duplicate is None:
+                    merged.append((tile, dict(event)))
+                else:
+                    cls._combine_events(duplicate, event)
 
-            for line in lines:
-                line = line.strip()
-                if ":" in line and not line.startswith("---"):
-                    key, value = line.split(":", 1)
-                    key = key.strip().upper()
-                    value = value.strip()
+        if not merged:
+            return f"{NO_EVENTS_MARKER} in this image."
+        return cls._format_events([event for _, event in merged])
 
-                    if value and value != "Not specified":
-                        event_data[key] = value
+    @classmethod
+    def score_extracted_text(cls, extracted_text: str) -> float:
+        """
+        Score how complete and well-formed an extraction is, from 0 to 1.
 
-            if event_data:
-                events.append(event_data)
+        Each event scores half for a parsable date, a quarter for its times
+        (any START_TIME or END_TIME given must parse) and a quarter for the
+        share of fields that are not "Not specified"; the text scores the
+        mean. A response that does not end with a --- line was cut off,
+        usually by max_tokens, and scores half. An explicit no-events answer
+        scores 1, text with no parsable events 0.
 
-        return events
+        Args:
+            extracted_text: The structured text response from Claude
+
+        Returns:
+            Confidence score between 0 and 1
+        """
+        if NO_EVENTS_MARKER in extracted_text:
+            return 1.0
+
+        events = cls._parse_events(extracted_text)
+        if not events:
+            return 0.0
+
+        score = sum(map(cls._score_event, events)) / len(events)
+        if not extracted_text.rstrip().endswith("---"):
+            score /= 2
+        return score
+
+    @staticmethod
+    def _score_event(event: Dict[str, Any]) -> float:
+        date_ok = "DATE" in event and parse_date(event["DATE"]) is not None
+        times = [event[field] for field in ("START_TIME", "END_TIME") if field in event]
+        times_ok = sum(parse_time(value) is not None for value in times) / len(times) if times else 1.0
+        filled = sum(field in event for field in EVENT_FIELDS) / len(EVENT_FIELDS)
+        return 0.5 * date_ok + 0.25 * times_ok + 0.25 * filled
+
+    @staticmethod
+    def _normalize_title(title: str) -> str:
+        return " ".join(re.sub(r"[^\w]+", " ", title.lower()).split())
+
+    @classmethod
+    def _same_event(cls, a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        """Whether two events from neighbouring tiles can be the same event."""
+        title_a = cls._normalize_title(a.get("TITLE", ""))
+        title_b = cls._normalize_title(b.get("TITLE", ""))
+        if not title_a or not title_b:
+            return False
+        if not (
+            title_a.startswith(title_b)
+            or title_b.startswith(title_a)
+            or difflib.SequenceMatcher(None, title_a, title_b).ratio() >= DUPLICATE_TITLE_SIMILARITY
+        ):
+            return False
+
+        # A field seen by only one of the tiles does not conflict
+        for field, parse in (("DATE", parse_date), ("START_TIME", parse_time)):
+            if field in a and field in b:
+                value_a, value_b = parse(a[field]), parse(b[field])
+                if value_a is None or value_b is None:
+                    value_a, value_b = a[field].strip().lower(), b[field].strip().lower()
+                if value_a != value_b:
+                    return False
+        return True
+
+    @staticmethod
+    def _combine_events(kept: Dict[str, Any], other: Dict[str, Any]) -> None:
+        """Fill in kept from a duplicate, preferring the longer, less truncated values."""
+        for field, value in other.items():
+            if len(str(value)) > len(str(kept.get(field, ""))):
+                kept[field] = value
+
+    @staticmethod
+    def _format_events(events: List[Dict[str, Any]]) -> str:
+        """Write events back in the EVENT: format Claude produces."""
+        blocks = []
+        for event in events:
+            fields = EVENT_FIELDS + [field for field in event if field not in EVENT_FIELDS]
+            lines = ["EVENT:"] + [f"{field}: {event.get(field, 'Not specified')}" for field in fields]
+            blocks.append("\n".join(lines + ["---"]))
+        return "\n\n".join(blocks)
 
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """
@@ -59,33 +252,7 @@ class ICSService:
         Returns:
             datetime object or None if parsing fails
         """
-        if not date_str:
-            return None
-
-        date_formats = [
-            "%Y-%m-%d",
-            "%m/%d/%Y",
-            "%d/%m/%Y",
-            "%m-%d-%Y",
-            "%d-%m-%Y",
-            "%B %d, %Y",
-            "%b %d, %Y",
-            "%d %B %Y",
-            "%d %b %Y",
-        ]
-
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-
-        date_match = re.search(r"(\d{4})-(\d{1,2})-(\d{1,2})", date_str)
-        if date_match:
-            year, month, day = map(int, date_match.groups())
-            return datetime(year, month, day)
-
-        return None
+        return parse_date(date_str)
 
     def _parse_time(self, time_str: str) -> Optional[tuple]:
         """
@@ -97,21 +264,7 @@ class ICSService:
         Returns:
             Tuple of (hour, minute) or None if parsing fails
         """
-        if not time_str:
-            return None
-
-        time_match = re.search(r"(\d{1,2}):(\d{2})", time_str)
-        if time_match:
-            hour, minute = map(int, time_match.groups())
-
-            if "PM" in time_str.upper() and hour != 12:
-                hour += 12
-            elif "AM" in time_str.upper() and hour == 12:
-                hour = 0
-
-            return (hour, minute)
-
-        return None
+        return parse_time(time_str)
 
     def _create_datetime(
         self, date_str: str, time_str: str = None
@@ -138,28 +291,24 @@ class ICSService:
 
         return date_obj
 
-    def _create_ics_event(self, event_data: Dict[str, Any]) -> Event:
+    def _event_properties(self, event_data: Dict[str, Any], position: int = 0) -> Properties:
         """
-        Create an ICS Event object from event data.
+        Build the ICS properties of one event.
+
+        Properties are listed in the order icalendar serializes them, so both
+        serializers produce identical output. The UID is derived from the
+        event details and its position in the calendar, so re-importing the
+        same calendar updates events instead of duplicating them.
 
         Args:
             event_data: Dictionary with event information
+            position: Index of the event in its calendar
 
         Returns:
-            icalendar Event object
+            List of (property name, value) pairs
         """
-        event = Event()
-
-        event.add("uid", f"{datetime.now().isoformat()}@calendar-extractor")
-        event.add("dtstamp", datetime.now())
-
-        if "TITLE" in event_data:
-            event.add("summary", event_data["TITLE"])
-        else:
-            event.add("summary", "Extracted Event")
-
-        start_dt = None
-        end_dt = None
+        now = datetime.now(timezone.utc)
+        properties = [("SUMMARY", event_data.get("TITLE", "Extracted Event"))]
 
         if "DATE" in event_data:
             if "START_TIME" in event_data:
@@ -170,8 +319,6 @@ class ICSService:
                 start_dt = self._create_datetime(event_data["DATE"])
 
             if start_dt:
-                event.add("dtstart", start_dt)
-
                 if "END_TIME" in event_data:
                     end_dt = self._create_datetime(
                         event_data["DATE"], event_data["END_TIME"]
@@ -179,18 +326,49 @@ class ICSService:
                 else:
                     end_dt = start_dt + timedelta(hours=1)
 
-                event.add("dtend", end_dt)
+                properties.append(("DTSTART", start_dt))
+                properties.append(("DTEND", end_dt))
 
-        if "LOCATION" in event_data:
-            event.add("location", event_data["LOCATION"])
+        details = [str(value) for _, value in properties]
+        details += [event_data.get("LOCATION", ""), event_data.get("DESCRIPTION", ""), str(position)]
+        uid = hashlib.sha256("\x1f".join(details).encode("utf-8")).hexdigest()[:32]
+
+        properties.append(("DTSTAMP", now))
+        properties.append(("UID", f"{uid}@calendar-extractor"))
+        properties.append(("CREATED", now))
 
         if "DESCRIPTION" in event_data:
-            event.add("description", event_data["DESCRIPTION"])
+            properties.append(("DESCRIPTION", event_data["DESCRIPTION"]))
 
-        event.add("created", datetime.now())
+        if "LOCATION" in event_data:
+            properties.append(("LOCATION", event_data["LOCATION"]))
 
+        return properties
+
+    def _create_ics_event(self, event_data: Dict[str, Any], position: int = 0) -> "icalendar.Event":
+        """
+        Create an ICS Event object from event data.
+
+        Args:
+            event_data: Dictionary with event information
+            position: Index of the event in its calendar
+
+        Returns:
+            icalendar Event object
+        """
+        event = icalendar.Event()
+        for name, value in self._event_properties(event_data, position):
+            event.add(name.lower(), value)
         return event
 
+    def _calendar_properties(self) -> Properties:
+        return [
+            ("VERSION", settings.calendar_version),
+            ("PRODID", settings.calendar_prodid),
+            ("CALSCALE", "GREGORIAN"),
+            ("METHOD", "PUBLISH"),
+        ]
+
     def create_ics_from_text(self, extracted_text: str) -> tuple[str, int]:
         """
         Convert extracted text to ICS format.
@@ -201,24 +379,86 @@ class ICSService:
         Returns:
             Tuple of (ICS content as string, number of events)
         """
-        cal = Calendar()
-        cal.add("prodid", settings.calendar_prodid)
-        cal.add("version", settings.calendar_version)
-        cal.add("calscale", "GREGORIAN")
-        cal.add("method", "PUBLISH")
+        ics_content, events_counts = self.create_ics_from_texts([extracted_text])
+        return ics_content, events_counts[0]
 
-        events_data = self._parse_extracted_text(extracted_text)
+    def create_ics_from_texts(self, extracted_texts: List[str]) -> tuple[str, List[int]]:
+        """
+        Merge the events from several extracted texts into one calendar.
+
+        Uses the serializer selected by settings.ics_serializer: "icalendar"
+        builds an icalendar.Calendar, "streaming" writes the lines directly.
+
+        Args:
+            extracted_texts: Texts extracted from Claude, one per image
+
+        Returns:
+            Tuple of (ICS content as string, number of events in each text)
+        """
+        parsed = [self._parse_extracted_text(text) for text in extracted_texts]
+        events_counts = [len(events_data) for events_data in parsed]
 
-        for event_data in events_data:
-            ics_event = self._create_ics_event(event_data)
-            cal.add_component(ics_event)
+        with stage("serialize"):
+            return self._serialize(parsed), events_counts
 
-        ics_content = cal.to_ical().decode("utf-8")
-        return ics_content, len(events_data)
+    def _serialize(self, parsed: List[List[Dict[str, Any]]]) -> str:
+        """Render parsed events as ICS with the configured serializer."""
+        if settings.ics_serializer == "streaming":
+            events = self._iter_event_properties(parsed)
+            return "".join(iter_calendar(self._calendar_properties(), events))
+
+        if settings.ics_serializer != "icalendar":
+            raise ValueError(f"Unknown ICS serializer: {settings.ics_serializer}")
+
+        cal = icalendar.Calendar()
+        for name, value in self._calendar_properties():
+            cal.add(name.lower(), value)
+
+        all_events = (event_data for events_data in parsed for event_data in events_data)
+        for position, event_data in enumerate(all_events):
+            cal.add_component(self._create_ics_event(event_data, position))
+
+        return cal.to_ical().decode("utf-8")
+
+    def write_ics_from_texts(self, extracted_texts: Iterable[str], file: TextIO) -> List[int]:
+        """
+        Stream the merged calendar for several extracted texts into a file.
+
+        Texts are parsed as they are consumed and events serialized one at a
+        time with the streaming serializer, whatever settings.ics_serializer
+        says, so memory use does not grow with the size of the calendar.
+
+        Args:
+            extracted_texts: Texts extracted from Claude, one per image; may
+                be a generator
+            file: Text file opened with newline="" so CRLF line endings are kept
+
+        Returns:
+            Number of events in each text
+        """
+        events_counts = []
+
+        def parse_all() -> Iterator[List[Dict[str, Any]]]:
+            for text in extracted_texts:
+                events_data = self._parse_extracted_text(text)
+                events_counts.append(len(events_data))
+                yield events_data
+
+        with stage("serialize"):
+            write_calendar(file, self._calendar_properties(), self._iter_event_properties(parse_all()))
+        return events_counts
+
+    def _iter_event_properties(
+        self, parsed: Iterable[List[Dict[str, Any]]]
+    ) -> Iterator[Properties]:
+        """Properties of every event across several parsed texts, in calendar order."""
+        all_events = (event_data for events_data in parsed for event_data in events_data)
+        for position, event_data in enumerate(all_events):
+            yield self._event_properties(event_data, position)
 
     def create_ics_file_from_text(self, extracted_text: str) -> Tuple[str, Path, int]:
         """
-        Convert extracted text to ICS format and save to a temporary file.
+        Convert extracted text to ICS format and save it in the artifact store.
 
         Args:
             extracted_text: Text extracted from Claude
@@ -226,21 +466,47 @@ class ICSService:
         Returns:
             Tuple of (ICS content as string, file path as Path, number of events)
         """
-        ics_content, events_count = self.create_ics_from_text(extracted_text)
+        ics_content, file_path, events_counts = self.create_ics_file_from_texts([extracted_text])
+        return ics_content, file_path, events_counts[0]
 
-        temp_file = tempfile.NamedTemporaryFile(
-            delete=False,
-            suffix='.ics',
-            mode='w',
-            encoding='utf-8'
-        )
+    def create_ics_file_from_texts(
+        self, extracted_texts: List[str]
+    ) -> Tuple[str, Path, List[int]]:
+        """
+        Merge several extracted texts into one calendar and save it in the artifact store.
 
-        try:
-            temp_file.write(ics_content)
-            temp_file.flush()
-            file_path = Path(temp_file.name)
+        The ICS bytes carry the time they were generated in DTSTAMP, so the
+        artifact is also aliased by a hash of the texts and the calendar
+        settings. The same extraction is thus served as the same file, with
+        the same id, for as long as it is stored, and is only serialized the
+        first time; once swept, it is rendered again under a new id.
 
-            return ics_content, file_path, events_count
+        Args:
+            extracted_texts: Texts extracted from Claude, one per image
 
-        finally:
-            temp_file.close()
+        Returns:
+            Tuple of (ICS content as string, file path as Path, number of events in each text)
+        """
+        alias = self._artifact_alias(extracted_texts)
+        with stage("save"):
+            stored = self.artifacts.get_by_alias(alias)
+        if stored is not None:
+            content, file_path = stored
+            events_counts = [len(self._parse_extracted_text(text)) for text in extracted_texts]
+            return content.decode("utf-8"), file_path, events_counts
+
+        ics_content, events_counts = self.create_ics_from_texts(extracted_texts)
+        with stage("save"):
+            _, file_path = self.artifacts.put(ics_content.encode("utf-8"), alias)
+        return ics_content, file_path, events_counts
+
+    @staticmethod
+    def _artifact_alias(extracted_texts: List[str]) -> str:
+        """Hash of everything that determines a calendar apart from the time it is generated."""
+        key = [
+            settings.calendar_version,
+            settings.calendar_prodid,
+            settings.default_timezone,
+            extracted_texts,
+        ]
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, List, TextIO, Tuple
+
+
+CRLF = "\r\n"
+FOLD_LIMIT = 75
+
+# (name, value) pairs in the order they are written
+Properties = List[Tuple[str, Any]]
+
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT value (RFC 5545 section 3.3.11) the same way icalendar does."""
+    return (
+        value.replace(r"\N", "\n")
+        .replace("\\", "\\\\")
+        .replace(";", r"\;")
+        .replace(",", r"\,")
+        .replace("\r\n", r"\n")
+        .replace("\n", r"\n")
+        .replace("\r", r"\n")
+    )
+
+
+def format_value(value: Any) -> str:
+    """Serialize a property value: UTC or floating DATE-TIME, otherwise TEXT."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        return value.strftime("%Y%m%dT%H%M%S")
+    return escape_text(str(value))
+
+
+def fold_line(line: str) -> str:
+    """
+    Fold a content line so that no physical line exceeds 75 octets.
+
+    Lines are split between characters, never inside a UTF-8 sequence or
+    right after the backslash of an escape, matching icalendar's output.
+    """
+    if len(line) < FOLD_LIMIT and line.isascii():
+        return line
+
+    if line.isascii() and "\\" not in line and "^" not in line:
+        width = FOLD_LIMIT - 1
+        return "\r\n ".join(line[i:i + width] for i in range(0, len(line), width))
+
+    folded = []
+    current = []
+    byte_count = 0
+    for char in line:
+        char_bytes = len(char.encode("utf-8"))
+        if current and byte_count + char_bytes >= FOLD_LIMIT:
+            carried = []
+            if len(current) > 1 and current[-1] in "\\^":
+                carried = [current.pop()]
+            folded.append("".join(current))
+            current = carried
+            byte_count = sum(len(c.encode("utf-8")) for c in carried)
+        current.append(char)
+        byte_count += char_bytes
+
+    if current:
+        folded.append("".join(current))
+    return "\r\n ".join(folded)
+
+
+def iter_calendar(
+    calendar_properties: Properties, events: Iterable[Properties]
+) -> Iterator[str]:
+    """
+    Serialize a VCALENDAR line by line without building an object graph.
+
+    Args:
+        calendar_properties: VCALENDAR properties such as VERSION and PRODID
+        events: Properties of each VEVENT; consumed lazily
+
+    Yields:
+        Folded content lines, each terminated by CRLF
+    """
+    yield "BEGIN:VCALENDAR" + CRLF
+    for name, value in calendar_properties:
+        yield fold_line(f"{name}:{format_value(value)}") + CRLF
+
+    for properties in events:
+        yield "BEGIN:VEVENT" + CRLF
+        for name, value in properties:
+            yield fold_line(f"{name}:{format_value(value)}") + CRLF
+        yield "END:VEVENT" + CRLF
+
+    yield "END:VCALENDAR" + CRLF
+
+
+def write_calendar(
+    file: TextIO, calendar_properties: Properties, events: Iterable[Properties]
+) -> None:
+    """Stream a VCALENDAR into a text file opened with newline=""."""
+    file.writelines(iter_calendar(calendar_properties, events))
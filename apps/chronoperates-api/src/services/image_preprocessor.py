@@ -0,0 +1,134 @@
+import io
+from typing import Optional, Tuple
+from src.config import settings
+from src.lazy import lazy_import
+from src.services.image_validation import image_decode_errors
+
+ExifTags = lazy_import("PIL.ExifTags")
+Image = lazy_import("PIL.Image")
+ImageOps = lazy_import("PIL.ImageOps")
+
+
+# Formats we can re-encode to, mapped to the media type sent to Claude
+OUTPUT_MEDIA_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+}
+
+# Claude downsizes images whose long edge exceeds this, or whose area exceeds
+# roughly 1.15 megapixels, before tokenizing them at ~750 pixels per token
+CLAUDE_MAX_LONG_EDGE = 1568
+CLAUDE_MAX_PIXELS = 1_150_000
+PIXELS_PER_TOKEN = 750
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Estimate the input tokens Claude charges for an image of the given size.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+
+    Returns:
+        Approximate number of image tokens
+    """
+    scale = min(
+        1.0,
+        CLAUDE_MAX_LONG_EDGE / max(width, height),
+        (CLAUDE_MAX_PIXELS / (width * height)) ** 0.5,
+    )
+    return int((width * scale) * (height * scale) / PIXELS_PER_TOKEN)
+
+
+class ImagePreprocessor:
+    """Downscale, reorient and recompress images before they are sent to Claude."""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_long_edge: Optional[int] = None,
+        output_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        grayscale: Optional[bool] = None,
+    ):
+        self.enabled = settings.preprocess_enabled if enabled is None else enabled
+        self.max_long_edge = max_long_edge or settings.preprocess_max_long_edge
+        self.output_format = (output_format or settings.preprocess_format).upper()
+        self.quality = quality or settings.preprocess_quality
+        self.grayscale = settings.preprocess_grayscale if grayscale is None else grayscale
+
+        if self.output_format not in OUTPUT_MEDIA_TYPES:
+            raise ValueError(f"Unsupported preprocess format: {self.output_format}")
+
+    def process(self, image_data: bytes, media_type: str) -> Tuple[bytes, str]:
+        """
+        Prepare image bytes for the Claude request.
+
+        The original bytes are returned untouched when preprocessing is
+        disabled, or when no transform was needed and re-encoding would not
+        make the payload smaller.
+
+        Args:
+            image_data: Raw image file content
+            media_type: Media type of the original image
+
+        Returns:
+            Tuple of (image bytes to send, media type of those bytes)
+
+        Raises:
+            ValueError: If the image does not decode
+        """
+        if not self.enabled:
+            return image_data, media_type
+
+        with image_decode_errors(), Image.open(io.BytesIO(image_data)) as img:
+            transformed = False
+            processed = img
+
+            if img.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+                processed = ImageOps.exif_transpose(img)
+                transformed = True
+
+            if max(processed.size) > self.max_long_edge:
+                # draft() lets the JPEG decoder downscale by a power of two for free
+                processed.draft(processed.mode, (self.max_long_edge, self.max_long_edge))
+                processed = processed.copy()
+                processed.thumbnail(
+                    (self.max_long_edge, self.max_long_edge), Image.Resampling.LANCZOS
+                )
+                transformed = True
+
+            if self.grayscale and processed.mode != "L":
+                processed = processed.convert("L")
+                transformed = True
+
+            output = self._encode(processed)
+
+        if not transformed and len(output) >= len(image_data):
+            return image_data, media_type
+
+        return output, OUTPUT_MEDIA_TYPES[self.output_format]
+
+    def _encode(self, img: "Image.Image") -> bytes:
+        """Encode the image in the configured output format."""
+        if self.output_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = self._flatten(img)
+
+        buffer = io.BytesIO()
+        save_kwargs = {"optimize": True}
+        if self.output_format in ("JPEG", "WEBP"):
+            save_kwargs["quality"] = self.quality
+        img.save(buffer, self.output_format, **save_kwargs)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _flatten(img: "Image.Image") -> "Image.Image":
+        """Composite transparent images onto white for formats without alpha."""
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            rgba = img.convert("RGBA")
+            background = Image.new("RGB", rgba.size, "white")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            return background
+        return img.convert("RGB")
@@ -0,0 +1,103 @@
+import io
+import math
+from typing import List, Tuple
+from src.lazy import lazy_import
+from src.services.image_validation import image_decode_errors
+
+ExifTags = lazy_import("PIL.ExifTags")
+Image = lazy_import("PIL.Image")
+ImageOps = lazy_import("PIL.ImageOps")
+
+
+# (left, upper, right, lower) in pixels, as taken by Image.crop
+Box = Tuple[int, int, int, int]
+
+
+def _axis_positions(length: int, tile: int, overlap: int) -> List[int]:
+    """Start offsets of tiles evenly spread along one axis, overlapping by at least overlap."""
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - overlap) / (tile - overlap))
+    step = (length - tile) / (count - 1)
+    return [round(i * step) for i in range(count)]
+
+
+def plan_tiles(
+    width: int, height: int, tile_size: int, overlap: float, max_tiles: int
+) -> List[Box]:
+    """
+    Cover an image with a grid of overlapping square tiles.
+
+    Tiles are evenly spaced so the overlap is at least the requested
+    fraction of a tile everywhere. If the grid would need more than
+    max_tiles, the tiles are enlarged until it fits; they are then
+    downscaled like any other image before being sent.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        tile_size: Edge of a tile in pixels
+        overlap: Fraction of a tile shared with each neighbour, below 0.5
+        max_tiles: Largest number of tiles to return
+
+    Returns:
+        Crop boxes, row by row from the top left
+    """
+    if not 0 <= overlap < 0.5:
+        raise ValueError(f"Tile overlap must be at least 0 and below 0.5, got {overlap}")
+
+    while True:
+        overlap_px = int(tile_size * overlap)
+        xs = _axis_positions(width, tile_size, overlap_px)
+        ys = _axis_positions(height, tile_size, overlap_px)
+        if len(xs) * len(ys) <= max(max_tiles, 1):
+            break
+        tile_size = math.ceil(tile_size * 1.25)
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in ys
+        for x in xs
+    ]
+
+
+def split_image(
+    image_data: bytes, tile_size: int, overlap: float, max_tiles: int
+) -> List[bytes]:
+    """
+    Cut an image into overlapping tiles.
+
+    The image is turned upright first if its EXIF orientation says so, so
+    the tiles match what a viewer sees. Tiles of RGB and greyscale images
+    are encoded as high quality JPEG, others as PNG to keep transparency.
+
+    Args:
+        image_data: Raw image file content
+        tile_size: Edge of a tile in pixels
+        overlap: Fraction of a tile shared with each neighbour
+        max_tiles: Largest number of tiles to return
+
+    Returns:
+        Encoded tiles, row by row from the top left
+
+    Raises:
+        ValueError: If the image does not decode
+    """
+    with image_decode_errors(), Image.open(io.BytesIO(image_data)) as img:
+        upright = img
+        if img.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+            upright = ImageOps.exif_transpose(img)
+
+        tiles = []
+        for box in plan_tiles(*upright.size, tile_size, overlap, max_tiles):
+            tile = upright.crop(box)
+            if tile.mode not in ("RGB", "L", "RGBA", "LA", "P"):
+                # CMYK, 16-bit and other modes neither encoder takes as is
+                tile = tile.convert("RGB")
+            buffer = io.BytesIO()
+            if tile.mode in ("RGB", "L"):
+                tile.save(buffer, "JPEG", quality=95)
+            else:
+                tile.save(buffer, "PNG")
+            tiles.append(buffer.getvalue())
+        return tiles
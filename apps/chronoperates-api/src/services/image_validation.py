@@ -0,0 +1,207 @@
+import contextlib
+import io
+import struct
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+from src.lazy import lazy_import
+
+Image = lazy_import("PIL.Image")
+
+
+FORMAT_MEDIA_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+    "WEBP": "image/webp",
+    "BMP": "image/bmp",
+}
+
+# File extensions of each format, as listed in settings.supported_formats
+FORMAT_EXTENSIONS = {
+    "JPEG": (".jpg", ".jpeg"),
+    "PNG": (".png",),
+    "GIF": (".gif",),
+    "WEBP": (".webp",),
+    "BMP": (".bmp",),
+}
+
+# JPEG start-of-frame markers, which carry the dimensions; C4, C8 and CC are not frames
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+_JPEG_STANDALONE_MARKERS = frozenset([0x01, *range(0xD0, 0xD8)])
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """Format and dimensions of an image, read from its header."""
+
+    format: str
+    width: int
+    height: int
+
+    @property
+    def media_type(self) -> str:
+        return FORMAT_MEDIA_TYPES[self.format]
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+def sniff_format(data) -> Optional[str]:
+    """
+    Identify an image format from its magic bytes.
+
+    Args:
+        data: The image, or at least its first 12 bytes
+
+    Returns:
+        A FORMAT_MEDIA_TYPES key, or None if the bytes match no supported format
+    """
+    head = bytes(data[:12])
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    if head[:2] == b"BM":
+        return "BMP"
+    return None
+
+
+def read_image_info(data) -> ImageInfo:
+    """
+    Read an image's format and dimensions from its header, without decoding it.
+
+    Only the first few dozen bytes are looked at, except for JPEG, whose
+    segments are skipped by their lengths up to the start-of-frame marker.
+    Passing an mmap of a file therefore reads just its first pages.
+
+    Args:
+        data: Image content as a bytes-like object
+
+    Returns:
+        The image's format and dimensions
+
+    Raises:
+        ValueError: If the format is not recognized or the header is malformed
+    """
+    image_format = sniff_format(data)
+    if image_format is None:
+        raise ValueError("Invalid image file: unrecognized image format")
+
+    try:
+        width, height = _DIMENSION_READERS[image_format](data)
+    except (struct.error, IndexError):
+        raise ValueError(f"Invalid image file: truncated {image_format} header")
+
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid image file: {image_format} header has no dimensions")
+    return ImageInfo(image_format, width, height)
+
+
+def decode_image(data) -> None:
+    """
+    Fully decode an image with PIL, for when header checks are not enough.
+
+    Raises:
+        ValueError: If PIL cannot decode the image
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+    except Exception as e:
+        raise ValueError(f"Invalid image file: {str(e)}")
+
+
+@contextlib.contextmanager
+def image_decode_errors() -> Iterator[None]:
+    """
+    Report PIL failing to decode an image as an invalid image.
+
+    Header checks pass images whose body is corrupt or cut short; PIL only
+    finds out when it decodes the pixels, and raises OSError or SyntaxError.
+
+    Raises:
+        ValueError: If the enclosed block fails to decode the image
+    """
+    try:
+        yield
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Invalid image file: {str(e)}") from e
+
+
+def _jpeg_dimensions(data) -> Tuple[int, int]:
+    offset = 2
+    while True:
+        if data[offset] != 0xFF:
+            raise ValueError("Invalid image file: JPEG marker expected")
+        # Any number of 0xFF fill bytes may precede a marker
+        while data[offset] == 0xFF:
+            offset += 1
+        marker = data[offset]
+        offset += 1
+
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("Invalid image file: JPEG has no frame header")
+
+        (length,) = struct.unpack_from(">H", data, offset)
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from(">HH", data, offset + 3)
+            return width, height
+        if length < 2:
+            raise ValueError("Invalid image file: bad JPEG segment length")
+        offset += length
+
+
+def _png_dimensions(data) -> Tuple[int, int]:
+    width, height = struct.unpack_from(">II", data, 16)
+    if bytes(data[12:16]) != b"IHDR":
+        raise ValueError("Invalid image file: PNG does not start with IHDR")
+    return width, height
+
+
+def _gif_dimensions(data) -> Tuple[int, int]:
+    return struct.unpack_from("<HH", data, 6)
+
+
+def _webp_dimensions(data) -> Tuple[int, int]:
+    chunk = bytes(data[12:16])
+    if chunk == b"VP8 ":
+        width, height = struct.unpack_from("<HH", data, 26)
+        if bytes(data[23:26]) != b"\x9d\x01\x2a":
+            raise ValueError("Invalid image file: bad WebP frame header")
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        (bits,) = struct.unpack_from("<I", data, 21)
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        # 24-bit little-endian canvas width and height, minus one
+        canvas = bytes(data[24:30])
+        if len(canvas) < 6:
+            raise struct.error("VP8X chunk is truncated")
+        return int.from_bytes(canvas[:3], "little") + 1, int.from_bytes(canvas[3:], "little") + 1
+    raise ValueError("Invalid image file: unknown WebP chunk")
+
+
+def _bmp_dimensions(data) -> Tuple[int, int]:
+    (header_size,) = struct.unpack_from("<I", data, 14)
+    if header_size == 12:
+        return struct.unpack_from("<HH", data, 18)
+    width, height = struct.unpack_from("<ii", data, 18)
+    # A negative height marks a top-down bitmap
+    return width, abs(height)
+
+
+_DIMENSION_READERS = {
+    "JPEG": _jpeg_dimensions,
+    "PNG": _png_dimensions,
+    "GIF": _gif_dimensions,
+    "WEBP": _webp_dimensions,
+    "BMP": _bmp_dimensions,
+}
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key into one execution.
+
+    The first caller for a key starts the work as a separate task; callers
+    arriving while it runs await the same task. The work is shielded, so a
+    caller that disconnects does not cancel it for everyone else. Results are
+    not retained once the task finishes; that is the cache's job.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn for key, or join the execution already in flight for key.
+
+        Args:
+            key: Identity of the work, e.g. a cache key
+            fn: Zero-argument coroutine function performing the work
+
+        Returns:
+            The result of the shared execution
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
@@ -0,0 +1,153 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+# Allowance for boundaries and part headers when checking Content-Length up front
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadError(ValueError):
+    """Raised when a multipart upload is malformed."""
+
+
+class UploadTooLargeError(UploadError):
+    """Raised as soon as an uploaded file exceeds the configured size limit."""
+
+
+@dataclass
+class UploadedFile:
+    """A file part read from a multipart body, hashed while it streamed in."""
+
+    field_name: str
+    filename: str
+    content_type: str
+    data: bytearray = field(default_factory=bytearray)
+    content_hash: "hashlib._Hash" = field(default_factory=hashlib.md5)
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class _MultipartFileCollector:
+    """Callback target for MultipartParser that collects file parts in memory."""
+
+    def __init__(self, max_file_bytes: int, max_files: Optional[int]):
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.files: List[UploadedFile] = []
+        self._headers: dict = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._current: Optional[UploadedFile] = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._current = None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            # Plain form fields are ignored; only file parts are collected
+            return
+
+        if self.max_files is not None and len(self.files) >= self.max_files:
+            raise UploadError(f"Too many files (max: {self.max_files})")
+
+        self._current = UploadedFile(
+            field_name=options.get(b"name", b"").decode("latin-1"),
+            filename=options[b"filename"].decode("utf-8", errors="replace"),
+            content_type=self._headers.get(b"content-type", b"").decode("latin-1"),
+        )
+        self.files.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is None:
+            return
+
+        chunk = data[start:end]
+        if self._current.size + len(chunk) > self.max_file_bytes:
+            raise UploadTooLargeError(
+                f"Image file too large (max: {self.max_file_bytes // (1024 * 1024)}MB)"
+            )
+
+        self._current.data += chunk
+        self._current.content_hash.update(chunk)
+
+    def on_part_end(self) -> None:
+        self._current = None
+
+
+async def read_multipart_files(
+    content_type: str,
+    stream: AsyncIterator[bytes],
+    max_file_bytes: int,
+    max_files: Optional[int] = None,
+    content_length: Optional[int] = None,
+) -> List[UploadedFile]:
+    """
+    Read file parts from a multipart/form-data body as it streams in.
+
+    Each file is accumulated in memory and hashed chunk-by-chunk, and the
+    upload is rejected the moment any single file exceeds max_file_bytes,
+    without waiting for the rest of the body.
+
+    Args:
+        content_type: The request Content-Type header
+        stream: Async iterator over raw body chunks (e.g. request.stream())
+        max_file_bytes: Maximum size of a single file part
+        max_files: Maximum number of file parts, or None for no limit
+        content_length: Declared body size, used to reject oversized bodies
+            before reading a single byte when max_files is set
+
+    Returns:
+        List of UploadedFile objects in the order they appeared in the body
+    """
+    mime_type, options = parse_options_header(content_type or "")
+    if mime_type != b"multipart/form-data" or b"boundary" not in options:
+        raise UploadError("Request must be multipart/form-data")
+
+    if content_length is not None and max_files is not None:
+        max_body_bytes = max_file_bytes * max_files + MULTIPART_OVERHEAD_BYTES
+        if content_length > max_body_bytes:
+            raise UploadTooLargeError(
+                f"Request body too large: {content_length} bytes (max: {max_body_bytes})"
+            )
+
+    collector = _MultipartFileCollector(max_file_bytes, max_files)
+    parser = MultipartParser(options[b"boundary"], collector.callbacks())
+
+    try:
+        async for chunk in stream:
+            parser.write(chunk)
+        parser.finalize()
+    except UploadError:
+        raise
+    except Exception as e:
+        raise UploadError(f"Invalid multipart data: {str(e)}")
+
+    return collector.files
@@ -0,0 +1,97 @@
+import json
+import os
+import time
+import pytest
+from src.cache.disk import DiskCache
+
+
+class TestDiskCache:
+    """Test cases for the JSON file cache tier."""
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path):
+        return tmp_path / "claude_cache"
+
+    def test_round_trip_stores_real_timestamp(self, cache_dir):
+        """Test that values persist with the time they were written."""
+        cache = DiskCache(cache_dir)
+        before = time.time()
+        cache.set("key", "response text")
+
+        data = json.loads((cache_dir / "key.json").read_text())
+        assert data["response"] == "response text"
+        assert before <= data["timestamp"] <= time.time()
+
+        entry = DiskCache(cache_dir).get("key")
+        assert entry.value == "response text"
+        assert entry.stored_at == data["timestamp"]
+
+    def test_evicts_by_entry_count(self, cache_dir):
+        """Test that the least recently used files are removed beyond max_entries."""
+        cache = DiskCache(cache_dir, max_entries=2)
+        cache.set("a", "alpha")
+        cache.set("b", "beta")
+        cache.get("a")
+        cache.set("c", "gamma")
+
+        assert sorted(p.stem for p in cache_dir.glob("*.json")) == ["a", "c"]
+        assert cache.stats.as_dict()["evictions"] == 1
+
+    def test_evicts_by_total_bytes(self, cache_dir):
+        """Test that the total size stays within max_bytes."""
+        cache = DiskCache(cache_dir, max_bytes=500)
+        for i in range(10):
+            cache.set(f"k{i}", "x" * 100)
+
+        assert cache.total_bytes <= 500
+        assert sum(p.stat().st_size for p in cache_dir.glob("*.json")) == cache.total_bytes
+        assert cache.get("k9") is not None
+        assert cache.get("k0") is None
+
+    def test_ttl_expiry(self, cache_dir):
+        """Test that expired entries are removed on read and by purge."""
+        cache = DiskCache(cache_dir, ttl_seconds=60)
+        cache.set("old", "stale", stored_at=time.time() - 120)
+        cache.set("new", "fresh")
+        old_time = time.time() - 120
+        os.utime(cache_dir / "old.json", (old_time, old_time))
+
+        assert cache.purge_expired() == 1
+        assert cache.get("old") is None
+        assert cache.get("new").value == "fresh"
+
+        cache.set("stale", "value", stored_at=time.time() - 120)
+        assert cache.get("stale") is None
+        assert not (cache_dir / "stale.json").exists()
+
+    def test_legacy_entry_uses_file_mtime(self, cache_dir):
+        """Test that entries with the old string timestamp are still readable."""
+        cache_dir.mkdir()
+        (cache_dir / "legacy.json").write_text(
+            json.dumps({"response": "old response", "timestamp": "0"})
+        )
+
+        entry = DiskCache(cache_dir).get("legacy")
+
+        assert entry.value == "old response"
+        assert entry.stored_at == (cache_dir / "legacy.json").stat().st_mtime
+
+    def test_corrupted_entry_is_removed(self, cache_dir):
+        """Test that unreadable files are treated as misses and deleted."""
+        cache_dir.mkdir()
+        (cache_dir / "broken.json").write_text("{not json")
+        cache = DiskCache(cache_dir)
+
+        assert cache.get("broken") is None
+        assert not (cache_dir / "broken.json").exists()
+        assert len(cache) == 0
+
+    def test_clear(self, cache_dir):
+        """Test that clear removes every cache file."""
+        cache = DiskCache(cache_dir)
+        cache.set("a", "alpha")
+        cache.set("b", "beta")
+
+        assert cache.clear() == 2
+        assert list(cache_dir.glob("*.json")) == []
+        assert cache.total_bytes == 0
@@ -0,0 +1,90 @@
+import multiprocessing
+import subprocess
+import sys
+import time
+from src.cache.lease import LeaseManager
+
+
+def _contend(db_path, key, results, done):
+    """Try to take a lease from a separate process, staying alive until done."""
+    results.put(LeaseManager(db_path, ttl_seconds=60).try_acquire(key))
+    done.wait(30)
+
+
+class TestLeaseManager:
+    """Test cases for cross-worker cache key leases."""
+
+    def test_only_one_holder(self, tmp_path):
+        """Test that a held lease blocks other workers until released."""
+        db_path = tmp_path / "leases.sqlite3"
+        first = LeaseManager(db_path, ttl_seconds=60)
+        second = LeaseManager(db_path, ttl_seconds=60)
+
+        assert first.try_acquire("key") is True
+        assert first.try_acquire("key") is True  # re-entrant for the holder
+        assert second.try_acquire("key") is False
+        assert second.holder("key") == first.owner
+
+        first.release("key")
+        assert second.try_acquire("key") is True
+
+    def test_expired_lease_is_taken_over(self, tmp_path):
+        """Test that a lease that was not renewed becomes free."""
+        db_path = tmp_path / "leases.sqlite3"
+        first = LeaseManager(db_path, ttl_seconds=0.05)
+        second = LeaseManager(db_path, ttl_seconds=60)
+
+        assert first.try_acquire("key") is True
+        assert second.try_acquire("key") is False
+        time.sleep(0.1)
+
+        assert second.try_acquire("key") is True
+        assert second.takeovers == 1
+        assert first.renew("key") is False
+
+    def test_renew_keeps_lease_alive(self, tmp_path):
+        """Test that renewing pushes the expiry forward."""
+        db_path = tmp_path / "leases.sqlite3"
+        first = LeaseManager(db_path, ttl_seconds=0.2)
+        second = LeaseManager(db_path, ttl_seconds=60)
+
+        first.try_acquire("key")
+        for _ in range(3):
+            time.sleep(0.1)
+            assert first.renew("key") is True
+
+        assert second.try_acquire("key") is False
+
+    def test_dead_holder_is_taken_over_immediately(self, tmp_path):
+        """Test stale-lease recovery when the holding worker died."""
+        db_path = tmp_path / "leases.sqlite3"
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+
+        crashed = LeaseManager(db_path, ttl_seconds=3600)
+        crashed.pid = dead.pid
+        crashed.try_acquire("key")
+
+        survivor = LeaseManager(db_path, ttl_seconds=60)
+        assert survivor.try_acquire("key") is True
+        assert survivor.takeovers == 1
+
+    def test_exactly_one_process_wins(self, tmp_path):
+        """Test contention between real processes."""
+        db_path = tmp_path / "leases.sqlite3"
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        done = ctx.Event()
+        processes = [
+            ctx.Process(target=_contend, args=(db_path, "key", results, done))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+
+        outcomes = [results.get(timeout=60) for _ in processes]
+        done.set()
+        for process in processes:
+            process.join(timeout=30)
+
+        assert outcomes.count(True) == 1
@@ -0,0 +1,48 @@
+from unittest.mock import patch
+from src.cache.memory import MemoryCache
+
+
+class TestMemoryCache:
+    """Test cases for the in-process LRU tier."""
+
+    def test_get_and_set(self):
+        """Test a basic round trip and hit/miss counters."""
+        cache = MemoryCache(max_entries=2)
+
+        assert cache.get("a") is None
+        cache.set("a", "alpha")
+
+        assert cache.get("a").value == "alpha"
+        assert cache.stats.as_dict()["hits"] == 1
+        assert cache.stats.as_dict()["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", "alpha")
+        cache.set("b", "beta")
+        cache.get("a")
+        cache.set("c", "gamma")
+
+        assert cache.get("b") is None
+        assert cache.get("a").value == "alpha"
+        assert cache.get("c").value == "gamma"
+        assert cache.stats.as_dict()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are dropped on read."""
+        cache = MemoryCache(max_entries=2, ttl_seconds=60)
+        with patch("src.cache.memory.time.time", return_value=1000.0):
+            cache.set("a", "alpha")
+        with patch("src.cache.memory.time.time", return_value=1061.0):
+            assert cache.get("a") is None
+
+        assert cache.stats.as_dict()["expirations"] == 1
+        assert len(cache) == 0
+
+    def test_zero_capacity_disables_tier(self):
+        """Test that max_entries=0 stores nothing."""
+        cache = MemoryCache(max_entries=0)
+        cache.set("a", "alpha")
+
+        assert cache.get("a") is None
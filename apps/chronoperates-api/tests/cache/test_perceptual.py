@@ -0,0 +1,132 @@
+import io
+import random
+import pytest
+from PIL import Image, ImageDraw
+from src.cache.perceptual import MultiIndexHash, PerceptualIndex, dhash, hamming_distance
+
+
+def make_flyer(seed, size=(600, 800)):
+    """Create a structured test image with blocks of "text"."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    for _ in range(25):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + rng.randrange(40, 300), y + rng.randrange(20, 120)], fill=color)
+    return img
+
+
+def encode(img, fmt, **kwargs):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **kwargs)
+    return buffer.getvalue()
+
+
+class TestDHash:
+    """Test cases for the difference hash."""
+
+    def test_near_duplicates_are_close(self):
+        """Test that re-encoding, recompression and resizing change few bits."""
+        img = make_flyer(1)
+        original = dhash(encode(img, "JPEG", quality=95))
+
+        variants = [
+            encode(img, "PNG"),
+            encode(img, "JPEG", quality=30),
+            encode(img.resize((300, 400)), "JPEG", quality=80),
+            encode(img, "WEBP", quality=50),
+        ]
+
+        for variant in variants:
+            assert hamming_distance(original, dhash(variant)) <= 4
+
+    def test_different_images_are_far(self):
+        """Test that unrelated images are well separated."""
+        first = dhash(encode(make_flyer(1), "PNG"))
+        second = dhash(encode(make_flyer(2), "PNG"))
+
+        assert hamming_distance(first, second) > 10
+
+    def test_hash_fits_64_bits(self):
+        """Test the hash range."""
+        assert 0 <= dhash(encode(make_flyer(3), "PNG")) < 1 << 64
+
+    def test_truncated_image_is_invalid(self):
+        data = encode(make_flyer(4), "PNG")
+
+        with pytest.raises(ValueError, match="Invalid image file"):
+            dhash(data[: len(data) // 2])
+
+
+class TestMultiIndexHash:
+    """Test cases for the multi-index hash table."""
+
+    @pytest.mark.parametrize("radius", [0, 1, 4, 8])
+    def test_search_matches_linear_scan(self, radius):
+        """Test that search returns exactly the items a brute-force scan finds."""
+        rng = random.Random(7)
+        items = [rng.getrandbits(64) for _ in range(2000)]
+        # Plant neighbours of the query at every distance up to radius + 1
+        query = items[0]
+        for distance in range(radius + 2):
+            flipped = query
+            for bit in rng.sample(range(64), distance):
+                flipped ^= 1 << bit
+            items.append(flipped)
+        index = MultiIndexHash(radius)
+        for position, item in enumerate(items):
+            index.add(item, position)
+
+        expected = sorted(
+            position for position, item in enumerate(items)
+            if hamming_distance(query, item) <= radius
+        )
+        results = index.search(query)
+
+        assert sorted(value for _, value in results) == expected
+        assert [d for d, _ in results] == sorted(d for d, _ in results)
+        assert len(index) == len(items)
+
+    def test_smaller_radius_and_limits(self):
+        """Test narrower searches and the supported radius range."""
+        index = MultiIndexHash(4)
+        index.add(0b0, "exact")
+        index.add(0b111, "three bits")
+
+        assert [v for _, v in index.search(0b0, max_distance=1)] == ["exact"]
+        assert MultiIndexHash(4).search(123) == []
+        with pytest.raises(ValueError):
+            index.search(0, max_distance=5)
+        with pytest.raises(ValueError):
+            MultiIndexHash(64)
+
+
+class TestPerceptualIndex:
+    """Test cases for the persisted near-duplicate index."""
+
+    def test_candidates_are_shared_between_instances(self, tmp_path):
+        """Test that entries written by one worker are visible to another."""
+        db_path = tmp_path / "perceptual.sqlite3"
+        writer = PerceptualIndex(db_path, max_distance=4)
+        reader = PerceptualIndex(db_path, max_distance=4)
+        phash = (1 << 63) | 0b1011  # exercises the signed 64-bit storage
+
+        writer.add("prompt", phash, "key-1")
+
+        assert reader.candidates("prompt", phash ^ 0b1) == ["key-1"]
+        assert reader.candidates("prompt", phash ^ 0b11111) == []
+        assert reader.candidates("other-prompt", phash) == []
+        assert len(PerceptualIndex(db_path, max_distance=4)) == 1
+
+    def test_remove(self, tmp_path):
+        """Test that removed keys are no longer returned."""
+        index = PerceptualIndex(tmp_path / "perceptual.sqlite3", max_distance=4)
+        index.add("prompt", 42, "key-1")
+        index.remove("key-1")
+
+        assert index.candidates("prompt", 42) == []
+        assert len(index) == 0
+
+        index.add("prompt", 42, "key-1")
+        assert index.candidates("prompt", 42) == ["key-1"]
@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+import pytest
+from src.cache import create_cache_backend
+from src.cache.migrate import main as migrate_main
+from src.cache.sqlite import SQLiteCache
+
+
+class TestSQLiteCache:
+    """Test cases for the SQLite cache backend."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return tmp_path / "responses.sqlite3"
+
+    def test_round_trip_and_wal_mode(self, db_path):
+        """Test that values persist across instances and WAL is enabled."""
+        cache = SQLiteCache(db_path)
+        cache.set("key", "response text")
+
+        reopened = SQLiteCache(db_path)
+        entry = reopened.get("key")
+        assert entry.value == "response text"
+        assert entry.stored_at <= time.time()
+        assert reopened._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert reopened.get("missing") is None
+
+    def test_totals_track_writes_and_overwrites(self, db_path):
+        """Test that trigger-maintained totals match the table."""
+        cache = SQLiteCache(db_path)
+        cache.set("a", "x" * 10)
+        cache.set("b", "y" * 20)
+        cache.set("a", "z" * 5)
+        cache.delete("b")
+
+        assert len(cache) == 1
+        assert cache.total_bytes == 5
+
+    def test_evicts_least_recently_used_by_count(self, db_path):
+        """Test eviction beyond max_entries."""
+        cache = SQLiteCache(db_path, max_entries=2)
+        # The read comes more than TOUCH_INTERVAL_SECONDS after "a" was written
+        with patch("src.cache.sqlite.time.time", side_effect=[1.0, 2.0, 100.0, 101.0]):
+            cache.set("a", "alpha")
+            cache.set("b", "beta")
+            cache.get("a")
+            cache.set("c", "gamma")
+
+        assert cache.get("b") is None
+        assert cache.get("a").value == "alpha"
+        assert cache.stats.as_dict()["evictions"] == 1
+
+    def test_recent_hits_do_not_write(self, db_path):
+        """Test that last_used is only rewritten once it is older than the touch interval."""
+        cache = SQLiteCache(db_path)
+        with patch("src.cache.sqlite.time.time", return_value=1000.0):
+            cache.set("a", "alpha")
+
+        def last_used():
+            return cache._conn.execute("SELECT last_used FROM responses").fetchone()[0]
+
+        with patch("src.cache.sqlite.time.time", return_value=1030.0):
+            cache.get("a")
+        assert last_used() == 1000.0
+
+        with patch("src.cache.sqlite.time.time", return_value=1100.0):
+            cache.get("a")
+        assert last_used() == 1100.0
+
+    def test_locked_database_is_a_miss(self, db_path):
+        """Test that a lookup failing with "database is locked" does not fail the caller."""
+        cache = SQLiteCache(db_path)
+        cache.set("a", "alpha")
+        cache._conn = Mock()
+        cache._conn.execute.side_effect = sqlite3.OperationalError("database is locked")
+
+        assert cache.get("a") is None
+        assert cache.stats.as_dict()["misses"] == 1
+
+    def test_evicts_by_total_bytes(self, db_path):
+        """Test eviction beyond max_bytes keeps the most recent rows."""
+        cache = SQLiteCache(db_path, max_bytes=250)
+        for i in range(10):
+            cache.set(f"k{i}", "x" * 100)
+            time.sleep(0.001)
+
+        assert cache.total_bytes <= 250
+        assert len(cache) == 2
+        assert cache.get("k9") is not None
+
+    def test_ttl_and_bulk_purge(self, db_path):
+        """Test TTL expiry on read and bulk eviction by age."""
+        cache = SQLiteCache(db_path, ttl_seconds=60)
+        now = time.time()
+        cache.set("stale", "old", stored_at=now - 120)
+        for i in range(5):
+            cache.set(f"old{i}", "old", stored_at=now - 90)
+        cache.set("fresh", "new")
+
+        assert cache.get("stale") is None
+        assert cache.purge_expired() == 5
+        assert len(cache) == 1
+
+    def test_concurrent_writers_share_one_file(self, db_path):
+        """Test that independent connections can write concurrently."""
+        caches = [SQLiteCache(db_path) for _ in range(4)]
+
+        def write(index):
+            for i in range(50):
+                caches[index].set(f"{index}-{i}", "value")
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(write, range(4)))
+
+        assert len(SQLiteCache(db_path)) == 200
+
+    def test_import_json_dir(self, tmp_path, db_path):
+        """Test importing a JSON cache directory, including legacy and broken files."""
+        json_dir = tmp_path / "claude_cache"
+        json_dir.mkdir()
+        (json_dir / "new.json").write_text(json.dumps({"response": "a", "timestamp": 1000.0}))
+        (json_dir / "legacy.json").write_text(json.dumps({"response": "b", "timestamp": "0"}))
+        (json_dir / "broken.json").write_text("{not json")
+
+        cache = SQLiteCache(db_path)
+        assert not cache.has_imported(json_dir)
+        assert cache.import_json_dir(json_dir, remove=True) == 2
+
+        assert cache.has_imported(json_dir)
+        assert cache.get("legacy").value == "b"
+        assert sorted(p.name for p in json_dir.glob("*.json")) == ["broken.json"]
+        # Re-importing keeps existing entries
+        assert cache.import_json_dir(json_dir) == 0
+
+    def test_migrate_cli(self, tmp_path, db_path):
+        """Test the command-line migration entry point."""
+        json_dir = tmp_path / "claude_cache"
+        json_dir.mkdir()
+        (json_dir / "key.json").write_text(json.dumps({"response": "a", "timestamp": 1.0}))
+
+        assert migrate_main(["--json-dir", str(json_dir), "--db", str(db_path)]) == 0
+        assert SQLiteCache(db_path).get("key").value == "a"
+
+    def test_factory_imports_existing_json_cache_once(self, tmp_path):
+        """Test that the sqlite backend picks up a legacy cache on first start."""
+        (tmp_path / "key.json").write_text(json.dumps({"response": "a", "timestamp": 1.0}))
+
+        with patch("src.cache.settings") as mock_settings:
+            mock_settings.cache_backend = "sqlite"
+            mock_settings.cache_dir = tmp_path
+            mock_settings.cache_ttl_seconds = 0
+            mock_settings.cache_disk_max_entries = 0
+            mock_settings.cache_disk_max_bytes = 0
+            backend = create_cache_backend()
+
+            assert isinstance(backend, SQLiteCache)
+            assert backend.get("key").value == "a"
+            assert backend.has_imported(tmp_path)
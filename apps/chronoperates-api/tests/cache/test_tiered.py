@@ -0,0 +1,32 @@
+from src.cache.disk import DiskCache
+from src.cache.memory import MemoryCache
+from src.cache.tiered import TieredCache
+
+
+class TestTieredCache:
+    """Test cases for the memory-over-disk cache."""
+
+    def test_disk_hit_is_promoted_to_memory(self, tmp_path):
+        """Test that a disk hit is served from memory afterwards."""
+        DiskCache(tmp_path).set("key", "response")
+        cache = TieredCache(MemoryCache(max_entries=10), DiskCache(tmp_path))
+
+        assert cache.get("key") == "response"
+        assert cache.get("key") == "response"
+
+        stats = cache.stats()
+        assert stats["memory"]["hits"] == 1
+        assert stats["memory"]["misses"] == 1
+        assert stats["disk"]["hits"] == 1
+        assert stats["disk"]["entries"] == 1
+
+    def test_set_writes_through_and_clear_empties_both(self, tmp_path):
+        """Test write-through and clearing both tiers."""
+        cache = TieredCache(MemoryCache(max_entries=10), DiskCache(tmp_path))
+        cache.set("key", "response")
+
+        assert (tmp_path / "key.json").exists()
+        assert len(cache.memory) == 1
+
+        assert cache.clear() == 1
+        assert cache.get("key") is None
@@ -8,6 +8,23 @@ import os
 from PIL import Image
 
 
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """
+    Keep the cache, job and artifact databases of every test under its own
+    tmp_path, and drop the services built from them when the test ends.
+    """
+    from src.config import settings
+    from src.dependencies import services
+
+    monkeypatch.setattr(settings, "cache_dir", tmp_path / "claude_cache")
+    monkeypatch.setattr(settings, "jobs_dir", tmp_path / "claude_jobs")
+    monkeypatch.setattr(settings, "artifacts_dir", tmp_path / "ics_artifacts")
+    yield
+    for name in ("claude", "ics", "job_store", "job_runner"):
+        services.__dict__.pop(name, None)
+
+
 # Test configuration
 @pytest.fixture
 def test_settings():
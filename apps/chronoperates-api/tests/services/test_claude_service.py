@@ -1,11 +1,12 @@
+import asyncio
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 import tempfile
 import os
 from pathlib import Path
 from PIL import Image
 import base64
-from src.services.claude_service import ClaudeService
+from src.services.claude_service import AsyncClaudeService, ClaudeService
 
 
 class TestClaudeService:
@@ -38,13 +39,67 @@ class TestClaudeService:
             pytest.fail("Encoded string is not valid base64")
 
     def test_get_image_media_type(self, claude_service):
-        """Test media type detection."""
-        assert claude_service._get_image_media_type(Path("test.jpg")) == "image/jpeg"
-        assert claude_service._get_image_media_type(Path("test.jpeg")) == "image/jpeg"
-        assert claude_service._get_image_media_type(Path("test.png")) == "image/png"
-        assert claude_service._get_image_media_type(Path("test.bmp")) == "image/bmp"
-        assert claude_service._get_image_media_type(Path("test.webp")) == "image/webp"
-        assert claude_service._get_image_media_type(Path("test.unknown")) == "image/jpeg"  # default
+        """Test that the media type comes from the content, not the file name."""
+        import io
+
+        for image_format, media_type in [
+            ("JPEG", "image/jpeg"),
+            ("PNG", "image/png"),
+            ("BMP", "image/bmp"),
+            ("WEBP", "image/webp"),
+        ]:
+            buffer = io.BytesIO()
+            Image.new("RGB", (8, 8), "white").save(buffer, image_format)
+            assert claude_service._get_image_media_type(buffer.getvalue()) == media_type
+
+        with pytest.raises(ValueError, match="Invalid image file"):
+            claude_service._get_image_media_type(b"not an image")
+
+    def test_mislabeled_png_is_sent_as_png(self, claude_service):
+        """Test that a PNG uploaded with a .jpg name is validated and sent as image/png."""
+        import io
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (100, 100), "white").save(buffer, "PNG")
+        claude_service.preprocessor.enabled = False
+
+        assert claude_service._validate_image_bytes(buffer.getvalue(), "flyer.jpg") is True
+        _, media_type = claude_service._build_image_payload(buffer.getvalue(), "flyer.jpg")
+        assert media_type == "image/png"
+
+    def test_validate_image_rejects_pixel_bombs(self, claude_service):
+        """Test that a huge image is rejected from its header, without decoding it."""
+        import io
+
+        # 10000x10000 pixels of one colour compress to a few hundred KB
+        buffer = io.BytesIO()
+        Image.new("L", (10_000, 10_000)).save(buffer, "PNG")
+
+        with (
+            patch("src.services.claude_service.settings.image_max_pixels", 50_000_000),
+            patch("src.services.image_validation.Image.open") as mock_open,
+        ):
+            with pytest.raises(ValueError, match="too many pixels"):
+                claude_service._validate_image_bytes(buffer.getvalue(), "bomb.png")
+        mock_open.assert_not_called()
+
+    def test_validate_image_content_format_must_be_supported(self, claude_service):
+        """Test that a GIF is rejected even when named .jpg."""
+        import io
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (10, 10)).save(buffer, "GIF")
+        with pytest.raises(ValueError, match="Unsupported image format: GIF"):
+            claude_service._validate_image_bytes(buffer.getvalue(), "flyer.jpg")
+
+    def test_validate_image_full_decode(self, claude_service, sample_image_path):
+        """Test that truncated pixel data only fails when full decoding is configured."""
+        truncated = Path(sample_image_path).read_bytes()[:-20]
+
+        assert claude_service._validate_image_bytes(truncated, "flyer.jpg") is True
+        with patch("src.services.claude_service.settings.image_full_decode", True):
+            with pytest.raises(ValueError, match="Invalid image file"):
+                claude_service._validate_image_bytes(truncated, "flyer.jpg")
 
     def test_validate_image_success(self, claude_service, sample_image_path):
         """Test successful image validation."""
@@ -95,6 +150,33 @@ class TestClaudeService:
 
         os.unlink(tmp_file.name)
 
+    def test_validate_image_bytes(self, claude_service, sample_image_path):
+        """Test validation of in-memory image bytes."""
+        image_data = Path(sample_image_path).read_bytes()
+
+        assert claude_service._validate_image_bytes(image_data, "flyer.jpg") is True
+        with pytest.raises(ValueError, match="Unsupported image format"):
+            claude_service._validate_image_bytes(image_data, "flyer.txt")
+        with pytest.raises(ValueError, match="Invalid image file"):
+            claude_service._validate_image_bytes(b"not an image", "flyer.jpg")
+
+    def test_cache_key_for_bytes_matches_file_key(self, claude_service, sample_image_path):
+        """Test that bytes-based and incremental cache keys match the file-based key."""
+        import hashlib
+
+        path_obj = Path(sample_image_path)
+        image_data = path_obj.read_bytes()
+        prompt = claude_service._create_extraction_prompt()
+        incremental = hashlib.md5()
+        for i in range(0, len(image_data), 100):
+            incremental.update(image_data[i:i + 100])
+
+        expected = claude_service._get_cache_key(path_obj, prompt)
+        assert claude_service._get_cache_key_for_bytes(image_data, prompt) == expected
+        assert claude_service._get_cache_key_for_bytes(image_data, prompt, incremental) == expected
+        # The caller's hasher must not be mutated
+        assert incremental.hexdigest() == hashlib.md5(image_data).hexdigest()
+
     def test_create_extraction_prompt(self, claude_service):
         """Test prompt creation."""
         prompt = claude_service._create_extraction_prompt()
@@ -127,3 +209,920 @@ class TestClaudeService:
 
         with pytest.raises(Exception, match="API Error"):
             claude_service.extract_events_from_image(sample_image_path)
+
+
+class TestAsyncClaudeService:
+    """Test cases for the async Claude service."""
+
+    @pytest.fixture
+    def async_claude_service(self):
+        """Create async Claude service instance with mocked client and disabled caching."""
+        with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            service = AsyncClaudeService()
+            service.client = Mock()
+            service._get_from_cache = Mock(return_value=None)
+            service._save_to_cache = Mock()
+            return service
+
+    @pytest.mark.asyncio
+    async def test_extract_events_from_image_success(self, async_claude_service, sample_image_path, mock_claude_response):
+        """Test successful event extraction through the async client."""
+        mock_message = Mock()
+        mock_message.content = [Mock()]
+        mock_message.content[0].text = mock_claude_response
+        async_claude_service.client.messages.create = AsyncMock(return_value=mock_message)
+
+        result = await async_claude_service.extract_events_from_image(sample_image_path)
+
+        assert result == mock_claude_response
+        async_claude_service.client.messages.create.assert_awaited_once()
+        async_claude_service._save_to_cache.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_extract_events_from_image_cached(self, async_claude_service, sample_image_path, mock_claude_response):
+        """Test that a cache hit skips the API call."""
+        async_claude_service._get_from_cache = Mock(return_value=mock_claude_response)
+        async_claude_service.client.messages.create = AsyncMock()
+
+        result = await async_claude_service.extract_events_from_image(sample_image_path)
+
+        assert result == mock_claude_response
+        async_claude_service.client.messages.create.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_precomputed_cache_key_skips_preparation(self, async_claude_service, sample_image_path, mock_claude_response):
+        """Test that bytes prepared elsewhere are neither validated nor hashed again."""
+        async_claude_service._get_from_cache = Mock(return_value=mock_claude_response)
+        async_claude_service._prepare_image = Mock()
+
+        result = await async_claude_service.extract_events_from_bytes(
+            Path(sample_image_path).read_bytes(), "flyer.jpg", cache_key="prepared"
+        )
+
+        assert result == mock_claude_response
+        async_claude_service._prepare_image.assert_not_called()
+        async_claude_service._get_from_cache.assert_called_once_with("prepared")
+
+    @pytest.mark.asyncio
+    async def test_extraction_records_metrics(self, async_claude_service, sample_image_path, mock_claude_response):
+        """Test that stage timings, cache misses and token usage are recorded."""
+        from src.metrics import CACHE_LOOKUPS, CLAUDE_TOKENS, STAGE_SECONDS
+        from src.config import settings
+
+        mock_message = Mock(usage=Mock(input_tokens=1500, output_tokens=120))
+        mock_message.content = [Mock(text=mock_claude_response)]
+        async_claude_service.client.messages.create = AsyncMock(return_value=mock_message)
+        stages = ("verify", "hash", "preprocess", "encode", "claude_api")
+        before = {name: STAGE_SECONDS.count(stage=name) for name in stages}
+        misses = CACHE_LOOKUPS.value(result="miss")
+        input_tokens = CLAUDE_TOKENS.value(kind="input", model=settings.claude_model)
+        output_tokens = CLAUDE_TOKENS.value(kind="output", model=settings.claude_model)
+
+        await async_claude_service.extract_events_from_image(sample_image_path)
+
+        assert all(STAGE_SECONDS.count(stage=name) > before[name] for name in stages)
+        assert CACHE_LOOKUPS.value(result="miss") == misses + 1
+        assert CLAUDE_TOKENS.value(kind="input", model=settings.claude_model) == input_tokens + 1500
+        assert CLAUDE_TOKENS.value(kind="output", model=settings.claude_model) == output_tokens + 120
+
+    @pytest.mark.asyncio
+    async def test_extract_events_from_image_no_client(self, async_claude_service, sample_image_path):
+        """Test that a missing API key is reported as a ValueError."""
+        async_claude_service.client = None
+
+        with pytest.raises(ValueError, match="API key not configured"):
+            await async_claude_service.extract_events_from_image(sample_image_path)
+
+
+    @staticmethod
+    def _stub_stream(chunks):
+        """Stand-in for client.messages.stream yielding chunks as text deltas."""
+
+        class Stream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+            @property
+            async def text_stream(self):
+                for chunk in chunks:
+                    await asyncio.sleep(0)
+                    yield chunk
+
+            async def get_final_message(self):
+                return Mock(usage=Mock(input_tokens=1200, output_tokens=len(chunks)))
+
+        return Mock(return_value=Stream())
+
+    @pytest.mark.asyncio
+    async def test_stream_events_yields_deltas_and_caches_full_text(self, async_claude_service, sample_image_path, mock_claude_response):
+        """Test that streamed text is passed through and cached once complete."""
+        chunks = [mock_claude_response[i:i + 7] for i in range(0, len(mock_claude_response), 7)]
+        async_claude_service.client.messages.stream = self._stub_stream(chunks)
+        image_data = Path(sample_image_path).read_bytes()
+
+        received = [
+            chunk async for chunk in async_claude_service.stream_events_from_bytes(image_data, "flyer.jpg")
+        ]
+
+        assert received == chunks
+        cache_key, response = async_claude_service._save_to_cache.call_args.args
+        assert response == mock_claude_response
+        assert cache_key == async_claude_service._get_cache_key_for_bytes(
+            image_data, async_claude_service._create_extraction_prompt()
+        )
+
+    @pytest.mark.asyncio
+    async def test_stream_events_cached(self, async_claude_service, sample_image_path, mock_claude_response):
+        """Test that a cache hit is yielded in one piece without calling the API."""
+        async_claude_service._get_from_cache = Mock(return_value=mock_claude_response)
+        async_claude_service.client.messages.stream = Mock()
+        image_data = Path(sample_image_path).read_bytes()
+
+        received = [
+            chunk async for chunk in async_claude_service.stream_events_from_bytes(image_data, "flyer.jpg")
+        ]
+
+        assert received == [mock_claude_response]
+        async_claude_service.client.messages.stream.assert_not_called()
+
+
+class TestTiledExtraction:
+    """Test cases for extracting large images in overlapping tiles."""
+
+    # One event per tile; the fair straddles the seam between tiles 1 and 2
+    TILE_RESPONSES = [
+        "EVENT:\nTITLE: Spring Community Fa\nDATE: 2024-04-13\nSTART_TIME: 10:00\n---",
+        "EVENT:\nTITLE: Spring Community Fair\nDATE: 2024-04-13\nLOCATION: Riverside Park\n---",
+        "EVENT:\nTITLE: Book Club\nDATE: 2024-03-21\nSTART_TIME: 18:30\n---",
+    ]
+
+    @pytest.fixture
+    def tiling(self):
+        """Tile images with a long edge of 2000+ pixels into 1000 px tiles."""
+        from src.config import settings
+
+        with patch.object(settings, "tiling_enabled", True), \
+                patch.object(settings, "tiling_min_long_edge", 2000), \
+                patch.object(settings, "tiling_tile_size", 1000), \
+                patch.object(settings, "tiling_overlap", 0.1), \
+                patch.object(settings, "preprocess_enabled", False):
+            yield settings
+
+    @pytest.fixture
+    def wide_image(self):
+        """A 2400x900 image, which splits into three tiles side by side."""
+        import io
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (2400, 900), "white").save(buffer, "JPEG")
+        return buffer.getvalue()
+
+    @pytest.mark.asyncio
+    async def test_tiles_are_extracted_concurrently_and_merged(self, tiling, wide_image):
+        """Test that tiles are sent at once with the tile request and their events merged."""
+        from src.services.claude_service import TILE_EXTRACTION_REQUEST
+
+        with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            service = AsyncClaudeService()
+        service._get_from_cache = Mock(return_value=None)
+        service._save_to_cache = Mock()
+        # The tiles are calls of one request, which takes a single place
+        service.governor.max_queue = 1
+
+        active = 0
+        peak = 0
+        requests = []
+
+        async def slow_create(**kwargs):
+            nonlocal active, peak
+            index = len(requests)
+            requests.append(kwargs)
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.1)
+            active -= 1
+            return Mock(content=[Mock(text=self.TILE_RESPONSES[index])])
+
+        service.client = Mock()
+        service.client.messages.create = slow_create
+
+        result = await service.extract_events_from_bytes(wide_image, "poster.jpg")
+
+        assert len(requests) == 3
+        assert peak == 3
+        assert all(
+            request["messages"][0]["content"][1]["text"] == TILE_EXTRACTION_REQUEST
+            for request in requests
+        )
+        titles = [line for line in result.splitlines() if line.startswith("TITLE:")]
+        # Tiles may reach the API in any order, so responses are not tied to one tile
+        assert sorted(titles) == ["TITLE: Book Club", "TITLE: Spring Community Fair"]
+        assert "LOCATION: Riverside Park" in result
+        service._save_to_cache.assert_called_once()
+        assert service._save_to_cache.call_args.args[1] == result
+        assert service.governor.stats()["admitted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_tile_cancels_the_others(self, tiling, wide_image):
+        """Test that the first tile error is raised as is and stops the tiles still running."""
+        from src.governor import UpstreamBusyError
+
+        with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            service = AsyncClaudeService()
+        service._get_from_cache = Mock(return_value=None)
+        service._save_to_cache = Mock()
+
+        started = 0
+        cancelled = 0
+        all_started = asyncio.Event()
+
+        async def create(**kwargs):
+            nonlocal started, cancelled
+            started += 1
+            if started == 3:
+                all_started.set()
+            if started == 1:
+                await all_started.wait()
+                raise UpstreamBusyError("Upstream API is throttling requests (429)", retry_after=1)
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+
+        service.client = Mock()
+        service.client.messages.create = create
+
+        with pytest.raises(UpstreamBusyError):
+            await asyncio.wait_for(service.extract_events_from_bytes(wide_image, "poster.jpg"), 5)
+
+        assert (started, cancelled) == (3, 2)
+        service._save_to_cache.assert_not_called()
+        assert service.governor.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_small_image_is_sent_whole(self, tiling, sample_image_path, mock_claude_response):
+        from src.services.claude_service import EXTRACTION_REQUEST
+
+        with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            service = AsyncClaudeService()
+        service._get_from_cache = Mock(return_value=None)
+        service._save_to_cache = Mock()
+        service.client = Mock()
+        service.client.messages.create = AsyncMock(
+            return_value=Mock(content=[Mock(text=mock_claude_response)])
+        )
+
+        await service.extract_events_from_image(sample_image_path)
+
+        service.client.messages.create.assert_awaited_once()
+        request = service.client.messages.create.await_args.kwargs
+        assert request["messages"][0]["content"][1]["text"] == EXTRACTION_REQUEST
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_merged_tiles_in_one_piece(self, tiling, wide_image):
+        with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            service = AsyncClaudeService()
+        service._get_from_cache = Mock(return_value=None)
+        service._save_to_cache = Mock()
+        service.client = Mock()
+        service.client.messages.create = AsyncMock(
+            side_effect=[Mock(content=[Mock(text=text)]) for text in self.TILE_RESPONSES]
+        )
+        service.client.messages.stream = Mock()
+
+        chunks = [chunk async for chunk in service.stream_events_from_bytes(wide_image, "poster.jpg")]
+
+        assert len(chunks) == 1
+        assert chunks[0].count("EVENT:") == 2
+        service.client.messages.stream.assert_not_called()
+
+    def test_sync_service_tiles(self, tiling, wide_image):
+        """Test that the synchronous service extracts tiles on a thread pool."""
+        with patch('src.services.claude_service.anthropic.Anthropic'):
+            service = ClaudeService()
+        service._get_from_cache = Mock(return_value=None)
+        service._save_to_cache = Mock()
+        service.client = Mock()
+        service.client.messages.create = Mock(
+            side_effect=[Mock(content=[Mock(text=text)]) for text in self.TILE_RESPONSES]
+        )
+
+        result = service.extract_events_from_bytes(wide_image, "poster.jpg")
+
+        assert service.client.messages.create.call_count == 3
+        assert result.count("EVENT:") == 2
+
+
+class TestModelCascade:
+    """Test cases for trying a cheap model first and escalating on low scores."""
+
+    INCOMPLETE_RESPONSE = "EVENT:\nTITLE: Quiz Night\nDATE: sometime soon\n---"
+
+    @pytest.fixture
+    def cascade(self):
+        """Cascade from a fast model to a strong one, with an in-memory cache."""
+        from src.config import settings
+
+        with patch.object(settings, "claude_cascade_models", ["fast-model", "strong-model"]), \
+                patch.object(settings, "cascade_min_score", 0.75):
+            with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+                service = AsyncClaudeService()
+            store = {}
+            service._get_from_cache = Mock(side_effect=store.get)
+            service._save_to_cache = Mock(side_effect=store.__setitem__)
+            service.client = Mock()
+            service.store = store
+            yield service
+
+    @staticmethod
+    def _respond(service, *texts):
+        service.client.messages.create = AsyncMock(
+            side_effect=[Mock(content=[Mock(text=text)]) for text in texts]
+        )
+
+    @pytest.mark.asyncio
+    async def test_confident_fast_model_is_accepted(self, cascade, sample_image_path, mock_claude_response):
+        self._respond(cascade, mock_claude_response)
+
+        result = await cascade.extract_events_from_image(sample_image_path)
+
+        assert result == mock_claude_response
+        cascade.client.messages.create.assert_awaited_once()
+        assert cascade.client.messages.create.await_args.kwargs["model"] == "fast-model"
+
+    @pytest.mark.asyncio
+    async def test_low_score_escalates(self, cascade, sample_image_path, mock_claude_response):
+        """Test that an incomplete answer from the fast model is redone by the strong one."""
+        from src.metrics import CASCADE_RESULTS
+
+        before = {
+            (model, result): CASCADE_RESULTS.value(model=model, result=result)
+            for model, result in (("fast-model", "escalated"), ("strong-model", "accepted"))
+        }
+        self._respond(cascade, self.INCOMPLETE_RESPONSE, mock_claude_response)
+
+        result = await cascade.extract_events_from_image(sample_image_path)
+
+        assert result == mock_claude_response
+        models = [call.kwargs["model"] for call in cascade.client.messages.create.await_args_list]
+        assert models == ["fast-model", "strong-model"]
+        for labels, value in before.items():
+            assert CASCADE_RESULTS.value(model=labels[0], result=labels[1]) == value + 1
+
+    @pytest.mark.asyncio
+    async def test_best_answer_kept_when_every_tier_is_unsure(self, cascade, sample_image_path):
+        self._respond(cascade, self.INCOMPLETE_RESPONSE, "The text on this flyer is too blurry to read.")
+
+        result = await cascade.extract_events_from_image(sample_image_path)
+
+        assert result == self.INCOMPLETE_RESPONSE
+
+    @pytest.mark.asyncio
+    async def test_tier_responses_are_cached(self, cascade, sample_image_path, mock_claude_response):
+        """Test that a rerun reuses each tier's answer instead of calling the models again."""
+        self._respond(cascade, self.INCOMPLETE_RESPONSE, mock_claude_response)
+        await cascade.extract_events_from_image(sample_image_path)
+        # Drop the final answer, as if the cache entry had expired
+        final_key = cascade._save_to_cache.call_args.args[0]
+        del cascade.store[final_key]
+        self._respond(cascade)
+
+        result = await cascade.extract_events_from_image(sample_image_path)
+
+        assert result == mock_claude_response
+        cascade.client.messages.create.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_final_answer_in_one_piece(self, cascade, sample_image_path, mock_claude_response):
+        with open(sample_image_path, "rb") as f:
+            image_data = f.read()
+        self._respond(cascade, self.INCOMPLETE_RESPONSE, mock_claude_response)
+        cascade.client.messages.stream = Mock()
+
+        chunks = [chunk async for chunk in cascade.stream_events_from_bytes(image_data, "flyer.jpg")]
+
+        assert chunks == [mock_claude_response]
+        cascade.client.messages.stream.assert_not_called()
+
+    def test_sync_service_escalates(self, cascade, sample_image_path, mock_claude_response):
+        with patch('src.services.claude_service.anthropic.Anthropic'):
+            service = ClaudeService()
+        service._get_from_cache = Mock(return_value=None)
+        service._save_to_cache = Mock()
+        service.client = Mock()
+        service.client.messages.create = Mock(side_effect=[
+            Mock(content=[Mock(text=self.INCOMPLETE_RESPONSE)]),
+            Mock(content=[Mock(text=mock_claude_response)]),
+        ])
+
+        result = service.extract_events_from_image(sample_image_path)
+
+        assert result == mock_claude_response
+        assert service.client.messages.create.call_args.kwargs["model"] == "strong-model"
+
+
+class TestUpstreamGovernor:
+    """Test cases for the governor between the service and the Messages API."""
+
+    @pytest.fixture
+    def service(self):
+        with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            service = AsyncClaudeService()
+        service._get_from_cache = Mock(return_value=None)
+        service._save_to_cache = Mock()
+        service.client = Mock()
+        service.governor.backoff_base = 0.01
+        return service
+
+    @staticmethod
+    def _throttled(retry_after="0"):
+        """A 429 shaped like the SDK's RateLimitError."""
+        from types import SimpleNamespace
+
+        error = Exception("rate limited")
+        error.status_code = 429
+        error.response = SimpleNamespace(headers={"retry-after": retry_after})
+        return error
+
+    @pytest.mark.asyncio
+    async def test_throttled_call_is_retried(self, service, sample_image_path, mock_claude_response):
+        service.client.messages.create = AsyncMock(side_effect=[
+            self._throttled(),
+            Mock(content=[Mock(text=mock_claude_response)]),
+        ])
+
+        result = await service.extract_events_from_image(sample_image_path)
+
+        assert result == mock_claude_response
+        assert service.client.messages.create.await_count == 2
+        assert service.cache_stats()["upstream"]["throttled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_persistent_throttling_raises_busy(self, service, sample_image_path):
+        from src.governor import UpstreamBusyError
+
+        service.client.messages.create = AsyncMock(side_effect=self._throttled("0.01"))
+
+        with pytest.raises(UpstreamBusyError) as excinfo:
+            await service.extract_events_from_image(sample_image_path)
+
+        assert excinfo.value.retry_after >= 1
+        assert service.client.messages.create.await_count == service.governor.max_retries + 1
+
+    @pytest.mark.asyncio
+    async def test_usage_is_charged_to_tokens_bucket(self, service, sample_image_path, mock_claude_response):
+        from src.governor import TokenBucket
+
+        service.governor.tokens = TokenBucket(per_minute=60_000)
+        service.client.messages.create = AsyncMock(return_value=Mock(
+            content=[Mock(text=mock_claude_response)],
+            usage=Mock(input_tokens=1500, output_tokens=120, cache_read_input_tokens=900,
+                       cache_creation_input_tokens=0),
+        ))
+
+        await service.extract_events_from_image(sample_image_path)
+
+        assert service.governor.tokens.balance == pytest.approx(60_000 - 1620, abs=5)
+
+    @pytest.mark.asyncio
+    async def test_stream_retried_before_first_chunk(self, service, sample_image_path, mock_claude_response):
+        """Test that a stream refused with 429 is opened again, since nothing was sent yet."""
+        opened = []
+
+        class FakeStream:
+            async def __aenter__(stream):
+                opened.append(stream)
+                if len(opened) == 1:
+                    raise self._throttled()
+                return stream
+
+            async def __aexit__(stream, *exc_info):
+                return False
+
+            @property
+            async def text_stream(stream):
+                yield mock_claude_response
+
+            async def get_final_message(stream):
+                return Mock(usage=None)
+
+        service.client.messages.stream = Mock(side_effect=lambda **kwargs: FakeStream())
+        with open(sample_image_path, "rb") as f:
+            image_data = f.read()
+
+        chunks = [chunk async for chunk in service.stream_events_from_bytes(image_data, "flyer.jpg")]
+
+        assert chunks == [mock_claude_response]
+        assert len(opened) == 2
+        assert service.governor.limiter.in_use == 0
+        assert service.governor.active == 0
+
+
+class TestCrossWorkerCoordination:
+    """Test cases for lease-based coordination between worker processes."""
+
+    @pytest.fixture
+    def shared_settings(self, tmp_path):
+        """Point every service at one temporary cache dir with fast polling."""
+        from src.config import settings
+
+        with patch.object(settings, "cache_dir", tmp_path), \
+                patch.object(settings, "cache_lease_poll_interval_seconds", 0.02), \
+                patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            yield settings
+
+    @staticmethod
+    def _stub_client(response_text, calls):
+        async def slow_create(**kwargs):
+            calls.append(kwargs)
+            await asyncio.sleep(0.3)
+            message = Mock()
+            message.content = [Mock(text=response_text)]
+            return message
+
+        client = Mock()
+        client.messages.create = slow_create
+        return client
+
+    @pytest.mark.asyncio
+    async def test_workers_share_one_upstream_call(self, shared_settings, sample_image_path, mock_claude_response):
+        """Test that separate service instances (one per worker) make one call per key."""
+        calls = []
+        workers = [AsyncClaudeService() for _ in range(3)]
+        for worker in workers:
+            worker.client = self._stub_client(mock_claude_response, calls)
+
+        results = await asyncio.gather(
+            *(worker.extract_events_from_image(sample_image_path) for worker in workers)
+        )
+
+        assert results == [mock_claude_response] * 3
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_lease_from_dead_worker_is_recovered(self, shared_settings, sample_image_path, mock_claude_response):
+        """Test that a lease left by a crashed worker does not block extraction."""
+        import subprocess
+        import sys
+        from src.cache.lease import LeaseManager
+
+        calls = []
+        worker = AsyncClaudeService()
+        worker.client = self._stub_client(mock_claude_response, calls)
+        image_data = Path(sample_image_path).read_bytes()
+        cache_key = worker._get_cache_key_for_bytes(image_data, worker._create_extraction_prompt())
+
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        crashed = LeaseManager(worker.leases.db_path, ttl_seconds=3600)
+        crashed.pid = dead.pid
+        crashed.try_acquire(cache_key)
+
+        result = await asyncio.wait_for(worker.extract_events_from_image(sample_image_path), timeout=5)
+
+        assert result == mock_claude_response
+        assert len(calls) == 1
+        assert worker.leases.holder(cache_key) is None
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_stops_when_lease_is_lost(self, shared_settings, capsys):
+        """Test that the lease is not renewed again once another worker has taken it over."""
+        from src.cache.lease import LeaseManager
+
+        worker = AsyncClaudeService()
+        assert worker.leases.try_acquire("key")
+        other = LeaseManager(worker.leases.db_path, ttl_seconds=60)
+        other.owner = "other-host:1:0"
+
+        with patch.object(shared_settings, "cache_lease_ttl_seconds", 0.06):
+            heartbeat = asyncio.ensure_future(worker._keep_lease("key"))
+            await asyncio.sleep(0.05)
+            assert not heartbeat.done()
+
+            worker.leases.release("key")
+            assert other.try_acquire("key")
+            await asyncio.wait_for(heartbeat, timeout=1)
+
+        assert other.holder("key") == "other-host:1:0"
+        assert "Lost the lease on key" in capsys.readouterr().out
+
+    @pytest.mark.asyncio
+    async def test_near_duplicate_served_from_cache(self, shared_settings, tmp_path, mock_claude_response):
+        """Test that a re-encoded copy of a cached image skips the API call."""
+        calls = []
+        with patch.object(shared_settings, "perceptual_cache_enabled", True):
+            worker = AsyncClaudeService()
+        worker.client = self._stub_client(mock_claude_response, calls)
+
+        img = Image.new('RGB', (400, 300), color='white')
+        img.paste(Image.new('RGB', (200, 100), color='black'), (50, 50))
+        original = tmp_path / "flyer.jpg"
+        img.save(original, 'JPEG', quality=95)
+        resaved = tmp_path / "flyer.png"
+        img.resize((200, 150)).save(resaved, 'PNG')
+
+        first = await worker.extract_events_from_image(str(original))
+        second = await worker.extract_events_from_image(str(resaved))
+
+        assert first == second == mock_claude_response
+        assert len(calls) == 1
+        assert worker.cache_stats()["perceptual"]["hits"] == 1
+
+
+@pytest.fixture
+def fake_anthropic_service(tmp_path):
+    """Serve a fake Messages API over HTTP and build services pointed at it."""
+    import threading
+    import time
+    import uvicorn
+    from benchmarks.fake_anthropic import FakeAnthropicConfig, create_app
+    from src.config import settings
+
+    servers = []
+
+    def make(**config):
+        app = create_app(FakeAnthropicConfig(latency_median_ms=0, seed=1, **config))
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        while not server.started:
+            time.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        with patch.object(settings, "anthropic_api_key", "fake"), \
+                patch.object(settings, "anthropic_base_url", f"http://127.0.0.1:{port}"), \
+                patch.object(settings, "cache_dir", tmp_path):
+            service = AsyncClaudeService()
+        service.client = service.client.with_options(max_retries=0)
+        return service
+
+    yield make
+
+    for server, thread in servers:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+class TestConnectionPool:
+    """Test cases for the pooled connection to the Messages API."""
+
+    @pytest.mark.asyncio
+    async def test_warm_connections_are_reused(self, fake_anthropic_service):
+        """Test that requests after the warm-up reuse its connections."""
+        from src.config import settings
+
+        service = fake_anthropic_service()
+        url = str(service.client.base_url).rstrip("/")
+
+        with patch.object(settings, "anthropic_warmup_connections", 2):
+            assert await service.warm_up() == 2
+        for _ in range(5):
+            response = await service.http_client.post(
+                f"{url}/v1/messages", json={"model": "claude-fake", "messages": []}
+            )
+            assert response.status_code == 200
+
+        stats = (await service.http_client.get(f"{url}/stats")).json()
+        assert stats["ok"] == 5
+        assert stats["connections"] == 2
+
+    def test_pool_settings(self):
+        """Test that timeouts from the settings are applied to the client."""
+        from src.config import settings
+
+        with patch.object(settings, "anthropic_api_key", "fake"), \
+                patch.object(settings, "anthropic_connect_timeout_seconds", 3.0), \
+                patch.object(settings, "anthropic_timeout_seconds", 45.0):
+            service = AsyncClaudeService()
+
+        assert service.client.timeout.connect == 3.0
+        assert service.client.timeout.read == 45.0
+        assert service.client._client is service.http_client
+
+    @pytest.mark.asyncio
+    async def test_warm_up_without_api_key(self):
+        """Test that there is nothing to warm up when no client is configured."""
+        with patch('src.services.claude_service.anthropic.AsyncAnthropic'):
+            service = AsyncClaudeService()
+        service.client = None
+
+        assert await service.warm_up() == 0
+
+
+class TestPromptCaching:
+    """Test cases for the prompt-cached request layout."""
+
+    @pytest.fixture
+    def claude_service(self):
+        with patch('src.services.claude_service.anthropic.Anthropic'):
+            return ClaudeService()
+
+    @staticmethod
+    def _image_base64(color: str) -> str:
+        import io
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), color).save(buffer, "JPEG")
+        return base64.b64encode(buffer.getvalue()).decode()
+
+    @pytest.mark.parametrize("accepted", [True, False])
+    def test_temperature_only_sent_if_sdk_accepts_it(self, claude_service, accepted):
+        prompt = claude_service._create_extraction_prompt()
+
+        with patch('src.services.claude_service._sdk_accepts_temperature', return_value=accepted):
+            request = claude_service._build_message_request(prompt, "data", "image/jpeg")
+
+        assert ("temperature" in request) == accepted
+
+    def test_static_prompt_is_a_cached_system_block(self, claude_service):
+        """Test that the instructions lead the request with a breakpoint, before the image."""
+        from src.services.claude_service import EXTRACTION_REQUEST
+
+        prompt = claude_service._create_extraction_prompt()
+        request = claude_service._build_message_request(prompt, "aW1n", "image/png")
+
+        assert request["system"] == [
+            {"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}
+        ]
+        [message] = request["messages"]
+        image, text = message["content"]
+        assert image["source"] == {"type": "base64", "media_type": "image/png", "data": "aW1n"}
+        assert text == {"type": "text", "text": EXTRACTION_REQUEST}
+
+    def test_prompt_cache_can_be_disabled(self, claude_service):
+        from src.config import settings
+
+        with patch.object(settings, "prompt_cache_enabled", False):
+            request = claude_service._build_message_request("prompt", "aW1n", "image/png")
+
+        assert "cache_control" not in request["system"][0]
+
+    def test_prompt_version_is_part_of_cache_key(self, claude_service):
+        """Test that bumping PROMPT_VERSION invalidates locally cached responses."""
+        prompt = claude_service._create_extraction_prompt()
+        before = claude_service._get_cache_key_for_bytes(b"image", prompt)
+
+        with patch("src.services.claude_service.PROMPT_VERSION", "next"):
+            after = claude_service._get_cache_key_for_bytes(b"image", prompt)
+
+        assert before != after
+
+    def test_records_cache_token_usage(self):
+        """Test that prompt cache reads and writes are counted per kind."""
+        from src.metrics import CLAUDE_TOKENS
+        from src.config import settings
+
+        usage = Mock(
+            input_tokens=1200,
+            output_tokens=90,
+            cache_read_input_tokens=300,
+            cache_creation_input_tokens=None,
+        )
+        before = {kind: CLAUDE_TOKENS.value(kind=kind, model=settings.claude_model) for kind in ("input", "cache_read", "cache_write")}
+
+        ClaudeService._record_usage(Mock(usage=usage), "flyer.jpg", settings.claude_model)
+
+        assert CLAUDE_TOKENS.value(kind="input", model=settings.claude_model) == before["input"] + 1200
+        assert CLAUDE_TOKENS.value(kind="cache_read", model=settings.claude_model) == before["cache_read"] + 300
+        assert CLAUDE_TOKENS.value(kind="cache_write", model=settings.claude_model) == before["cache_write"]
+
+    @pytest.mark.asyncio
+    async def test_fake_server_serves_system_prompt_from_cache(self, fake_anthropic_service):
+        """Test against the local stand-in that different images share the cached prompt."""
+        service = fake_anthropic_service()
+        url = str(service.client.base_url).rstrip("/")
+        prompt = service._create_extraction_prompt()
+
+        usages = []
+        for color in ("white", "black"):
+            request = service._build_message_request(prompt, self._image_base64(color), "image/jpeg")
+            response = await service.http_client.post(f"{url}/v1/messages", json=request)
+            assert response.status_code == 200
+            usages.append(response.json()["usage"])
+
+        assert usages[0]["cache_creation_input_tokens"] > 0
+        assert usages[0]["cache_read_input_tokens"] == 0
+        assert usages[1]["cache_read_input_tokens"] == usages[0]["cache_creation_input_tokens"]
+        assert usages[1]["cache_creation_input_tokens"] == 0
+        stats = (await service.http_client.get(f"{url}/stats")).json()
+        assert (stats["cache_write"], stats["cache_read"]) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_fake_server_rejects_invalid_breakpoints(self, fake_anthropic_service):
+        """Test that the stand-in enforces the API's limits on cache_control."""
+        service = fake_anthropic_service()
+        url = str(service.client.base_url).rstrip("/")
+        block = {"type": "text", "text": "x", "cache_control": {"type": "ephemeral"}}
+
+        response = await service.http_client.post(
+            f"{url}/v1/messages",
+            json={"model": "claude-fake", "system": [block] * 5, "messages": []},
+        )
+
+        assert response.status_code == 400
+        assert response.json()["error"]["type"] == "invalid_request_error"
+
+
+class TestFakeAnthropicServer:
+    """Test cases exercising the real Anthropic client against the bundled fake server."""
+
+    @pytest.fixture
+    def make_service(self, fake_anthropic_service):
+        return fake_anthropic_service
+
+    @pytest.mark.asyncio
+    async def test_extractions_share_warm_connection(self, make_service, sample_image_path):
+        """Test that SDK calls after the warm-up open no new connections."""
+        from src.config import settings
+
+        service = make_service()
+        service._get_from_cache = Mock(return_value=None)
+        url = str(service.client.base_url).rstrip("/")
+
+        with patch.object(settings, "anthropic_warmup_connections", 1):
+            await service.warm_up()
+        for _ in range(3):
+            await service.extract_events_from_image(sample_image_path)
+
+        stats = (await service.http_client.get(f"{url}/stats")).json()
+        assert stats["ok"] == 3
+        assert stats["connections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_extract_over_http(self, make_service, sample_image_path):
+        """Test a full request and response through the Anthropic SDK."""
+        from benchmarks.fake_anthropic import CANNED_RESPONSES
+
+        service = make_service()
+
+        result = await service.extract_events_from_image(sample_image_path)
+
+        assert result in CANNED_RESPONSES
+
+    @pytest.mark.asyncio
+    async def test_stream_over_http(self, make_service, sample_image_path):
+        """Test that streamed deltas from the SDK reassemble the canned response."""
+        from benchmarks.fake_anthropic import CANNED_RESPONSES
+
+        service = make_service()
+        image_data = Path(sample_image_path).read_bytes()
+
+        chunks = [chunk async for chunk in service.stream_events_from_bytes(image_data, "flyer.jpg")]
+
+        assert len(chunks) > 1
+        assert "".join(chunks) in CANNED_RESPONSES
+
+    @pytest.mark.asyncio
+    async def test_prompt_cache_usage_recorded(self, make_service, tmp_path):
+        """Test that the second extraction reads the system prompt from the prompt cache."""
+        from src.metrics import CLAUDE_TOKENS
+        from src.config import settings
+
+        service = make_service()
+        before = {kind: CLAUDE_TOKENS.value(kind=kind, model=settings.claude_model) for kind in ("cache_read", "cache_write")}
+
+        for color in ("white", "black"):
+            path = tmp_path / f"{color}.jpg"
+            Image.new("RGB", (64, 64), color).save(path, "JPEG")
+            await service.extract_events_from_image(str(path))
+
+        written = CLAUDE_TOKENS.value(kind="cache_write", model=settings.claude_model) - before["cache_write"]
+        assert written > 0
+        assert CLAUDE_TOKENS.value(kind="cache_read", model=settings.claude_model) - before["cache_read"] == written
+
+    @pytest.mark.asyncio
+    async def test_injected_rate_limit(self, make_service, sample_image_path):
+        """Test that persistent 429s are retried and then surface as busy, with the server's retry-after."""
+        from src.governor import UpstreamBusyError
+
+        service = make_service(rate_limit_rate=1.0, retry_after_seconds=0.05)
+        service.governor.backoff_base = 0.01
+
+        with pytest.raises(UpstreamBusyError) as excinfo:
+            await service.extract_events_from_image(sample_image_path)
+
+        assert excinfo.value.retry_after >= 1
+        assert service.cache_stats()["upstream"]["throttled"] == service.governor.max_retries + 1
+
+    @pytest.mark.asyncio
+    async def test_recovers_from_intermittent_rate_limits(self, make_service, tmp_path):
+        """Test that extractions succeed through occasional 429s while the limit adapts."""
+        service = make_service(rate_limit_rate=0.3, retry_after_seconds=0.01)
+        service.governor.backoff_base = 0.01
+        images = []
+        for i in range(10):
+            path = tmp_path / f"flyer{i}.png"
+            Image.new("RGB", (64, 64), (i * 20, 0, 0)).save(path)
+            images.append(str(path))
+
+        results = await asyncio.gather(*(service.extract_events_from_image(path) for path in images))
+
+        assert all(results)
+        stats = service.cache_stats()["upstream"]
+        assert stats["throttled"] > 0
+        assert stats["in_flight"] == 0
@@ -0,0 +1,84 @@
+import pytest
+from datetime import datetime
+from src.services.date_parser import parse_date, parse_time
+
+
+class TestParseDate:
+    """Test cases for date normalization."""
+
+    @pytest.mark.parametrize(
+        "date_str, expected",
+        [
+            ("2024-03-15", datetime(2024, 3, 15)),
+            ("2024-3-5", datetime(2024, 3, 5)),
+            ("03/15/2024", datetime(2024, 3, 15)),
+            ("03/04/2024", datetime(2024, 3, 4)),  # month first when ambiguous
+            ("15/03/2024", datetime(2024, 3, 15)),
+            ("03-15-2024", datetime(2024, 3, 15)),
+            ("15-03-2024", datetime(2024, 3, 15)),
+            ("04.03.2024", datetime(2024, 3, 4)),  # dotted dates are day first
+            ("March 15, 2024", datetime(2024, 3, 15)),
+            ("Mar 15, 2024", datetime(2024, 3, 15)),
+            ("mar. 15th 2024", datetime(2024, 3, 15)),
+            ("Friday, March 15, 2024", datetime(2024, 3, 15)),
+            ("15 March 2024", datetime(2024, 3, 15)),
+            ("15th Sept 2024", datetime(2024, 9, 15)),
+            ("Fri 15 Mar 2024", datetime(2024, 3, 15)),
+            ("  2024-03-15 ", datetime(2024, 3, 15)),
+            ("Starts 2024-03-15 (doors open early)", datetime(2024, 3, 15)),
+        ],
+    )
+    def test_supported_formats(self, date_str, expected):
+        """Test that each supported format normalizes to the same date."""
+        assert parse_date(date_str) == expected
+
+    @pytest.mark.parametrize(
+        "date_str",
+        ["", "invalid-date", "02/30/2024", "2024-13-45", "Someday 15 March 2024", "Marchember 1, 2024"],
+    )
+    def test_invalid_dates(self, date_str):
+        """Test that impossible or unrecognised dates return None."""
+        assert parse_date(date_str) is None
+
+    def test_results_are_memoized(self):
+        """Test that a repeated string is served from the cache."""
+        parse_date.cache_clear()
+
+        parse_date("March 15, 2024")
+        parse_date("March 15, 2024")
+
+        assert parse_date.cache_info().hits == 1
+
+
+class TestParseTime:
+    """Test cases for time-of-day normalization."""
+
+    @pytest.mark.parametrize(
+        "time_str, expected",
+        [
+            ("14:30", (14, 30)),
+            ("09:05", (9, 5)),
+            ("2:30 PM", (14, 30)),
+            ("2:30pm", (14, 30)),
+            ("2:30 p.m.", (14, 30)),
+            ("2:30 AM", (2, 30)),
+            ("12:00 PM", (12, 0)),
+            ("12:00 AM", (0, 0)),
+            ("2 PM", (14, 0)),
+            ("11am", (11, 0)),
+            ("12 a.m.", (0, 0)),
+            ("7.45pm", (19, 45)),
+            ("14:30 PM", (14, 30)),
+            ("10:00 AM - 2:00 PM", (10, 0)),
+            ("Noon", (12, 0)),
+            ("midnight", (0, 0)),
+        ],
+    )
+    def test_supported_formats(self, time_str, expected):
+        """Test 24-hour and am/pm forms."""
+        assert parse_time(time_str) == expected
+
+    @pytest.mark.parametrize("time_str", ["", "invalid-time", "25:00", "10:75", "Not specified"])
+    def test_invalid_times(self, time_str):
+        """Test that unrecognised or out-of-range times return None."""
+        assert parse_time(time_str) is None
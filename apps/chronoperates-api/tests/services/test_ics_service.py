@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
-from src.services.ics_service import ICSService
+from unittest.mock import patch
+from src.services.ics_service import ICSService, IncrementalEventParser
 
 
 class TestICSService:
@@ -144,3 +145,209 @@ class TestICSService:
         assert "END:VCALENDAR" in ics_content
         assert "BEGIN:VEVENT" not in ics_content
 
+
+    def test_create_ics_file_from_texts_merges_calendars(
+        self, ics_service, mock_claude_response
+    ):
+        """Test that events from several texts end up in one calendar file."""
+        texts = [mock_claude_response, "No calendar events detected.", mock_claude_response]
+
+        ics_content, file_path, events_counts = ics_service.create_ics_file_from_texts(
+            texts
+        )
+
+        try:
+            assert events_counts == [2, 0, 2]
+            assert ics_content.count("BEGIN:VCALENDAR") == 1
+            assert ics_content.count("BEGIN:VEVENT") == 4
+            assert file_path.read_bytes().decode("utf-8") == ics_content
+        finally:
+            file_path.unlink(missing_ok=True)
+
+    def test_same_extraction_is_stored_once(self, ics_service, mock_claude_response):
+        """Test that the same texts give the same file later on, despite DTSTAMP."""
+        with patch("src.services.ics_service.datetime") as mock_datetime:
+            mock_datetime.now.side_effect = lambda tz=None: datetime(2024, 3, 1, 9, 30, tzinfo=tz)
+            first, first_path, _ = ics_service.create_ics_file_from_text(mock_claude_response)
+            mock_datetime.now.side_effect = lambda tz=None: datetime(2024, 3, 2, 9, 30, tzinfo=tz)
+            second, second_path, events_count = ics_service.create_ics_file_from_text(mock_claude_response)
+            other, other_path, _ = ics_service.create_ics_file_from_texts([mock_claude_response] * 2)
+
+        assert (second, second_path, events_count) == (first, first_path, 2)
+        assert "DTSTAMP:20240301T093000Z" in second
+        assert other_path != first_path
+        assert "DTSTAMP:20240302T093000Z" in other
+
+
+class TestIncrementalEventParser:
+    """Test cases for parsing event text while it streams in."""
+
+    def test_chunked_parse_matches_full_parse(self, mock_claude_response):
+        """Test that feeding one character at a time yields the same events."""
+        parser = IncrementalEventParser()
+        events = []
+        for char in mock_claude_response:
+            events.extend(parser.feed(char))
+        events.extend(parser.close())
+
+        assert events == ICSService()._parse_extracted_text(mock_claude_response)
+
+    def test_event_emitted_when_block_terminates(self):
+        """Test that an event is returned as soon as its --- line arrives."""
+        parser = IncrementalEventParser()
+
+        assert parser.feed("EVENT:\nTITLE: Gala\nDATE: 2024-05-01\n") == []
+        assert parser.feed("---\nEVENT:\nTITLE: Af") == [
+            {"TITLE": "Gala", "DATE": "2024-05-01"}
+        ]
+        assert parser.close() == [{"TITLE": "Af"}]
+
+    def test_unterminated_blocks_are_split_on_next_event(self):
+        """Test that a missing --- separator does not merge events."""
+        parser = IncrementalEventParser()
+
+        events = parser.feed("EVENT:\nTITLE: One\nEVENT:\nTITLE: Two\nLOCATION: Not specified")
+
+        assert events == [{"TITLE": "One"}]
+        assert parser.close() == [{"TITLE": "Two"}]
+
+
+class TestEventUIDs:
+    """Test cases for stable event UIDs."""
+
+    def test_uids_are_stable_and_unique(self, mock_claude_response):
+        """Test that re-rendering keeps UIDs and repeated events stay distinct."""
+        service = ICSService()
+        event = {"TITLE": "Match", "DATE": "2024-03-15", "START_TIME": "19:30"}
+
+        def uid(event_data, position):
+            return dict(service._event_properties(event_data, position))["UID"]
+
+        assert uid(event, 0) == uid(event, 0)
+        assert uid(event, 0) != uid(event, 1)
+        assert uid(event, 0) != uid({**event, "LOCATION": "Away"}, 0)
+        assert uid(event, 0).endswith("@calendar-extractor")
+
+
+class TestMergeExtractedTexts:
+    """Test cases for merging the events extracted from overlapping tiles."""
+
+    LEFT_TILE = """EVENT:
+TITLE: Spring Community Fa
+DATE: 2024-04-13
+START_TIME: 10:00
+END_TIME: Not specified
+LOCATION: Not specified
+DESCRIPTION: Food stalls
+---
+
+EVENT:
+TITLE: Yoga in the Park
+DATE: 2024-04-14
+START_TIME: 7:00 AM
+END_TIME: 8:00 AM
+LOCATION: North Lawn
+DESCRIPTION: Not specified
+---"""
+
+    RIGHT_TILE = """EVENT:
+TITLE: Spring Community Fair
+DATE: April 13, 2024
+START_TIME: 10 AM
+END_TIME: 16:00
+LOCATION: Riverside Park
+DESCRIPTION: Not specified
+---
+
+EVENT:
+TITLE: Yoga in the Park
+DATE: 2024-04-21
+START_TIME: 7:00 AM
+END_TIME: 8:00 AM
+LOCATION: North Lawn
+DESCRIPTION: Not specified
+---"""
+
+    def test_event_straddling_a_seam_is_merged(self):
+        """Test that both halves of a cut-off event become one complete event."""
+        merged = ICSService.merge_extracted_texts([self.LEFT_TILE, self.RIGHT_TILE])
+        events = ICSService._parse_events(merged)
+
+        fairs = [event for event in events if event["TITLE"].startswith("Spring")]
+        assert fairs == [{
+            "TITLE": "Spring Community Fair",
+            "DATE": "April 13, 2024",
+            "START_TIME": "10:00",
+            "END_TIME": "16:00",
+            "LOCATION": "Riverside Park",
+            "DESCRIPTION": "Food stalls",
+        }]
+
+    def test_recurring_events_are_kept(self):
+        """Test that events with the same title on different dates are not merged."""
+        merged = ICSService.merge_extracted_texts([self.LEFT_TILE, self.RIGHT_TILE])
+        yoga_dates = [
+            event["DATE"] for event in ICSService._parse_events(merged)
+            if event["TITLE"] == "Yoga in the Park"
+        ]
+
+        assert yoga_dates == ["2024-04-14", "2024-04-21"]
+
+    def test_events_within_one_tile_are_kept(self):
+        """Test that only events from different tiles are treated as duplicates."""
+        text = "EVENT:\nTITLE: Open Mic\nDATE: 2024-03-22\n---\nEVENT:\nTITLE: Open Mic\n---"
+
+        merged = ICSService.merge_extracted_texts([text])
+
+        assert len(ICSService._parse_events(merged)) == 2
+
+    def test_conflicting_start_times_are_kept(self):
+        first = "EVENT:\nTITLE: Match\nDATE: 2024-03-16\nSTART_TIME: 15:00\n---"
+        second = "EVENT:\nTITLE: Match\nDATE: 2024-03-16\nSTART_TIME: 19:45\n---"
+
+        merged = ICSService.merge_extracted_texts([first, second])
+
+        assert len(ICSService._parse_events(merged)) == 2
+
+    def test_no_events_in_any_tile(self):
+        merged = ICSService.merge_extracted_texts(
+            ["No calendar events detected in this image."] * 2
+        )
+
+        assert ICSService()._parse_extracted_text(merged) == []
+
+    def test_merged_text_converts_to_ics(self):
+        """Test that the merged text is in the format create_ics_from_text expects."""
+        merged = ICSService.merge_extracted_texts([self.LEFT_TILE, self.RIGHT_TILE])
+
+        ics_content, events_count = ICSService().create_ics_from_text(merged)
+
+        assert events_count == 3
+        assert "SUMMARY:Spring Community Fair" in ics_content
+
+
+class TestScoreExtractedText:
+    """Test cases for scoring extractions for the model cascade."""
+
+    def test_complete_extraction_scores_high(self, mock_claude_response):
+        assert ICSService.score_extracted_text(mock_claude_response) >= 0.75
+
+    def test_no_events_answer_is_confident(self):
+        assert ICSService.score_extracted_text("No calendar events detected in this image.") == 1.0
+
+    def test_unparsable_text_scores_zero(self):
+        assert ICSService.score_extracted_text("I could not read this flyer.") == 0.0
+
+    def test_bad_date_and_time_lower_the_score(self):
+        good = "EVENT:\nTITLE: Quiz\nDATE: 2024-03-20\nSTART_TIME: 19:00\n---"
+        bad = "EVENT:\nTITLE: Quiz\nDATE: next Wednesday\nSTART_TIME: evening\n---"
+
+        assert ICSService.score_extracted_text(bad) < 0.5 < ICSService.score_extracted_text(good)
+
+    def test_truncated_response_is_penalized(self, mock_claude_response):
+        """Test that a response cut off before its closing --- scores half."""
+        truncated = mock_claude_response.rstrip().removesuffix("---")
+
+        assert ICSService.score_extracted_text(truncated) == pytest.approx(
+            ICSService.score_extracted_text(mock_claude_response) / 2
+        )
@@ -0,0 +1,126 @@
+import io
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from icalendar import Calendar
+from src.config import settings
+from src.services.ics_service import ICSService
+from src.services.ics_writer import escape_text, fold_line, format_value
+
+FIXED_NOW = datetime(2024, 3, 1, 9, 30, 15)
+
+EXTRACTED_TEXT = """
+EVENT:
+TITLE: Season opener; home vs. away, live on screen \\ big
+DATE: 2024-03-15
+START_TIME: 7:30 PM
+END_TIME: 10:00 PM
+LOCATION: Stade de la Mosson, Montpellier
+DESCRIPTION: Doors open early. Bring your ticket, ID and a scarf — billets à retirer au guichet, 日本語の案内もあります。 Parking is limited so please use public transport where possible.
+---
+
+EVENT:
+TITLE: Training
+DATE: March 16, 2024
+---
+
+EVENT:
+TITLE: Undated social
+LOCATION: Clubhouse
+---
+"""
+
+
+@pytest.fixture
+def frozen_now():
+    """Make generated timestamps and UIDs reproducible."""
+    with patch("src.services.ics_service.datetime") as mock_datetime:
+        mock_datetime.now.side_effect = lambda tz=None: FIXED_NOW.replace(tzinfo=tz)
+        yield
+
+
+def serialize(serializer, texts):
+    with patch.object(settings, "ics_serializer", serializer):
+        return ICSService().create_ics_from_texts(texts)
+
+
+class TestICSWriter:
+    """Test cases for the streaming ICS serializer."""
+
+    def test_escape_text(self):
+        """Test RFC 5545 TEXT escaping of separators, backslashes and newlines."""
+        assert escape_text("a;b,c\\d\ne\r\nf") == "a\\;b\\,c\\\\d\\ne\\nf"
+
+    def test_format_value(self):
+        """Test floating and UTC date-times."""
+        assert format_value(datetime(2024, 3, 15, 19, 30)) == "20240315T193000"
+        assert format_value(datetime(2024, 3, 15, 19, 30, tzinfo=timezone.utc)) == "20240315T193000Z"
+
+    @pytest.mark.parametrize(
+        "line",
+        [
+            "SUMMARY:" + "x" * 200,
+            "SUMMARY:" + "é日" * 60,
+            "DESCRIPTION:" + "a" * 62 + "\\,b" * 40,
+        ],
+    )
+    def test_fold_line_limits_octets(self, line):
+        """Test that folded lines stay within 75 octets and unfold losslessly."""
+        folded = fold_line(line)
+        physical_lines = folded.split("\r\n")
+
+        assert all(len(part.encode("utf-8")) <= 75 for part in physical_lines)
+        assert all(part.startswith(" ") for part in physical_lines[1:])
+        assert folded.replace("\r\n ", "") == line
+        # Never leave an escape's backslash at the end of a physical line
+        assert not any(part.endswith("\\") for part in physical_lines[:-1])
+
+    def test_matches_icalendar_output(self, frozen_now):
+        """Test that both serializers produce the same bytes."""
+        streamed, streamed_counts = serialize("streaming", [EXTRACTED_TEXT, EXTRACTED_TEXT])
+        built, built_counts = serialize("icalendar", [EXTRACTED_TEXT, EXTRACTED_TEXT])
+
+        assert streamed_counts == built_counts == [3, 3]
+        assert streamed == built
+
+    def test_round_trips_through_icalendar(self):
+        """Test that icalendar parses the output and re-serializes it byte for byte."""
+        streamed, _ = serialize("streaming", [EXTRACTED_TEXT])
+
+        parsed = Calendar.from_ical(streamed)
+
+        assert parsed.to_ical().decode("utf-8") == streamed
+        events = parsed.walk("VEVENT")
+        assert len(events) == 3
+        assert str(events[0]["SUMMARY"]) == "Season opener; home vs. away, live on screen \\ big"
+        assert events[0].decoded("DTSTART") == datetime(2024, 3, 15, 19, 30)
+        assert "日本語" in str(events[0]["DESCRIPTION"])
+
+    def test_write_to_file_handle(self, frozen_now):
+        """Test that writing to a file gives the same content as building a string."""
+        file = io.StringIO(newline="")
+
+        counts = ICSService().write_ics_from_texts([EXTRACTED_TEXT], file)
+
+        assert counts == [3]
+        assert file.getvalue() == serialize("streaming", [EXTRACTED_TEXT])[0]
+
+    def test_write_consumes_texts_lazily(self, frozen_now):
+        """Test that each text is only read once the events before it are written."""
+        file = io.StringIO(newline="")
+        written_before = []
+
+        def texts():
+            for _ in range(2):
+                written_before.append(file.getvalue().count("BEGIN:VEVENT"))
+                yield EXTRACTED_TEXT
+
+        counts = ICSService().write_ics_from_texts(texts(), file)
+
+        assert counts == [3, 3]
+        assert written_before == [0, 3]
+
+    def test_unknown_serializer(self):
+        """Test that a misconfigured serializer is reported."""
+        with pytest.raises(ValueError, match="Unknown ICS serializer"):
+            serialize("xml", [EXTRACTED_TEXT])
@@ -0,0 +1,97 @@
+import io
+import pytest
+from PIL import ExifTags, Image
+from src.services.image_preprocessor import ImagePreprocessor, estimate_image_tokens
+
+
+def encode(img, fmt="JPEG", **kwargs):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def open_bytes(data):
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+
+class TestImagePreprocessor:
+    """Test cases for the image preprocessor."""
+
+    @pytest.fixture
+    def preprocessor(self):
+        """Create a preprocessor with explicit settings."""
+        return ImagePreprocessor(
+            enabled=True, max_long_edge=800, output_format="JPEG", quality=80, grayscale=False
+        )
+
+    def test_downscales_long_edge(self, preprocessor):
+        """Test that large images are downscaled preserving aspect ratio."""
+        original = encode(Image.effect_noise((2400, 1200), 50).convert("RGB"), quality=95)
+
+        output, media_type = preprocessor.process(original, "image/jpeg")
+
+        assert media_type == "image/jpeg"
+        assert open_bytes(output).size == (800, 400)
+        assert len(output) < len(original)
+
+    def test_small_image_passes_through(self, preprocessor):
+        """Test that a small, already compact image is sent unchanged."""
+        original = encode(Image.effect_noise((100, 100), 50).convert("RGB"), quality=30, optimize=True)
+
+        output, media_type = preprocessor.process(original, "image/jpeg")
+
+        assert output == original
+        assert media_type == "image/jpeg"
+
+    def test_applies_exif_orientation(self, preprocessor):
+        """Test that EXIF orientation is baked into the pixels."""
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6  # rotated 90 degrees clockwise
+        original = encode(Image.new("RGB", (200, 100), "white"), exif=exif)
+
+        output, _ = preprocessor.process(original, "image/jpeg")
+
+        result = open_bytes(output)
+        assert result.size == (100, 200)
+        assert result.getexif().get(ExifTags.Base.Orientation, 1) == 1
+
+    def test_grayscale_and_format_conversion(self):
+        """Test grayscale conversion and re-encoding to another format."""
+        preprocessor = ImagePreprocessor(
+            enabled=True, max_long_edge=800, output_format="PNG", grayscale=True
+        )
+        original = encode(Image.new("RGBA", (300, 300), (255, 0, 0, 128)), "PNG")
+
+        output, media_type = preprocessor.process(original, "image/png")
+
+        assert media_type == "image/png"
+        assert open_bytes(output).mode == "L"
+
+    def test_transparent_png_to_jpeg(self, preprocessor):
+        """Test that transparent images are flattened for JPEG output."""
+        original = encode(Image.new("RGBA", (1600, 1600), (0, 0, 0, 0)), "PNG")
+
+        output, media_type = preprocessor.process(original, "image/png")
+
+        assert media_type == "image/jpeg"
+        result = open_bytes(output)
+        assert result.mode == "RGB"
+        assert result.getpixel((0, 0)) == (255, 255, 255)
+
+    def test_disabled_returns_original(self):
+        """Test that a disabled preprocessor is a no-op."""
+        preprocessor = ImagePreprocessor(enabled=False)
+
+        assert preprocessor.process(b"raw", "image/png") == (b"raw", "image/png")
+
+    def test_rejects_unknown_format(self):
+        """Test that unsupported output formats are rejected up front."""
+        with pytest.raises(ValueError, match="Unsupported preprocess format"):
+            ImagePreprocessor(output_format="TIFF")
+
+    def test_estimate_image_tokens(self):
+        """Test token estimates, including Claude's own downscaling cap."""
+        assert estimate_image_tokens(750, 100) == 100
+        assert estimate_image_tokens(1092, 1092) == estimate_image_tokens(4000, 4000)
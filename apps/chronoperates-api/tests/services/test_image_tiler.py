@@ -0,0 +1,77 @@
+import io
+import pytest
+from PIL import Image
+from src.services.image_tiler import plan_tiles, split_image
+
+
+class TestPlanTiles:
+    """Test cases for the tile grid."""
+
+    def test_tiles_cover_image_with_overlap(self):
+        """Test that every pixel is covered and neighbours share the overlap."""
+        boxes = plan_tiles(4000, 2500, 1000, 0.1, 16)
+
+        xs = sorted({box[0] for box in boxes})
+        ys = sorted({box[1] for box in boxes})
+        assert len(boxes) == len(xs) * len(ys)
+        assert xs[0] == ys[0] == 0
+        assert max(box[2] for box in boxes) == 4000
+        assert max(box[3] for box in boxes) == 2500
+        for starts in (xs, ys):
+            for previous, start in zip(starts, starts[1:]):
+                assert previous + 1000 - start >= 100
+
+    def test_small_image_is_one_tile(self):
+        assert plan_tiles(800, 600, 1000, 0.1, 16) == [(0, 0, 800, 600)]
+
+    def test_tiles_grow_to_respect_max_tiles(self):
+        """Test that a huge image gets larger tiles rather than more of them."""
+        boxes = plan_tiles(20_000, 20_000, 1000, 0.1, 9)
+
+        assert len(boxes) <= 9
+        assert max(box[2] for box in boxes) == 20_000
+
+    def test_invalid_overlap(self):
+        with pytest.raises(ValueError, match="overlap"):
+            plan_tiles(4000, 4000, 1000, 0.5, 16)
+
+
+class TestSplitImage:
+    """Test cases for cutting images into tiles."""
+
+    @staticmethod
+    def encode(img: Image.Image, image_format: str = "JPEG", **save_kwargs) -> bytes:
+        buffer = io.BytesIO()
+        img.save(buffer, image_format, **save_kwargs)
+        return buffer.getvalue()
+
+    def test_tiles_match_plan(self):
+        data = self.encode(Image.new("RGB", (2000, 900), "white"))
+
+        tiles = split_image(data, 1000, 0.1, 16)
+
+        sizes = [Image.open(io.BytesIO(tile)).size for tile in tiles]
+        assert sizes == [(box[2] - box[0], box[3] - box[1]) for box in plan_tiles(2000, 900, 1000, 0.1, 16)]
+
+    def test_truncated_image_is_invalid(self):
+        data = self.encode(Image.effect_noise((2000, 900), 64).convert("RGB"))
+
+        with pytest.raises(ValueError, match="Invalid image file"):
+            split_image(data[: len(data) // 2], 1000, 0.1, 16)
+
+    def test_exif_orientation_is_applied(self):
+        """Test that a sideways photo is tiled as it is displayed."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise to display
+        data = self.encode(Image.new("RGB", (2000, 900), "white"), exif=exif.tobytes())
+
+        tiles = split_image(data, 1000, 0.1, 16)
+
+        assert [Image.open(io.BytesIO(tile)).size for tile in tiles] == [(900, 1000)] * 3
+
+    def test_transparent_tiles_are_png(self):
+        data = self.encode(Image.new("RGBA", (1500, 500), (0, 0, 0, 0)), "PNG")
+
+        tiles = split_image(data, 1000, 0.1, 16)
+
+        assert all(tile.startswith(b"\x89PNG") for tile in tiles)
@@ -0,0 +1,106 @@
+import io
+import pytest
+from PIL import Image
+from src.services.image_validation import (
+    ImageInfo,
+    decode_image,
+    read_image_info,
+    sniff_format,
+)
+
+
+def encode(image_format: str, size=(120, 80), mode="RGB", **save_kwargs) -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size, "white").save(buffer, image_format, **save_kwargs)
+    return buffer.getvalue()
+
+
+class TestReadImageInfo:
+    """Test cases for header-only format and dimension detection."""
+
+    @pytest.mark.parametrize(
+        "image_format, save_kwargs",
+        [
+            ("JPEG", {}),
+            ("JPEG", {"progressive": True}),
+            ("PNG", {}),
+            ("GIF", {}),
+            ("BMP", {}),
+            ("WEBP", {"lossless": False}),
+            ("WEBP", {"lossless": True}),
+        ],
+    )
+    def test_dimensions_match_pil(self, image_format, save_kwargs):
+        """Test that format and size agree with what PIL decodes."""
+        data = encode(image_format, **save_kwargs)
+
+        assert read_image_info(data) == ImageInfo(image_format, 120, 80)
+
+    def test_webp_extended_header(self):
+        """Test the VP8X canvas size of a WebP with an alpha channel and EXIF."""
+        exif = Image.Exif()
+        exif[0x010E] = "flyer"
+        data = encode("WEBP", size=(300, 17), mode="RGBA", exif=exif.tobytes())
+
+        assert bytes(data[12:16]) == b"VP8X"
+        assert read_image_info(data) == ImageInfo("WEBP", 300, 17)
+
+    def test_jpeg_frame_after_large_metadata(self):
+        """Test that JPEG segments before the frame header are skipped by length."""
+        exif = Image.Exif()
+        exif[0x010E] = "x" * 60_000
+        data = encode("JPEG", size=(640, 480), exif=exif.tobytes())
+
+        assert read_image_info(data) == ImageInfo("JPEG", 640, 480)
+        assert read_image_info(data).media_type == "image/jpeg"
+
+    def test_top_down_bmp(self):
+        """Test that a negative BMP height is read as its absolute value."""
+        data = bytearray(encode("BMP"))
+        data[22:26] = (-80).to_bytes(4, "little", signed=True)
+
+        assert read_image_info(data) == ImageInfo("BMP", 120, 80)
+
+    def test_reads_memoryview_without_copying(self):
+        """Test that any bytes-like object is accepted."""
+        assert read_image_info(memoryview(encode("PNG"))).pixels == 120 * 80
+
+    @pytest.mark.parametrize("data", [b"", b"not an image", b"%PDF-1.7\n" + b"0" * 100])
+    def test_unrecognized(self, data):
+        """Test that content with no known signature is rejected."""
+        assert sniff_format(data) is None
+        with pytest.raises(ValueError, match="Invalid image file"):
+            read_image_info(data)
+
+    @pytest.mark.parametrize(
+        "image_format, length",
+        [("JPEG", 20), ("PNG", 20), ("GIF", 8), ("BMP", 20), ("WEBP", 20)],
+    )
+    def test_truncated_header(self, image_format, length):
+        """Test that a header cut short is rejected instead of raising struct errors."""
+        data = encode(image_format)[:length]
+
+        assert sniff_format(data) == image_format
+        with pytest.raises(ValueError, match=f"truncated {image_format} header"):
+            read_image_info(data)
+
+    def test_jpeg_without_frame_header(self):
+        """Test that a JPEG reaching its end of image without a frame is rejected."""
+        with pytest.raises(ValueError, match="no frame header"):
+            read_image_info(b"\xff\xd8\xff\xd9")
+
+
+class TestDecodeImage:
+    """Test cases for the optional full decode."""
+
+    def test_valid_image(self):
+        decode_image(encode("PNG"))
+
+    def test_corrupt_pixel_data(self):
+        """Test that damage past the header is caught by decoding."""
+        data = encode("PNG", size=(400, 400))
+        truncated = data[: len(data) // 2]
+
+        read_image_info(truncated)
+        with pytest.raises(ValueError, match="Invalid image file"):
+            decode_image(truncated)
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import time
+from src.artifacts import ArtifactStore
+
+
+class TestArtifactStore:
+    """Test cases for the content-addressed artifact store."""
+
+    def test_put_is_content_addressed_and_deduplicated(self, tmp_path):
+        """Test that identical content is stored once under its SHA-256."""
+        import hashlib
+
+        store = ArtifactStore(tmp_path, ".ics")
+
+        first_id, first_path = store.put(b"BEGIN:VCALENDAR")
+        second_id, second_path = store.put(b"BEGIN:VCALENDAR")
+        other_id, _ = store.put(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR")
+
+        assert first_id == hashlib.sha256(b"BEGIN:VCALENDAR").hexdigest()
+        assert (second_id, second_path) == (first_id, first_path)
+        assert other_id != first_id
+        assert first_path.read_bytes() == b"BEGIN:VCALENDAR"
+        stats = store.stats()
+        assert (stats["entries"], stats["writes"], stats["deduplicated"]) == (2, 2, 1)
+
+    def test_alias_finds_content_until_swept(self, tmp_path):
+        """Test that an alias reads back its content, whose id stays its own hash."""
+        store = ArtifactStore(tmp_path, ".ics", ttl_seconds=60)
+        alias = "a" * 64
+
+        assert store.get_by_alias(alias) is None
+        artifact_id, path = store.put(b"DTSTAMP:1", alias)
+        assert artifact_id == hashlib.sha256(b"DTSTAMP:1").hexdigest()
+        assert store.get_by_alias(alias) == (b"DTSTAMP:1", path)
+        assert store.stats()["entries"] == 1
+
+        old = time.time() - 120
+        os.utime(path, (old, old))
+        assert store.sweep() == 1
+        assert store.get_by_alias(alias) is None
+        assert not (tmp_path / "aliases" / alias).exists()
+
+        # Rendered again, the alias names the new bytes under their own id
+        new_id, new_path = store.put(b"DTSTAMP:2", alias)
+        assert new_id != artifact_id
+        assert store.get_by_alias(alias) == (b"DTSTAMP:2", new_path)
+        assert store.get_by_alias("../" + alias) is None
+
+    def test_lookup_rejects_foreign_paths(self, tmp_path):
+        """Test that only well-formed ids and paths inside the store resolve."""
+        store = ArtifactStore(tmp_path / "store", ".ics")
+        artifact_id, path = store.put(b"calendar")
+        outside = tmp_path / f"{artifact_id}.ics"
+        outside.write_bytes(b"secret")
+
+        assert store.path(artifact_id) == path
+        assert store.id_for_path(path) == artifact_id
+        assert store.path("../../etc/passwd") is None
+        assert store.path("0" * 64) is None
+        assert store.id_for_path(outside) is None
+        assert store.id_for_path(tmp_path / "store" / ".." / "store" / artifact_id[:2] / f"{artifact_id}.ics") == artifact_id
+        assert store.id_for_path("/etc/passwd") is None
+
+    def test_sweep_expires_old_artifacts(self, tmp_path):
+        """Test that artifacts unused for longer than the TTL are removed."""
+        store = ArtifactStore(tmp_path, ".ics", ttl_seconds=60)
+        old_id, old_path = store.put(b"old")
+        new_id, _ = store.put(b"new")
+        past = time.time() - 120
+        os.utime(old_path, (past, past))
+
+        assert store.sweep() == 1
+        assert store.path(old_id) is None
+        assert store.path(new_id) is not None
+
+    def test_sweep_enforces_byte_budget_lru(self, tmp_path):
+        """Test that the least recently written or re-used artifacts go first."""
+        store = ArtifactStore(tmp_path, ".ics", max_bytes=250)
+        ids = []
+        for i in range(4):
+            artifact_id, path = store.put(bytes([i]) * 100)
+            stamp = time.time() - 100 + i
+            os.utime(path, (stamp, stamp))
+            ids.append(artifact_id)
+        # Re-writing the oldest artifact counts as a use
+        store.put(bytes([0]) * 100)
+
+        assert store.sweep() == 2
+        assert [store.path(i) is not None for i in ids] == [True, False, False, True]
+        assert store.stats()["bytes"] == 200
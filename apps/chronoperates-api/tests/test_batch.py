@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock
+import pytest
+from PIL import Image
+from src.batch import ERROR, OK, inspect_image, load_checkpoint, main, run_batch
+from src.services.claude_service import ClaudeService
+from src.services.ics_service import ICSService
+
+
+def write_image(path, color="white"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (100, 100), color).save(path, "JPEG")
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestBatch:
+    """Test cases for the bulk extraction command."""
+
+    @pytest.fixture
+    def archive(self, tmp_path):
+        """A directory with two flyers, one in a subdirectory, a corrupt image and a note."""
+        root = tmp_path / "archive"
+        write_image(root / "a.jpg", "white")
+        write_image(root / "2023" / "b.jpg", "black")
+        (root / "broken.png").write_bytes(b"not an image")
+        (root / "notes.txt").write_text("not an image either")
+        return root
+
+    @pytest.fixture
+    def claude_service(self, mock_claude_response):
+        service = Mock()
+        service.extract_events_from_bytes = AsyncMock(return_value=mock_claude_response)
+        return service
+
+    def run(self, root, claude_service, **kwargs):
+        return asyncio.run(run_batch(
+            root,
+            root.parent / "results.ndjson",
+            root.parent / "events.ics",
+            concurrency=kwargs.pop("concurrency", 2),
+            workers=1,
+            claude_service=claude_service,
+            ics_service=ICSService(),
+            **kwargs,
+        ))
+
+    def test_inspect_image(self, archive):
+        """Test that a worker returns the image with the cache key the service would compute."""
+        prompt = ClaudeService._create_extraction_prompt()
+        image_data = (archive / "a.jpg").read_bytes()
+
+        inspection = inspect_image(str(archive / "a.jpg"), prompt)
+
+        assert inspection.image_data == image_data
+        assert inspection.md5 == hashlib.md5(image_data).hexdigest()
+        assert inspection.cache_key == ClaudeService._get_cache_key_for_bytes(image_data, prompt)
+        assert inspection.error is None
+
+        inspection = inspect_image(str(archive / "broken.png"), prompt)
+        assert inspection.image_data is None
+        assert inspection.error == "Invalid input: Invalid image file: unrecognized image format"
+
+    def test_results_and_merged_calendar(self, archive, claude_service):
+        """Test that each image gets a record and the events of all of them one calendar."""
+        summary = self.run(archive, claude_service)
+
+        assert (summary.succeeded, summary.failed, summary.skipped) == (2, 1, 0)
+        records = {record["path"]: record for record in read_records(archive.parent / "results.ndjson")}
+        assert set(records) == {"a.jpg", "2023/b.jpg", "broken.png"}
+        assert records["a.jpg"]["status"] == OK
+        assert records["a.jpg"]["events_found"] == 2
+        assert records["broken.png"]["status"] == ERROR
+        assert claude_service.extract_events_from_bytes.await_count == 2
+        assert "extracted_text" not in load_checkpoint(archive.parent / "results.ndjson")["a.jpg"]
+
+        ics_content = (archive.parent / "events.ics").read_text()
+        assert summary.events_found == 4
+        assert ics_content.count("BEGIN:VEVENT") == 4
+
+    def test_rerun_resumes(self, archive, claude_service):
+        """Test that a rerun only processes failed, new and changed images."""
+        self.run(archive, claude_service)
+        (archive / "broken.png").unlink()
+        write_image(archive / "broken.png")
+        write_image(archive / "2023" / "b.jpg", "gray")
+        write_image(archive / "c.jpg", "red")
+        claude_service.extract_events_from_bytes.reset_mock()
+
+        summary = self.run(archive, claude_service)
+
+        assert (summary.succeeded, summary.failed, summary.skipped) == (3, 0, 1)
+        extracted = {
+            call.args[1] for call in claude_service.extract_events_from_bytes.await_args_list
+        }
+        assert extracted == {"broken.png", "b.jpg", "c.jpg"}
+        assert summary.events_found == 8
+
+    def test_line_cut_short_is_reprocessed(self, archive, claude_service):
+        """Test that a record half-written by a killed run is ignored and not appended to."""
+        self.run(archive, claude_service)
+        results = archive.parent / "results.ndjson"
+        lines = results.read_text().splitlines(keepends=True)
+        cut = next(i for i, line in enumerate(lines) if '"a.jpg"' in line)
+        results.write_text("".join(lines[:cut] + lines[cut + 1:]) + lines[cut][:20])
+
+        summary = self.run(archive, claude_service)
+
+        assert summary.succeeded == 1
+        assert load_checkpoint(results)["a.jpg"]["status"] == OK
+
+    def test_extraction_errors_are_recorded(self, archive, claude_service):
+        claude_service.extract_events_from_bytes.side_effect = RuntimeError("overloaded")
+
+        summary = self.run(archive, claude_service)
+
+        assert summary.failed == 3
+        errors = {record["error"] for record in read_records(archive.parent / "results.ndjson")}
+        assert "Extraction failed: overloaded" in errors
+
+    def test_concurrency_is_bounded(self, archive, claude_service, mock_claude_response):
+        for i in range(6):
+            write_image(archive / f"extra{i}.jpg", (i, i, i))
+        active = 0
+        peak = 0
+
+        async def slow_extract(image_data, filename, cache_key):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return mock_claude_response
+
+        claude_service.extract_events_from_bytes.side_effect = slow_extract
+
+        self.run(archive, claude_service, concurrency=3)
+
+        assert peak == 3
+
+    def test_images_in_flight_are_bounded(self, archive, claude_service, mock_claude_response, monkeypatch):
+        """Test that images are only read as extraction tasks get to them, by spawned workers."""
+        for i in range(10):
+            write_image(archive / f"extra{i}.jpg", (i, i, i))
+        pools = []
+
+        class CountingPool(ThreadPoolExecutor):
+            def __init__(self, max_workers, mp_context):
+                super().__init__(max_workers)
+                self.start_method = mp_context.get_start_method()
+                self.submitted = 0
+                pools.append(self)
+
+            def submit(self, *args, **kwargs):
+                self.submitted += 1
+                return super().submit(*args, **kwargs)
+
+        release = asyncio.Event()
+        in_flight = []
+
+        async def blocked_extract(image_data, filename, cache_key):
+            if not release.is_set():
+                await asyncio.sleep(0.2)
+                in_flight.append(pools[0].submitted)
+                release.set()
+            return mock_claude_response
+
+        monkeypatch.setattr("src.batch.ProcessPoolExecutor", CountingPool)
+        claude_service.extract_events_from_bytes.side_effect = blocked_extract
+
+        summary = self.run(archive, claude_service, concurrency=1)
+
+        assert pools[0].start_method == "spawn"
+        # One being extracted, concurrency + workers queued, one waiting to be queued
+        assert in_flight == [4]
+        assert pools[0].submitted == 13
+        assert summary.succeeded == 12
+
+    def test_main_requires_api_key(self, archive, monkeypatch, capsys):
+        from src.config import settings
+
+        monkeypatch.setattr(settings, "anthropic_api_key", None)
+
+        assert main([str(archive)]) == 2
+        assert "API key" in capsys.readouterr().out
@@ -0,0 +1,298 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from src.governor import (
+    AIMDLimiter,
+    TokenBucket,
+    UpstreamBusyError,
+    UpstreamGovernor,
+    retry_after_header,
+    retry_after_seconds,
+)
+
+
+class FakeAPIError(Exception):
+    """Shaped like the SDK's APIStatusError: a status code and the response headers."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def make_governor(**kwargs):
+    limiter = kwargs.pop("limiter", None) or AIMDLimiter(4, 1, 8)
+    kwargs.setdefault("max_retries", 3)
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("backoff_max", 1.0)
+    return UpstreamGovernor(limiter, **kwargs)
+
+
+def flaky(*outcomes):
+    """A call that raises or returns each outcome in turn, recording when it ran."""
+    calls = []
+
+    async def call():
+        outcome = outcomes[len(calls)]
+        calls.append(time.monotonic())
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, calls
+
+
+async def admitted_call(governor, fn):
+    """A call made for a request of its own, as the service makes them."""
+    with governor.admission():
+        return await governor.call(fn)
+
+
+class TestRetryAfter:
+    """Test cases for reading how long the server asked us to wait."""
+
+    @pytest.mark.parametrize(
+        "headers, expected",
+        [
+            ({"retry-after": "3"}, 3.0),
+            ({"retry-after-ms": "250", "retry-after": "3"}, 0.25),
+            ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+            ({"retry-after": "soon"}, None),
+            ({}, None),
+        ],
+    )
+    def test_headers(self, headers, expected):
+        assert retry_after_seconds(FakeAPIError(429, headers)) == expected
+
+    def test_header_value_rounds_up(self):
+        assert [retry_after_header(s) for s in (0, 0.2, 1.0, 2.1)] == ["1", "1", "1", "3"]
+
+
+class TestTokenBucket:
+    """Test cases for the per-minute rate limits."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_rate(self):
+        """Test that a minute's worth goes at once and the rest at the refill rate."""
+        bucket = TokenBucket(per_minute=600)  # 10 per second
+        start = time.monotonic()
+
+        for _ in range(600):
+            await bucket.acquire()
+        assert time.monotonic() - start < 0.05
+
+        await asyncio.gather(*(bucket.acquire() for _ in range(2)))
+        assert time.monotonic() - start >= 0.15
+
+    def test_usage_charged_afterwards_delays_later_calls(self):
+        bucket = TokenBucket(per_minute=6000)  # 100 per second
+
+        bucket.charge(6050)
+
+        assert bucket.delay() == pytest.approx(0.5, abs=0.01)
+
+
+class TestAIMDLimiter:
+    """Test cases for the adaptive concurrency limit."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self):
+        limiter = AIMDLimiter(initial=2, minimum=1, maximum=4)
+        active = 0
+        peak = 0
+
+        async def work():
+            nonlocal active, peak
+            await limiter.acquire()
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            limiter.release()
+
+        await asyncio.gather(*(work() for _ in range(6)))
+
+        assert peak == 2
+        assert limiter.in_use == 0
+
+    def test_additive_increase_and_multiplicative_decrease(self):
+        limiter = AIMDLimiter(initial=4, minimum=1, maximum=6)
+
+        # About one more slot per limit's worth of successes
+        for _ in range(4):
+            limiter.on_success()
+        assert 4.8 < limiter.limit < 5
+
+        before = limiter.limit
+        limiter.on_throttle(started=time.monotonic())
+        assert limiter.limit == pytest.approx(before / 2)
+
+        for _ in range(100):
+            limiter.on_success()
+        assert limiter.limit == 6
+
+    def test_burst_of_throttles_decreases_once(self):
+        """Test that calls started before a decrease do not decrease the limit again."""
+        limiter = AIMDLimiter(initial=8, minimum=1, maximum=8)
+        started = time.monotonic()
+
+        for _ in range(5):
+            limiter.on_throttle(started)
+
+        assert limiter.limit == 4
+        assert limiter.decreases == 1
+
+        limiter.on_throttle(time.monotonic())
+        assert limiter.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_a_slot(self):
+        limiter = AIMDLimiter(initial=1, minimum=1, maximum=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        limiter.release()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert limiter.in_use == 0
+        await asyncio.wait_for(limiter.acquire(), 1)
+
+
+class TestUpstreamGovernor:
+    """Test cases for retries, backoff and admission control."""
+
+    @pytest.mark.asyncio
+    async def test_retries_throttled_call_after_retry_after(self):
+        """Test that a 429 is retried no sooner than its retry-after and shrinks the limit."""
+        governor = make_governor()
+        call, calls = flaky(FakeAPIError(429, {"retry-after-ms": "100"}), "ok")
+
+        assert await governor.call(call) == "ok"
+
+        assert calls[1] - calls[0] >= 0.1
+        # Halved by the 429, then raised by 1/2 for the success
+        assert governor.limiter.limit == 2.5
+        assert governor.stats()["throttled"] == 1
+        assert governor.stats()["retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_server_errors_are_retried_with_backoff(self):
+        governor = make_governor()
+        call, calls = flaky(FakeAPIError(500), FakeAPIError(529), ConnectionError("reset"), "ok")
+        governor.retry_on = (ConnectionError,)
+
+        assert await governor.call(call) == "ok"
+        assert len(calls) == 4
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        governor = make_governor()
+        call, calls = flaky(FakeAPIError(400))
+
+        with pytest.raises(FakeAPIError):
+            await governor.call(call)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_persistent_throttling_raises_busy(self):
+        """Test that a call still throttled after its retries asks the client to come back later."""
+        governor = make_governor(max_retries=2)
+        call, calls = flaky(*[FakeAPIError(429, {"retry-after": "0"})] * 3)
+
+        with pytest.raises(UpstreamBusyError) as excinfo:
+            await governor.call(call)
+
+        assert len(calls) == 3
+        assert excinfo.value.retry_after >= 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_beyond_backoff_max_is_not_waited_for(self):
+        governor = make_governor(backoff_max=1.0)
+        call, calls = flaky(FakeAPIError(429, {"retry-after": "120"}))
+
+        with pytest.raises(UpstreamBusyError) as excinfo:
+            await governor.call(call)
+
+        assert len(calls) == 1
+        assert excinfo.value.retry_after == 120
+
+    @pytest.mark.asyncio
+    async def test_throttle_pauses_other_calls(self):
+        """Test that calls starting after a 429 wait for its retry-after too."""
+        governor = make_governor(max_retries=0)
+        throttled, _ = flaky(FakeAPIError(429, {"retry-after-ms": "100"}))
+        with pytest.raises(UpstreamBusyError):
+            await governor.call(throttled)
+
+        call, calls = flaky("ok")
+        start = time.monotonic()
+        await governor.call(call)
+
+        assert calls[0] - start >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_full_queue_is_rejected(self):
+        """Test that calls beyond the queue limit fail fast instead of waiting."""
+        governor = make_governor(limiter=AIMDLimiter(1, 1, 1), max_queue=3)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "ok"
+
+        running = [asyncio.ensure_future(admitted_call(governor, slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(UpstreamBusyError):
+            await admitted_call(governor, slow)
+        assert governor.stats()["rejected"] == 1
+
+        release.set()
+        assert await asyncio.gather(*running) == ["ok"] * 3
+        assert governor.stats()["in_progress"] == 0
+
+    @pytest.mark.asyncio
+    async def test_calls_backing_off_count_against_the_queue(self):
+        """Test that calls waiting to retry still hold their place, though they hold no slot."""
+        governor = make_governor(max_queue=2)
+        retrying = [
+            asyncio.ensure_future(admitted_call(
+                governor, flaky(FakeAPIError(503, {"retry-after-ms": "100"}), "ok")[0]
+            ))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.02)
+
+        stats = governor.stats()
+        assert (stats["in_progress"], stats["in_flight"], stats["queued"]) == (2, 0, 0)
+        with pytest.raises(UpstreamBusyError):
+            await admitted_call(governor, flaky("ok")[0])
+
+        assert await asyncio.gather(*retrying) == ["ok"] * 2
+        assert await admitted_call(governor, flaky("ok")[0]) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_request_is_admitted_once_for_all_its_calls(self):
+        """Test that calls made under one admission do not count against the queue again."""
+        governor = make_governor(max_queue=1)
+        call, calls = flaky("ok", "ok", "ok")
+
+        with governor.admission():
+            assert await asyncio.gather(*(governor.call(call) for _ in range(3))) == ["ok"] * 3
+
+        assert len(calls) == 3
+        assert governor.stats()["admitted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_spaces_requests(self):
+        governor = make_governor(requests=TokenBucket(per_minute=600))
+        governor.requests.balance = 0
+        call, calls = flaky("ok", "ok", "ok")
+
+        for _ in range(3):
+            await governor.call(call)
+
+        assert calls[2] - calls[0] >= 0.15
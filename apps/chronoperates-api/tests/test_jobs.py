@@ -0,0 +1,296 @@
+import asyncio
+import sqlite3
+import subprocess
+import sys
+import time
+import pytest
+from src.governor import UpstreamBusyError
+from src.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobRunner, JobStore
+
+
+async def wait_for_status(store, job_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} still {store.get(job_id).status}")
+
+
+class TestJobStore:
+    """Test cases for the persistent job store."""
+
+    def test_claim_runs_jobs_in_submission_order(self, tmp_path):
+        """Test that jobs are claimed oldest first and only once."""
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        first = store.create("a.jpg", b"first")
+        second = store.create("b.jpg", b"second")
+
+        job, image_data = store.claim()
+        assert (job.id, job.status, image_data) == (first.id, RUNNING, b"first")
+        assert store.claim()[0].id == second.id
+        assert store.claim() is None
+        assert store.count_by_status() == {
+            QUEUED: 0, RUNNING: 2, SUCCEEDED: 0, FAILED: 0
+        }
+
+    def test_results_survive_reopening(self, tmp_path):
+        """Test that finished jobs are readable from a new store instance."""
+        db_path = tmp_path / "jobs.sqlite3"
+        store = JobStore(db_path)
+        done = store.create("a.jpg", b"image")
+        broken = store.create("b.jpg", b"image")
+        store.claim()
+        store.claim()
+        store.succeed(done.id, "EVENT: ...", "BEGIN:VCALENDAR", 1)
+        store.fail(broken.id, "Invalid input: bad image")
+        store.close()
+
+        reopened = JobStore(db_path)
+        job = reopened.get(done.id)
+        assert (job.status, job.ics_content, job.events_found) == (
+            SUCCEEDED, "BEGIN:VCALENDAR", 1
+        )
+        assert reopened.get(broken.id).error == "Invalid input: bad image"
+        assert reopened.get("missing") is None
+
+    def test_recover_jobs_of_dead_worker(self, tmp_path):
+        """Test that jobs running in an exited process are queued again."""
+        db_path = tmp_path / "jobs.sqlite3"
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+
+        crashed = JobStore(db_path)
+        crashed.pid = dead.pid
+        job = crashed.create("a.jpg", b"image")
+        crashed.claim()
+
+        restarted = JobStore(db_path)
+        assert restarted.recover_interrupted() == 1
+        assert restarted.claim()[0].id == job.id
+
+    def test_running_jobs_of_live_worker_are_kept(self, tmp_path):
+        """Test that recovery leaves jobs of running processes alone."""
+        db_path = tmp_path / "jobs.sqlite3"
+        other = JobStore(db_path)
+        other.create("a.jpg", b"image")
+        other.claim()
+
+        assert JobStore(db_path).recover_interrupted() == 0
+
+    def test_recover_jobs_left_by_same_pid(self, tmp_path):
+        """Test that a job of a killed process is recovered when its restart reuses the pid."""
+        db_path = tmp_path / "jobs.sqlite3"
+        killed = JobStore(db_path, lease_seconds=0.05)
+        job = killed.create("a.jpg", b"image")
+        killed.claim()
+
+        restarted = JobStore(db_path, lease_seconds=0.05)
+        assert restarted.pid == killed.pid
+        assert restarted.recover_interrupted() == 0
+
+        time.sleep(0.1)
+        assert restarted.recover_interrupted() == 1
+        assert restarted.claim()[0].id == job.id
+
+    def test_expired_lease_is_claimed_again(self, tmp_path):
+        """Test that another worker takes over a running job that stopped renewing its lease."""
+        db_path = tmp_path / "jobs.sqlite3"
+        stalled = JobStore(db_path, lease_seconds=0.05)
+        job = stalled.create("a.jpg", b"image")
+        stalled.claim()
+        other = JobStore(db_path, lease_seconds=0.05)
+        assert other.claim() is None
+
+        time.sleep(0.1)
+        assert stalled.renew(job.id)
+        assert other.claim() is None
+
+        time.sleep(0.1)
+        assert other.claim()[0].id == job.id
+        assert not stalled.renew(job.id)
+        stalled.requeue(job.id)
+        assert other.get(job.id).status == RUNNING
+
+        # The stalled worker finishing late does not overwrite the new run
+        assert not stalled.succeed(job.id, "stale", "ics", 0)
+        assert not stalled.fail(job.id, "Extraction failed: stale")
+        assert other.get(job.id).status == RUNNING
+        assert other.succeed(job.id, "text", "ics", 1)
+        assert other.get(job.id).extracted_text == "text"
+
+    def test_table_of_earlier_version_is_upgraded(self, tmp_path):
+        """Test that a job store created before leases gains its columns on open."""
+        db_path = tmp_path / "jobs.sqlite3"
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "filename TEXT NOT NULL, image BLOB, extracted_text TEXT, ics_content TEXT, "
+            "events_found INTEGER NOT NULL DEFAULT 0, error TEXT, hostname TEXT, "
+            "pid INTEGER, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO jobs (id, status, filename, image, hostname, pid, created_at, updated_at) "
+            "VALUES ('old', ?, 'a.jpg', x'00', 'host', 1, 0, 0)",
+            (RUNNING,),
+        )
+        conn.commit()
+        conn.close()
+
+        store = JobStore(db_path)
+
+        assert store.recover_interrupted() == 1
+        job, _ = store.claim()
+        assert job.id == "old"
+        assert store.renew(job.id)
+
+    def test_purge_only_removes_old_finished_jobs(self, tmp_path):
+        """Test that purging keeps queued jobs and recent results."""
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        old = store.create("a.jpg", b"image")
+        store.claim()
+        store.succeed(old.id, "text", "ics", 0)
+        queued = store.create("b.jpg", b"image")
+
+        assert store.purge_finished_older_than(time.time() + 1) == 1
+        assert store.get(old.id) is None
+        assert store.get(queued.id) is not None
+
+
+class TestJobRunner:
+    """Test cases for the background job worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_runs_jobs_and_records_results(self, tmp_path):
+        """Test that submitted jobs are processed and failures recorded."""
+        store = JobStore(tmp_path / "jobs.sqlite3")
+
+        async def handler(image_data, filename):
+            if filename == "bad.jpg":
+                raise ValueError("Invalid image file")
+            return f"text for {image_data.decode()}", "BEGIN:VCALENDAR", 2
+
+        runner = JobRunner(store, handler, workers=2, poll_interval=10)
+        await runner.start()
+        try:
+            good = store.create("good.jpg", b"flyer")
+            bad = store.create("bad.jpg", b"flyer")
+            runner.notify()
+
+            good_job = await wait_for_status(store, good.id, {SUCCEEDED, FAILED})
+            bad_job = await wait_for_status(store, bad.id, {SUCCEEDED, FAILED})
+        finally:
+            await runner.stop()
+
+        assert good_job.status == SUCCEEDED
+        assert good_job.extracted_text == "text for flyer"
+        assert good_job.events_found == 2
+        assert bad_job.status == FAILED
+        assert bad_job.error == "Invalid input: Invalid image file"
+
+    @pytest.mark.asyncio
+    async def test_stop_requeues_running_jobs(self, tmp_path):
+        """Test that jobs interrupted by shutdown are picked up on the next start."""
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        started = asyncio.Event()
+
+        async def hang(image_data, filename):
+            started.set()
+            await asyncio.sleep(60)
+
+        runner = JobRunner(store, hang, workers=1, poll_interval=10)
+        await runner.start()
+        job = store.create("a.jpg", b"image")
+        runner.notify()
+        await asyncio.wait_for(started.wait(), 5)
+        await runner.stop()
+
+        assert store.get(job.id).status == QUEUED
+
+        async def finish(image_data, filename):
+            return "text", "ics", 0
+
+        restarted = JobRunner(store, finish, workers=1, poll_interval=10)
+        await restarted.start()
+        try:
+            assert (await wait_for_status(store, job.id, {SUCCEEDED})).status == SUCCEEDED
+        finally:
+            await restarted.stop()
+
+    @pytest.mark.asyncio
+    async def test_running_job_keeps_its_lease(self, tmp_path):
+        """Test that a job running for longer than the lease is not taken over."""
+        db_path = tmp_path / "jobs.sqlite3"
+        store = JobStore(db_path, lease_seconds=0.15)
+        other = JobStore(db_path, lease_seconds=0.15)
+
+        async def slow(image_data, filename):
+            await asyncio.sleep(0.4)
+            return "text", "ics", 0
+
+        runner = JobRunner(store, slow, workers=1, poll_interval=10)
+        await runner.start()
+        try:
+            job = store.create("a.jpg", b"image")
+            runner.notify()
+            await asyncio.sleep(0.3)
+            assert other.claim() is None
+            assert (await wait_for_status(store, job.id, {SUCCEEDED})).status == SUCCEEDED
+        finally:
+            await runner.stop()
+
+    @pytest.mark.asyncio
+    async def test_busy_upstream_requeues_job(self, tmp_path):
+        """Test that a job turned away by the upstream governor runs again instead of failing."""
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        calls = 0
+
+        async def busy_once(image_data, filename):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise UpstreamBusyError("Upstream API is throttling requests (429)", retry_after=0.01)
+            return "text", "ics", 1
+
+        runner = JobRunner(store, busy_once, workers=1, poll_interval=10)
+        await runner.start()
+        try:
+            job = store.create("a.jpg", b"image")
+            runner.notify()
+            done = await wait_for_status(store, job.id, {SUCCEEDED, FAILED})
+        finally:
+            await runner.stop()
+
+        assert done.status == SUCCEEDED
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_store_errors(self, tmp_path, monkeypatch):
+        """Test that a database error in the worker loop is logged and the worker keeps going."""
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        claim = store.claim
+        failures = 0
+
+        def locked_once():
+            nonlocal failures
+            if failures == 0:
+                failures += 1
+                raise sqlite3.OperationalError("database is locked")
+            return claim()
+
+        monkeypatch.setattr(store, "claim", locked_once)
+
+        async def finish(image_data, filename):
+            return "text", "ics", 1
+
+        runner = JobRunner(store, finish, workers=1, poll_interval=0.01)
+        job = store.create("a.jpg", b"image")
+        await runner.start()
+        try:
+            done = await wait_for_status(store, job.id, {SUCCEEDED, FAILED})
+        finally:
+            await runner.stop()
+
+        assert failures == 1
+        assert done.status == SUCCEEDED
@@ -0,0 +1,45 @@
+import pytest
+import subprocess
+import sys
+from pathlib import Path
+from src.lazy import lazy_import
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+class TestLazyImport:
+    """Test cases for deferred module imports."""
+
+    def test_module_runs_on_first_attribute_access(self):
+        """Test that the module body only runs when an attribute is used."""
+        code = (
+            "import sys\n"
+            "from src.lazy import lazy_import\n"
+            "json = lazy_import('json')\n"
+            "assert 'json.decoder' not in sys.modules\n"
+            "assert json.dumps([1]) == '[1]'\n"
+            "assert 'json.decoder' in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, check=True)
+
+    def test_returns_already_imported_module(self):
+        """Test that an imported module is returned as is."""
+        import json
+
+        assert lazy_import("json") is json
+
+    def test_missing_module(self):
+        """Test that an unknown module fails at once, not on first use."""
+        with pytest.raises(ModuleNotFoundError):
+            lazy_import("no_such_module_for_chronoperates")
+
+    def test_app_import_defers_heavy_dependencies(self):
+        """Test that importing the app does not load anthropic, PIL or icalendar."""
+        code = (
+            "import sys\n"
+            "import src.main\n"
+            "loaded = [m for m in ('anthropic._client', 'PIL._imaging', 'icalendar.cal')"
+            " if m in sys.modules]\n"
+            "assert not loaded, loaded\n"
+        )
+        subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, check=True)
@@ -12,7 +12,37 @@ class TestMainAPI:
         assert response.status_code == 200
         assert response.json() == {"message": "Calendar Event Extractor API is running"}
 
-    @patch("src.services.claude_service.ClaudeService.extract_events_from_image")
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_bytes")
+    def test_metrics(self, mock_extract, client, sample_image_path, mock_claude_response):
+        """Test that stage and request timings are exposed in the Prometheus format."""
+        mock_extract.return_value = mock_claude_response
+        with open(sample_image_path, "rb") as f:
+            client.post("/upload-image", files={"file": ("a.jpg", f, "image/jpeg")})
+        client.get("/jobs/unknown")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        for stage in ("upload", "parse", "serialize", "save"):
+            assert f'chronoperates_stage_duration_seconds_count{{stage="{stage}"}}' in body
+        assert 'route="/upload-image",status="200"' in body
+        assert 'route="/jobs/{job_id}",status="404"' in body
+        assert 'chronoperates_cache_stat{tier="memory",stat="hits"}' in body
+        assert 'chronoperates_jobs{status="queued"}' in body
+        assert "# TYPE chronoperates_events_per_image histogram" in body
+
+    def test_cache_stats(self, client):
+        """Test that cache counters are exposed per tier."""
+        response = client.get("/cache/stats")
+
+        assert response.status_code == 200
+        data = response.json()
+        for tier in ("memory", "disk"):
+            assert {"hits", "misses", "evictions", "entries"} <= set(data[tier])
+
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_image")
     @patch("src.services.ics_service.ICSService.create_ics_file_from_text")
     def test_process_image_success(
         self,
@@ -54,7 +84,35 @@ class TestMainAPI:
         # Clean up
         temp_path.unlink(missing_ok=True)
 
-    @patch("src.services.claude_service.ClaudeService.extract_events_from_image")
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_image")
+    def test_process_image_upstream_busy(self, mock_extract, client, sample_image_path):
+        """Test that an overloaded upstream gives 503 with Retry-After instead of 500."""
+        from src.governor import UpstreamBusyError
+
+        mock_extract.side_effect = UpstreamBusyError("Upstream API is throttling requests (429)", 2.5)
+
+        response = client.post("/process_image", json={"image_path": sample_image_path})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert "busy" in response.json()["detail"].lower()
+
+    @patch("src.services.claude_service.AsyncClaudeService.stream_events_from_bytes")
+    def test_stream_upstream_busy(self, mock_stream, client, sample_image_path):
+        from src.governor import UpstreamBusyError
+
+        async def busy(*args, **kwargs):
+            raise UpstreamBusyError("Too many requests waiting for the upstream API (64)", 1.0)
+            yield
+
+        mock_stream.side_effect = busy
+        with open(sample_image_path, "rb") as f:
+            response = client.post("/upload-image/stream", files={"file": ("a.jpg", f, "image/jpeg")})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_image")
     def test_process_image_file_not_found(self, mock_extract, client):
         """Test handling of non-existent image file."""
         # Mock to raise FileNotFoundError, bypassing API key check
@@ -84,7 +142,7 @@ class TestMainAPI:
                 or "invalid" in response.json()["detail"].lower()
             )
 
-    @patch("src.services.claude_service.ClaudeService.extract_events_from_image")
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_image")
     def test_process_image_claude_error(
         self, mock_claude_service, client, sample_image_path
     ):
@@ -104,3 +162,590 @@ class TestMainAPI:
         )
 
         assert response.status_code == 422  # Validation error
+
+    @pytest.mark.asyncio
+    async def test_concurrent_uploads_do_not_block_event_loop(
+        self, app, sample_image_path, mock_claude_response
+    ):
+        """Test that simultaneous uploads overlap their Claude calls."""
+        import asyncio
+        import time
+        from unittest.mock import Mock
+        from httpx import ASGITransport, AsyncClient
+        from src.dependencies import services
+
+        claude_service = services.claude
+
+        call_latency = 0.3
+        uploads = 8
+
+        async def slow_create(**kwargs):
+            await asyncio.sleep(call_latency)
+            message = Mock()
+            message.content = [Mock(text=mock_claude_response)]
+            return message
+
+        stub_client = Mock()
+        stub_client.messages.create = slow_create
+
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        with (
+            patch.object(claude_service, "client", stub_client),
+            patch.object(claude_service, "_get_from_cache", return_value=None),
+            patch.object(claude_service, "_save_to_cache"),
+        ):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as async_client:
+                start = time.perf_counter()
+                responses = await asyncio.gather(
+                    *(
+                        async_client.post(
+                            "/upload-image",
+                            files={"file": ("flyer.jpg", image_bytes, "image/jpeg")},
+                        )
+                        for _ in range(uploads)
+                    )
+                )
+                elapsed = time.perf_counter() - start
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["events_found"] == 2 for r in responses)
+        # Serialized calls would take uploads * call_latency (2.4s)
+        assert elapsed < call_latency * 3
+
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_bytes")
+    def test_upload_image_success(
+        self, mock_extract, client, sample_image_path, mock_claude_response
+    ):
+        """Test that an upload is handed to the service as in-memory bytes."""
+        import hashlib
+
+        mock_extract.return_value = mock_claude_response
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        response = client.post(
+            "/upload-image", files={"file": ("flyer.jpg", image_bytes, "image/jpeg")}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["events_found"] == 2
+        image_data, filename, content_hash = mock_extract.call_args.args
+        assert image_data == image_bytes
+        assert filename == "flyer.jpg"
+        assert content_hash.hexdigest() == hashlib.md5(image_bytes).hexdigest()
+
+    def test_upload_image_too_large(self, client):
+        """Test that oversized uploads are rejected with 413."""
+        from src.config import settings
+
+        oversized = b"x" * (settings.max_file_size_mb * 1024 * 1024 + 1)
+
+        response = client.post(
+            "/upload-image", files={"file": ("big.jpg", oversized, "image/jpeg")}
+        )
+
+        assert response.status_code == 413
+
+    @pytest.mark.parametrize("path", ["/upload-image", "/upload-images", "/jobs"])
+    def test_invalid_content_length(self, client, path):
+        """Test that a Content-Length that is not a byte count is a 400, not a 500."""
+        body = b"--b\r\n\r\n--b--\r\n"
+
+        response = client.post(
+            path,
+            content=body,
+            headers={"Content-Type": "multipart/form-data; boundary=b", "Content-Length": "lots"},
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid Content-Length header: 'lots'"
+
+    def test_upload_image_not_an_image(self, client):
+        """Test that non-image uploads are rejected with 400."""
+        response = client.post(
+            "/upload-image", files={"file": ("notes.txt", b"hello", "text/plain")}
+        )
+
+        assert response.status_code == 400
+        assert "must be an image" in response.json()["detail"]
+
+    @pytest.mark.parametrize("image_format", ["PNG", "JPEG"])
+    def test_upload_image_truncated_body(self, client, image_format):
+        """Test that an image whose header is fine but whose pixel data is cut short is a 400."""
+        import io
+        import random
+        from unittest.mock import AsyncMock, Mock
+        from PIL import Image
+        from src.dependencies import services
+
+        noise = random.Random(0).randbytes(400 * 300 * 3)
+        buffer = io.BytesIO()
+        Image.frombytes("RGB", (400, 300), noise).save(buffer, image_format)
+        truncated = buffer.getvalue()[: len(buffer.getvalue()) // 2]
+        stub_client = Mock()
+        stub_client.messages.create = AsyncMock()
+
+        with patch.object(services.claude, "client", stub_client):
+            response = client.post(
+                "/upload-image",
+                files={"file": (f"flyer.{image_format.lower()}", truncated, f"image/{image_format.lower()}")},
+            )
+
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Invalid input: Invalid image file: ")
+        stub_client.messages.create.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_uploads_share_one_claude_call(
+        self, app, sample_image_path, mock_claude_response
+    ):
+        """Test that 50 simultaneous uploads of one image make one upstream call."""
+        import asyncio
+        from unittest.mock import Mock
+        from httpx import ASGITransport, AsyncClient
+        from src.dependencies import services
+
+        claude_service = services.claude
+
+        upstream_calls = 0
+
+        async def slow_create(**kwargs):
+            nonlocal upstream_calls
+            upstream_calls += 1
+            await asyncio.sleep(0.5)
+            message = Mock()
+            message.content = [Mock(text=mock_claude_response)]
+            return message
+
+        stub_client = Mock()
+        stub_client.messages.create = slow_create
+
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        # Cache always misses, so only coalescing can prevent duplicate calls
+        with (
+            patch.object(claude_service, "client", stub_client),
+            patch.object(claude_service, "_get_from_cache", return_value=None),
+            patch.object(claude_service, "_save_to_cache"),
+        ):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as async_client:
+                responses = await asyncio.gather(
+                    *(
+                        async_client.post(
+                            "/upload-image",
+                            files={"file": ("viral.jpg", image_bytes, "image/jpeg")},
+                        )
+                        for _ in range(50)
+                    )
+                )
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["events_found"] == 2 for r in responses)
+        assert upstream_calls == 1
+
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_bytes")
+    def test_upload_images_reports_partial_failure(
+        self, mock_extract, client, sample_image_path, mock_claude_response
+    ):
+        """Test that one failing image does not sink the rest of the batch."""
+
+        async def extract(image_data, filename, content_hash, limiter=None):
+            if filename == "broken.jpg":
+                raise ValueError("Invalid image file")
+            return mock_claude_response
+
+        mock_extract.side_effect = extract
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        response = client.post(
+            "/upload-images",
+            files=[
+                ("files", ("monday.jpg", image_bytes, "image/jpeg")),
+                ("files", ("broken.jpg", image_bytes, "image/jpeg")),
+                ("files", ("notes.txt", b"hello", "text/plain")),
+                ("files", ("tuesday.jpg", image_bytes, "image/jpeg")),
+            ],
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 2
+        assert data["events_found"] == 4
+        assert data["ics_content"].count("BEGIN:VEVENT") == 4
+        assert [image["filename"] for image in data["images"]] == [
+            "monday.jpg", "broken.jpg", "notes.txt", "tuesday.jpg"
+        ]
+        assert [image["status"] for image in data["images"]] == [
+            "ok", "error", "error", "ok"
+        ]
+        assert [image["events_found"] for image in data["images"]] == [2, 0, 0, 2]
+        assert "Invalid image file" in data["images"][1]["error"]
+        assert "must be an image" in data["images"][2]["error"]
+        assert all(image["duration_ms"] >= 0 for image in data["images"])
+
+    def test_upload_images_too_many_files(self, client):
+        """Test that batches above the file limit are rejected with 400."""
+        from src.config import settings
+
+        files = [
+            ("files", (f"{i}.jpg", b"x", "image/jpeg"))
+            for i in range(settings.batch_max_files + 1)
+        ]
+
+        response = client.post("/upload-images", files=files)
+
+        assert response.status_code == 400
+        assert "Too many files" in response.json()["detail"]
+
+    def test_upload_images_missing_files(self, client):
+        """Test that a batch without file parts is rejected with 422."""
+        response = client.post(
+            "/upload-images", files={"other": ("a.jpg", b"x", "image/jpeg")}
+        )
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_upload_images_bounds_concurrent_extractions(
+        self, app, mock_claude_response
+    ):
+        """Test that a batch runs at most batch_max_concurrency Claude calls at once."""
+        import asyncio
+        import io
+        from unittest.mock import Mock
+        from httpx import ASGITransport, AsyncClient
+        from PIL import Image
+        from src.config import settings
+        from src.dependencies import services
+
+        claude_service = services.claude
+
+        active = 0
+        peak = 0
+
+        async def slow_create(**kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            message = Mock()
+            message.content = [Mock(text=mock_claude_response)]
+            return message
+
+        stub_client = Mock()
+        stub_client.messages.create = slow_create
+
+        # Distinct images, so neither the cache nor coalescing can merge calls
+        files = []
+        for i in range(12):
+            buffer = io.BytesIO()
+            Image.new("RGB", (64, 64), (i * 20, 0, 0)).save(buffer, "PNG")
+            files.append(("files", (f"page{i}.png", buffer.getvalue(), "image/png")))
+
+        with (
+            patch.object(settings, "batch_max_concurrency", 3),
+            patch.object(claude_service, "client", stub_client),
+            patch.object(claude_service, "_get_from_cache", return_value=None),
+            patch.object(claude_service, "_save_to_cache"),
+        ):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as async_client:
+                response = await async_client.post("/upload-images", files=files)
+
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 12
+        assert response.json()["events_found"] == 24
+        assert peak == 3
+
+
+class TestICSDownloadAPI:
+    """Test cases for content-addressed ICS downloads."""
+
+    @pytest.fixture
+    def artifacts(self, tmp_path):
+        from src.artifacts import ArtifactStore
+        from src.dependencies import services
+
+        store = ArtifactStore(tmp_path / "artifacts", ".ics")
+        with patch.object(services.ics, "artifacts", store):
+            yield store
+
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_bytes")
+    def test_upload_returns_cacheable_ics_url(
+        self, mock_extract, client, artifacts, sample_image_path, mock_claude_response
+    ):
+        """Test that repeated uploads share one artifact served with a strong ETag."""
+        mock_extract.return_value = mock_claude_response
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        first = client.post("/upload-image", files={"file": ("a.jpg", image_bytes, "image/jpeg")}).json()
+        second = client.post("/upload-image", files={"file": ("a.jpg", image_bytes, "image/jpeg")}).json()
+
+        assert first["ics_id"] == second["ics_id"]
+        assert first["ics_content"] == second["ics_content"]
+        assert first["ics_url"] == f"/ics/{first['ics_id']}"
+        assert artifacts.stats()["entries"] == 1
+
+        response = client.get(first["ics_url"])
+        assert response.status_code == 200
+        assert response.text == first["ics_content"]
+        assert response.headers["etag"] == f'"{first["ics_id"]}"'
+        assert "immutable" in response.headers["cache-control"]
+
+        revalidated = client.get(first["ics_url"], headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+
+    def test_unknown_ics_id(self, client, artifacts):
+        """Test that unknown or malformed ids return 404."""
+        assert client.get("/ics/" + "0" * 64).status_code == 404
+        assert client.get("/ics/not-an-id").status_code == 404
+
+    def test_download_ics_only_serves_artifacts(self, client, artifacts, tmp_path):
+        """Test that the legacy download endpoint cannot read arbitrary files."""
+        _, path = artifacts.put(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+        secret = tmp_path / "secret.ics"
+        secret.write_text("secret")
+
+        assert client.get("/download-ics", params={"file_path": str(path)}).status_code == 200
+        assert client.get("/download-ics", params={"file_path": str(secret)}).status_code == 404
+        assert client.get("/download-ics", params={"file_path": "/etc/passwd"}).status_code == 404
+        traversal = f"{artifacts.root}/../secret.ics"
+        assert client.get("/download-ics", params={"file_path": traversal}).status_code == 404
+
+    def test_download_ics_swept_between_lookups(self, client, artifacts):
+        """Test that a file removed by the janitor mid-request is a 404, not a 500."""
+        _, path = artifacts.put(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+
+        with patch.object(artifacts, "path", side_effect=[path, None]):
+            response = client.get("/download-ics", params={"file_path": str(path)})
+
+        assert response.status_code == 404
+
+
+class TestReadiness:
+    """Test cases for the lifespan-managed service startup."""
+
+    def test_not_ready_before_startup(self, client):
+        """Test that /ready answers 503 while / already answers 200."""
+        assert client.get("/").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"status": "starting"}
+
+    def test_ready_after_startup(self, app, tmp_path):
+        """Test that /ready turns 200 once the services are warmed, and back on shutdown."""
+        import time
+        from src.dependencies import services
+        from src.jobs import JobRunner, JobStore
+
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        runner = JobRunner(store, services.run_extraction_job, workers=1, poll_interval=0.05)
+        with (
+            patch.object(services, "job_store", store),
+            patch.object(services, "job_runner", runner),
+            patch(
+                "src.services.claude_service.AsyncClaudeService.warm_up",
+                new_callable=AsyncMock,
+                return_value=2,
+            ) as mock_warm_up,
+        ):
+            with TestClient(app) as client:
+                deadline = time.monotonic() + 5
+                while client.get("/ready").status_code != 200:
+                    assert time.monotonic() < deadline, "services did not become ready"
+                    time.sleep(0.02)
+                assert client.get("/ready").json() == {"status": "ready"}
+                assert mock_warm_up.await_count == 1
+
+            assert not services.ready
+
+
+class TestJobsAPI:
+    """Test cases for the background job endpoints."""
+
+    @pytest.fixture
+    def job_client(self, app, tmp_path):
+        """Test client with the job workers running against a temporary store."""
+        from src.dependencies import services
+        from src.jobs import JobRunner, JobStore
+
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        runner = JobRunner(store, services.run_extraction_job, workers=2, poll_interval=0.05)
+        with (
+            patch.object(services, "job_store", store),
+            patch.object(services, "job_runner", runner),
+            TestClient(app) as client,
+        ):
+            yield client
+
+    def wait_until_finished(self, client, job_id, timeout=5):
+        import time
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.02)
+        raise AssertionError(f"Job {job_id} did not finish")
+
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_bytes")
+    def test_submit_poll_and_download(
+        self, mock_extract, job_client, sample_image_path, mock_claude_response
+    ):
+        """Test that a job is accepted at once and its calendar fetched later."""
+        mock_extract.return_value = mock_claude_response
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        response = job_client.post(
+            "/jobs", files={"file": ("flyer.jpg", image_bytes, "image/jpeg")}
+        )
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+        assert job["filename"] == "flyer.jpg"
+
+        finished = self.wait_until_finished(job_client, job["id"])
+        assert finished["status"] == "succeeded"
+        assert finished["events_found"] == 2
+        assert mock_extract.call_args.args[:2] == (image_bytes, "flyer.jpg")
+
+        ics = job_client.get(f"/jobs/{job['id']}/ics")
+        assert ics.status_code == 200
+        assert ics.headers["content-type"].startswith("text/calendar")
+        assert "Team Meeting" in ics.text
+
+    @patch("src.services.claude_service.AsyncClaudeService.extract_events_from_bytes")
+    def test_failed_job_has_no_calendar(
+        self, mock_extract, job_client, sample_image_path
+    ):
+        """Test that a failed job reports its error and refuses the ICS download."""
+        mock_extract.side_effect = Exception("Claude API error")
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        job_id = job_client.post(
+            "/jobs", files={"file": ("flyer.jpg", image_bytes, "image/jpeg")}
+        ).json()["id"]
+
+        finished = self.wait_until_finished(job_client, job_id)
+        assert finished["status"] == "failed"
+        assert "Claude API error" in finished["error"]
+        assert job_client.get(f"/jobs/{job_id}/ics").status_code == 409
+
+    def test_unknown_job(self, job_client):
+        """Test that unknown job ids return 404."""
+        assert job_client.get("/jobs/missing").status_code == 404
+        assert job_client.get("/jobs/missing/ics").status_code == 404
+
+    def test_submit_rejects_non_image(self, job_client):
+        """Test that jobs are validated before being queued."""
+        response = job_client.post(
+            "/jobs", files={"file": ("notes.txt", b"hello", "text/plain")}
+        )
+
+        assert response.status_code == 400
+
+
+class TestStreamingAPI:
+    """Test cases for the Server-Sent Events extraction endpoint."""
+
+    @staticmethod
+    def parse_sse(body):
+        import json
+
+        messages = []
+        for block in body.strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.split("\n"))
+            messages.append((fields["event"], json.loads(fields["data"])))
+        return messages
+
+    @patch("src.services.claude_service.AsyncClaudeService.stream_events_from_bytes")
+    def test_events_streamed_before_final_calendar(
+        self, mock_stream, client, sample_image_path, mock_claude_response
+    ):
+        """Test that each event arrives as its own message, then the ICS."""
+
+        async def chunks(image_data, filename, content_hash):
+            for i in range(0, len(mock_claude_response), 5):
+                yield mock_claude_response[i:i + 5]
+
+        mock_stream.side_effect = chunks
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        response = client.post(
+            "/upload-image/stream",
+            files={"file": ("flyer.jpg", image_bytes, "image/jpeg")},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        messages = self.parse_sse(response.text)
+        assert [name for name, _ in messages] == ["event", "event", "done"]
+        assert messages[0][1]["TITLE"] == "Team Meeting"
+        assert messages[1][1]["TITLE"] == "Project Deadline"
+        done = messages[2][1]
+        assert done["events_found"] == 2
+        assert done["extracted_text"] == mock_claude_response
+        assert "BEGIN:VCALENDAR" in done["ics_content"]
+
+    @patch("src.services.claude_service.AsyncClaudeService.stream_events_from_bytes")
+    def test_error_before_stream_gets_status_code(
+        self, mock_stream, client, sample_image_path
+    ):
+        """Test that a validation error is a 400, not a broken stream."""
+
+        async def invalid(image_data, filename, content_hash):
+            raise ValueError("Invalid image file")
+            yield
+
+        mock_stream.side_effect = invalid
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        response = client.post(
+            "/upload-image/stream",
+            files={"file": ("flyer.jpg", image_bytes, "image/jpeg")},
+        )
+
+        assert response.status_code == 400
+        assert "Invalid image file" in response.json()["detail"]
+
+    @patch("src.services.claude_service.AsyncClaudeService.stream_events_from_bytes")
+    def test_error_mid_stream_sends_error_message(
+        self, mock_stream, client, sample_image_path
+    ):
+        """Test that a failure after the first event ends the stream with an error."""
+
+        async def interrupted(image_data, filename, content_hash):
+            yield "EVENT:\nTITLE: Gala\n---\n"
+            raise Exception("connection reset")
+
+        mock_stream.side_effect = interrupted
+        with open(sample_image_path, "rb") as f:
+            image_bytes = f.read()
+
+        response = client.post(
+            "/upload-image/stream",
+            files={"file": ("flyer.jpg", image_bytes, "image/jpeg")},
+        )
+
+        messages = self.parse_sse(response.text)
+        assert [name for name, _ in messages] == ["event", "error"]
+        assert "connection reset" in messages[1][1]["detail"]
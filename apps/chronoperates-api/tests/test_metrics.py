@@ -0,0 +1,75 @@
+import pytest
+from src.metrics import MetricsRegistry, STAGE_ERRORS, STAGE_SECONDS, stage
+
+
+class TestMetricsRegistry:
+    """Test cases for the Prometheus text exposition."""
+
+    def test_counter_and_gauge(self):
+        """Test that samples are rendered per label set with escaped values."""
+        registry = MetricsRegistry()
+        requests = registry.counter("app_requests_total", "Requests served", ["route"])
+        size = registry.gauge("app_cache_entries", "Entries in the cache")
+
+        requests.inc(route="/a")
+        requests.inc(2, route='/b"\\')
+        size.set(7)
+        size.set(5)
+
+        assert registry.render() == (
+            "# HELP app_requests_total Requests served\n"
+            "# TYPE app_requests_total counter\n"
+            'app_requests_total{route="/a"} 1\n'
+            'app_requests_total{route="/b\\"\\\\"} 2\n'
+            "# HELP app_cache_entries Entries in the cache\n"
+            "# TYPE app_cache_entries gauge\n"
+            "app_cache_entries 5\n"
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket, count and sum samples of a histogram."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("app_seconds", "Latency", ["stage"], buckets=[0.1, 1])
+
+        for value in (0.05, 0.1, 0.5, 3):
+            latency.observe(value, stage="parse")
+
+        lines = registry.render().splitlines()
+        assert lines[2:] == [
+            'app_seconds_bucket{stage="parse",le="0.1"} 2',
+            'app_seconds_bucket{stage="parse",le="1"} 3',
+            'app_seconds_bucket{stage="parse",le="+Inf"} 4',
+            'app_seconds_count{stage="parse"} 4',
+            'app_seconds_sum{stage="parse"} 3.65',
+        ]
+        assert latency.count(stage="parse") == 4
+
+    def test_invalid_use(self):
+        """Test that wrong labels, negative increments and duplicate names are rejected."""
+        registry = MetricsRegistry()
+        counter = registry.counter("app_total", "Things", ["kind"])
+
+        with pytest.raises(ValueError, match="expects labels"):
+            counter.inc(other="x")
+        with pytest.raises(ValueError, match="only be increased"):
+            counter.inc(-1, kind="x")
+        with pytest.raises(ValueError, match="already registered"):
+            registry.counter("app_total", "Things again")
+
+
+class TestStage:
+    """Test cases for the stage timer."""
+
+    def test_stage_times_and_counts_errors(self):
+        """Test that a failing stage is timed and its exception type counted."""
+        timed = STAGE_SECONDS.count(stage="test_stage")
+        errors = STAGE_ERRORS.value(stage="test_stage", error="KeyError")
+
+        with stage("test_stage"):
+            pass
+        with pytest.raises(KeyError):
+            with stage("test_stage"):
+                raise KeyError("missing")
+
+        assert STAGE_SECONDS.count(stage="test_stage") == timed + 2
+        assert STAGE_ERRORS.value(stage="test_stage", error="KeyError") == errors + 1
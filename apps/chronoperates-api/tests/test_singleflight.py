@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from src.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test cases for request coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test that callers with the same key share one result."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(10)))
+
+        assert results == ["result"] * 10
+        assert calls == 1
+        assert flight.stats() == {"started": 1, "coalesced": 9, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """Test that distinct keys are not coalesced."""
+        flight = SingleFlight()
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b"))
+        )
+
+        assert results == ["a", "b"]
+        assert flight.started == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_and_are_not_retained(self):
+        """Test that all waiters see a failure and the next call retries."""
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+
+        results = await asyncio.gather(
+            *(flight.do("key", failing) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        async def succeeding():
+            return "ok"
+
+        assert await flight.do("key", succeeding) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_work(self):
+        """Test that one waiter disconnecting leaves the others unaffected."""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "result"
+        assert first.cancelled()
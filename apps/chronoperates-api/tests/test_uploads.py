@@ -0,0 +1,96 @@
+import hashlib
+import pytest
+from src.uploads import UploadError, UploadTooLargeError, read_multipart_files
+
+
+BOUNDARY = "testboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def build_multipart_body(parts):
+    """Build a multipart/form-data body from (field, filename, content_type, data) tuples."""
+    body = b""
+    for field_name, filename, content_type, data in parts:
+        body += f"--{BOUNDARY}\r\n".encode()
+        disposition = f'Content-Disposition: form-data; name="{field_name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += disposition.encode() + b"\r\n"
+        if content_type:
+            body += f"Content-Type: {content_type}\r\n".encode()
+        body += b"\r\n" + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunked(body, chunk_size, consumed=None):
+    """Yield body in chunks, recording how many chunks were pulled."""
+    for i in range(0, len(body), chunk_size):
+        if consumed is not None:
+            consumed.append(i)
+        yield body[i:i + chunk_size]
+
+
+class TestReadMultipartFiles:
+    """Test cases for the streaming multipart reader."""
+
+    @pytest.mark.asyncio
+    async def test_reads_file_and_hashes_incrementally(self):
+        """Test that file bytes and their MD5 match the uploaded content."""
+        data = bytes(range(256)) * 400
+        body = build_multipart_body(
+            [("note", None, None, b"ignored"), ("file", "flyer.jpg", "image/jpeg", data)]
+        )
+
+        files = await read_multipart_files(CONTENT_TYPE, chunked(body, 1000), max_file_bytes=1024 * 1024)
+
+        assert len(files) == 1
+        assert files[0].field_name == "file"
+        assert files[0].filename == "flyer.jpg"
+        assert files[0].content_type == "image/jpeg"
+        assert bytes(files[0].data) == data
+        assert files[0].content_hash.hexdigest() == hashlib.md5(data).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_file_early(self):
+        """Test that reading stops as soon as the size limit is crossed."""
+        body = build_multipart_body([("file", "big.jpg", "image/jpeg", b"x" * 100_000)])
+        consumed = []
+
+        with pytest.raises(UploadTooLargeError):
+            await read_multipart_files(
+                CONTENT_TYPE, chunked(body, 1000, consumed), max_file_bytes=10_000
+            )
+
+        assert len(consumed) < len(body) // 1000 // 2
+
+    @pytest.mark.asyncio
+    async def test_rejects_declared_content_length(self):
+        """Test that an oversized Content-Length is rejected before reading."""
+        consumed = []
+
+        with pytest.raises(UploadTooLargeError):
+            await read_multipart_files(
+                CONTENT_TYPE,
+                chunked(b"unused", 1, consumed),
+                max_file_bytes=10_000,
+                max_files=1,
+                content_length=10_000_000,
+            )
+
+        assert consumed == []
+
+    @pytest.mark.asyncio
+    async def test_rejects_too_many_files(self):
+        """Test the max_files limit."""
+        body = build_multipart_body(
+            [("file", "a.jpg", "image/jpeg", b"a"), ("file", "b.jpg", "image/jpeg", b"b")]
+        )
+
+        with pytest.raises(UploadError, match="Too many files"):
+            await read_multipart_files(CONTENT_TYPE, chunked(body, 64), max_file_bytes=100, max_files=1)
+
+    @pytest.mark.asyncio
+    async def test_rejects_non_multipart(self):
+        """Test that a non-multipart content type is rejected."""
+        with pytest.raises(UploadError, match="multipart/form-data"):
+            await read_multipart_files("application/json", chunked(b"{}", 2), max_file_bytes=100)